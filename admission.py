@@ -0,0 +1,231 @@
+"""Admission control for upstream LLM calls, shared by all workers.
+
+Two limits sit in front of OpenRouter:
+
+- a token bucket per client (learner session): each LLM-backed request costs
+  tokens that refill at a steady rate, so one browser cannot hog the upstream;
+- a global cap on concurrent upstream calls. Calls past the cap wait in a
+  bounded queue ordered by priority (lower first), then arrival. A call that
+  is not admitted before its queue deadline is rejected, so no worker waits
+  on the queue for long. When the queue is full, a newcomer displaces the
+  newest waiter of a lower priority, or is rejected itself.
+
+Slots, queue tickets and buckets live in a SQLite file like the single-flight
+leases; a crashed worker's slot is freed when its lease lapses.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """A call was not admitted; `reason` is 'rate_limited', 'queue_full' or 'timeout'"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Upstream call not admitted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lease(NamedTuple):
+    slot: int
+    ticket: str
+    waited: float
+
+
+class AdmissionController:
+    def __init__(self, path, max_concurrent=8, max_queue=16, queue_timeout=5.0, priorities=None,
+                 rate_per_minute=12, burst=6, costs=None, lease_seconds=180, poll_interval=0.05):
+        self.path = path
+        self.max_concurrent = max_concurrent  # 0 disables the cap
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priorities = dict(priorities or {})
+        self.default_priority = max(self.priorities.values(), default=0) + 1
+        self.rate = rate_per_minute / 60  # tokens per second; 0 disables rate limits
+        self.burst = burst
+        self.costs = dict(costs or {})
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checks = 0
+        self._stats = {'admitted': 0, 'queued': 0, 'rate_limited': 0, 'queue_full': 0, 'timeout': 0,
+                       'displaced': 0, 'wait_seconds': 0.0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS admission_slot (
+                slot INTEGER PRIMARY KEY,
+                owner TEXT,
+                expires_at REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS admission_queue (
+                ticket TEXT PRIMARY KEY,
+                priority INTEGER NOT NULL,
+                enqueued_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS admission_bucket (
+                client TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # The slot rows are the cap; resize them when the configured cap changes
+            conn.execute("DELETE FROM admission_slot WHERE slot >= ?", (max_concurrent,))
+            conn.executemany("INSERT OR IGNORE INTO admission_slot (slot) VALUES (?)",
+                             [(slot,) for slot in range(max_concurrent)])
+        finally:
+            conn.execute("COMMIT")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _bump(self, field, amount=1):
+        with self._lock:
+            self._stats[field] += amount
+
+    def check_rate(self, client, kind):
+        """Take `kind`'s cost from the client's bucket, or raise AdmissionRejected('rate_limited')"""
+        if self.rate <= 0 or not client:
+            return
+        cost = self.costs.get(kind, 1)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM admission_bucket WHERE client = ?",
+                               (client,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO admission_bucket (client, tokens, updated_at) VALUES (?, ?, ?)",
+                         (client, tokens, now))
+        finally:
+            conn.execute("COMMIT")
+
+        with self._lock:
+            self._checks += 1
+            should_purge = self._checks % 100 == 0
+        if should_purge:
+            # Buckets idle long enough to be full again carry no state
+            conn.execute("DELETE FROM admission_bucket WHERE updated_at < ?", (now - self.burst / self.rate,))
+        if not allowed:
+            self._bump('rate_limited')
+            raise AdmissionRejected('rate_limited', (cost - tokens) / self.rate)
+
+    def acquire(self, kind, timeout=None):
+        """Wait for an upstream slot; returns a Lease for release(), or raises AdmissionRejected.
+
+        `timeout` overrides queue_timeout; 0 takes a free slot or fails at once, without queueing.
+        """
+        if self.max_concurrent <= 0:
+            return None
+        timeout = self.queue_timeout if timeout is None else timeout
+        priority = self.priorities.get(kind, self.default_priority)
+        ticket = uuid.uuid4().hex
+        started = time.time()
+        deadline = started + timeout
+        conn = self._conn()
+        queued = False
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                slot = self._try_admit(conn, ticket, priority, started, now, queued)
+                if slot is None and not queued and timeout > 0:
+                    self._enqueue(conn, ticket, priority, started, deadline)
+                    queued = True
+                    self._bump('queued')
+                elif slot is None and now >= deadline:
+                    conn.execute("DELETE FROM admission_queue WHERE ticket = ?", (ticket,))
+            finally:
+                conn.execute("COMMIT")
+
+            if slot is not None:
+                waited = now - started
+                self._bump('admitted')
+                self._bump('wait_seconds', waited)
+                return Lease(slot, ticket, waited)
+            if now >= deadline:
+                self._bump('timeout')
+                raise AdmissionRejected('timeout', max(timeout, self.poll_interval))
+            time.sleep(self.poll_interval)
+
+    def _try_admit(self, conn, ticket, priority, enqueued_at, now, queued):
+        if queued and conn.execute("SELECT 1 FROM admission_queue WHERE ticket = ?", (ticket,)).fetchone() is None:
+            self._bump('displaced')
+            raise AdmissionRejected('queue_full', self.queue_timeout)
+        conn.execute("DELETE FROM admission_queue WHERE expires_at <= ?", (now,))
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM admission_queue WHERE ticket != ? AND "
+            "(priority < ? OR (priority = ? AND enqueued_at < ?))",
+            (ticket, priority, priority, enqueued_at)).fetchone()[0]
+        free = [row[0] for row in conn.execute(
+            "SELECT slot FROM admission_slot WHERE owner IS NULL OR expires_at <= ? ORDER BY slot", (now,))]
+        # Only take a slot the waiters ahead of us cannot all use
+        if len(free) <= ahead:
+            return None
+        conn.execute("UPDATE admission_slot SET owner = ?, expires_at = ? WHERE slot = ?",
+                     (ticket, now + self.lease_seconds, free[0]))
+        conn.execute("DELETE FROM admission_queue WHERE ticket = ?", (ticket,))
+        return free[0]
+
+    def _enqueue(self, conn, ticket, priority, enqueued_at, deadline):
+        if conn.execute("SELECT COUNT(*) FROM admission_queue").fetchone()[0] >= self.max_queue:
+            victim = conn.execute(
+                "SELECT ticket FROM admission_queue WHERE priority > ? ORDER BY priority DESC, enqueued_at DESC "
+                "LIMIT 1", (priority,)).fetchone()
+            if victim is None:
+                self._bump('queue_full')
+                raise AdmissionRejected('queue_full', self.queue_timeout)
+            conn.execute("DELETE FROM admission_queue WHERE ticket = ?", victim)
+        # The ticket outlives the deadline slightly so a dead worker's ticket still expires
+        conn.execute("INSERT INTO admission_queue (ticket, priority, enqueued_at, expires_at) VALUES (?, ?, ?, ?)",
+                     (ticket, priority, enqueued_at, deadline + 1))
+
+    def release(self, lease):
+        if lease is None:
+            return
+        try:
+            self._conn().execute("UPDATE admission_slot SET owner = NULL, expires_at = 0 WHERE slot = ? AND owner = ?",
+                                 (lease.slot, lease.ticket))
+        except sqlite3.Error as e:
+            logger.warning("Admission release error: %s", e)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        now = time.time()
+        try:
+            conn = self._conn()
+            stats['in_flight'] = conn.execute(
+                "SELECT COUNT(*) FROM admission_slot WHERE owner IS NOT NULL AND expires_at > ?", (now,)).fetchone()[0]
+            stats['queue_length'] = conn.execute(
+                "SELECT COUNT(*) FROM admission_queue WHERE expires_at > ?", (now,)).fetchone()[0]
+        except sqlite3.Error:
+            stats['in_flight'] = stats['queue_length'] = None
+        stats['max_concurrent'] = self.max_concurrent
+        stats['max_queue'] = self.max_queue
+        return stats
@@ -1,308 +1,376 @@
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, jsonify, request, session, redirect, url_for, Response, stream_with_context, g
+from markupsafe import Markup
+import hashlib
 import json
+import logging
+import math
 import os
+import re
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
-import markdown
 from datetime import datetime
 import random
-import re
-import html
-import requests
+from llm_cache import LLMCache, make_cache_key
+from quiz_pool import QuizPool
+from markdown_stream import MarkdownStreamRenderer
+from markdown_cache import MARKDOWN_CACHE, QUESTION_EXTENSIONS, render_markdown
+from openrouter_client import OpenRouterClient, OpenRouterError, CircuitBreaker, CircuitOpenError, RequestCancelled
+from singleflight import SingleFlight
+from quiz_parser import IncrementalQuizParser, parse_quiz, new_parse_stats
+from quiz_schema import RESPONSE_FORMAT, extract_questions
+from question_generator import generate_questions as generate_offline_questions
+from quiz_store import create_quiz_store
+from content_store import ContentStore
+from progress_store import OVERALL, ProgressStore
+from question_bank import QuestionBank
+from http_cache import FragmentCache, conditional_page, make_etag
+from static_assets import StaticAssets
+from practice_index import FACETS, PracticeIndex
+from search_index import SearchIndex
+from app_logging import configure_logging
+from admission import AdmissionController, AdmissionRejected
+from hedging import Hedger, HedgeSkipped
+from quiz_jobs import TERMINAL as QUIZ_JOB_TERMINAL, JobCancelled, QuizJobs
+from code_fingerprint import fingerprint, normalize_language, rename_in_code, truncate_code
+import metrics
+
+IMPORTS_DONE = time.perf_counter()
 
 load_dotenv()
 
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'text'))
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', os.urandom(24))
 
+# Prometheus metrics at /metrics; with a directory, every worker's values are merged on scrape
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+if METRICS_DIR:
+    metrics.REGISTRY.configure_multiprocess(METRICS_DIR, flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 5)))
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_seconds', 'Time to produce the response (streams: to the first byte)',
+    ('route', 'method', 'status'))
+LLM_REQUESTS = metrics.counter(
+    'llm_requests_total', 'LLM completions by outcome (cache_hit, ok, error, circuit_open, cancelled, discarded)',
+    ('endpoint', 'outcome'))
+LLM_REQUEST_DURATION = metrics.histogram(
+    'llm_request_duration_seconds', 'Upstream LLM call duration including retries',
+    ('endpoint', 'outcome'), buckets=metrics.LLM_BUCKETS)
+LLM_TOKENS = metrics.counter('llm_tokens_total', 'Tokens reported by the upstream', ('endpoint', 'kind'))
+QUIZ_PARSER_QUESTIONS = metrics.counter(
+    'quiz_parser_questions_total',
+    'Text-format parser results (parsed, skipped, placeholder_filled, answer_inferred, answer_defaulted)', ('outcome',))
+QUIZZES = metrics.counter(
+    'quizzes_total', 'Quizzes served: generated, padded with fallback questions, or fully fallback', ('source',))
+ADMISSION_WAIT = metrics.histogram(
+    'admission_queue_wait_seconds', 'Time an admitted upstream call waited for a slot', ('endpoint',))
+ADMISSION_REJECTIONS = metrics.counter(
+    'admission_rejections_total', 'LLM work refused (rate_limited, queue_full, timeout)', ('endpoint', 'reason'))
+LLM_HEDGES = metrics.counter(
+    'llm_hedges_total', 'Hedging decisions (not_hedged, primary_won, backup_won, skipped_budget, skipped_busy, '
+    'both_failed)', ('endpoint', 'outcome'))
+QUIZ_JOB_SUBMISSIONS = metrics.counter(
+    'quiz_job_submissions_total', 'Quiz job submissions (created, or deduplicated onto a live job)', ('outcome',))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 # Configure OpenRouter API
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-
-# Load DSA Content
-def load_dsa_content():
-    with open('data/dsa_content.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+OPENROUTER_URL = os.getenv('OPENROUTER_URL', "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_MODEL = "openai/gpt-oss-120b"
+# 'json' asks for schema-validated structured output; 'text' uses the prose format + parser; 'stream'
+# streams the prose format and parses it as it arrives, so quizzes open on their first question
+QUIZ_GENERATION_MODE = os.getenv('QUIZ_GENERATION_MODE', 'json')
+QUIZ_JSON_REPAIR_ATTEMPTS = int(os.getenv('QUIZ_JSON_REPAIR_ATTEMPTS', 1))
+# Quizzes larger than one chunk are generated as concurrent chunks, each on a slice of the subtopics
+QUIZ_CHUNK_SIZE = int(os.getenv('QUIZ_CHUNK_SIZE', 5))
+QUIZ_CHUNK_WORKERS = int(os.getenv('QUIZ_CHUNK_WORKERS', 4))
+QUIZ_CHUNK_TIMEOUT = float(os.getenv('QUIZ_CHUNK_TIMEOUT', 45))
+SYSTEM_PROMPT = "You are an expert Data Structures and Algorithms instructor. Create clear, well-formatted multiple choice questions."
 
-def load_quiz_templates():
-    with open('data/quiz_templates.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+# Response cache shared by all workers (TTL in seconds per endpoint, 0 disables)
+LLM_CACHE = LLMCache(
+    os.getenv('LLM_CACHE_PATH', os.path.join(app.instance_path, 'llm_cache.sqlite3')),
+    ttls={
+        'explain': int(os.getenv('LLM_CACHE_TTL_EXPLAIN', 7 * 24 * 3600)),
+        'code-help': int(os.getenv('LLM_CACHE_TTL_CODE_HELP', 24 * 3600)),
+        # Generated questions go to the question bank, which rejects a repeat of the same completion
+        'quiz': 0,
+        'quiz-pool': 0,
+    },
+    max_memory_entries=int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 256)),
+    max_disk_entries=int(os.getenv('LLM_CACHE_DISK_ENTRIES', 5000))
+)
 
-DSA_CONTENT = load_dsa_content()
-QUIZ_TEMPLATES = load_quiz_templates()
+# DSA content: indexed, immutable, reloaded when data/*.json changes on disk.
+# Loaded on first use, from the compiled snapshot (`flask --app app build-content`) when it is current.
+CONTENT = ContentStore('data/dsa_content.json', 'data/quiz_templates.json',
+                       check_interval=float(os.getenv('CONTENT_RELOAD_INTERVAL', 2)),
+                       compiled_path=os.getenv('CONTENT_SNAPSHOT_PATH',
+                                               os.path.join(app.instance_path, 'content_snapshot.pickle')))
 
 def get_topic_by_id(topic_id):
-    return next((t for t in DSA_CONTENT['topics'] if t['id'] == topic_id), None)
+    return CONTENT.snapshot.get_topic(topic_id)
 
-def call_openrouter(prompt, temperature=0.9, max_tokens=7000):
-    """Call OpenRouter API with OpenAI GPT-OSS-120B"""
-    if not OPENROUTER_API_KEY:
-        return None
-    
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost:5000",
-        "X-Title": "DSA Learning Platform"
-    }
-    
-    data = {
-        "model": "openai/gpt-oss-120b",
+OPENROUTER = OpenRouterClient(
+    OPENROUTER_URL,
+    OPENROUTER_API_KEY,
+    connect_timeout=float(os.getenv('OPENROUTER_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.getenv('OPENROUTER_READ_TIMEOUT', 60)),
+    max_retries=int(os.getenv('OPENROUTER_MAX_RETRIES', 2)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('OPENROUTER_BREAKER_THRESHOLD', 5)),
+        reset_timeout=float(os.getenv('OPENROUTER_BREAKER_RESET', 30))
+    )
+)
+
+SINGLE_FLIGHT = SingleFlight(
+    os.getenv('SINGLE_FLIGHT_PATH', os.path.join(app.instance_path, 'singleflight.sqlite3')),
+    lease_seconds=float(os.getenv('OPENROUTER_READ_TIMEOUT', 60)) * 2
+)
+
+# Admission control: per-learner token buckets and a global cap on concurrent upstream calls, with a
+# bounded priority queue (lower runs first) whose waiters give up after ADMISSION_QUEUE_TIMEOUT seconds
+ADMISSION = AdmissionController(
+    os.getenv('ADMISSION_PATH', os.path.join(app.instance_path, 'admission.sqlite3')),
+    max_concurrent=int(os.getenv('ADMISSION_MAX_CONCURRENT', 8)),
+    max_queue=int(os.getenv('ADMISSION_QUEUE_SIZE', 16)),
+    queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5)),
+    priorities={'quiz': 0, 'explain': 1, 'code-help': 2, 'quiz-pool': 3},
+    rate_per_minute=float(os.getenv('ADMISSION_RATE_PER_MINUTE', 12)),
+    burst=float(os.getenv('ADMISSION_BURST', 6)),
+    costs={'quiz': 2, 'explain': 1, 'code-help': 1},
+    lease_seconds=float(os.getenv('OPENROUTER_READ_TIMEOUT', 60)) * 3
+)
+
+def acquire_upstream(endpoint):
+    """An upstream slot for ADMISSION.release(); raises AdmissionRejected when none frees up in time"""
+    try:
+        lease = ADMISSION.acquire(endpoint)
+    except AdmissionRejected as e:
+        ADMISSION_REJECTIONS.inc(endpoint=endpoint, reason=e.reason)
+        raise
+    if lease is not None:
+        ADMISSION_WAIT.observe(lease.waited, endpoint=endpoint)
+    return lease
+
+@contextmanager
+def admitted(endpoint):
+    """Hold an upstream slot for the block"""
+    lease = acquire_upstream(endpoint)
+    try:
+        yield
+    finally:
+        ADMISSION.release(lease)
+
+def parse_hedge_budgets(spec):
+    """'explain:0.05,quiz:0.05' -> {'explain': 0.05, 'quiz': 0.05}"""
+    budgets = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        endpoint, _, share = part.partition(':')
+        budgets[endpoint.strip()] = float(share or 0.05)
+    return budgets
+
+# Hedged requests (off unless HEDGE_BUDGETS lists endpoints): when a call has not returned after the
+# endpoint's recent HEDGE_PERCENTILE latency, a backup call to HEDGE_MODEL races it. The budget is the
+# share of an endpoint's calls that may be doubled; a backup only starts if an upstream slot is free.
+HEDGE_MODEL = os.getenv('HEDGE_MODEL') or OPENROUTER_MODEL
+HEDGER = Hedger(
+    parse_hedge_budgets(os.getenv('HEDGE_BUDGETS', '')),
+    percentile=float(os.getenv('HEDGE_PERCENTILE', 95)),
+    min_delay=float(os.getenv('HEDGE_MIN_DELAY', 1)),
+    max_delay=float(os.getenv('HEDGE_MAX_DELAY', 20)),
+    on_outcome=lambda endpoint, outcome: LLM_HEDGES.inc(endpoint=endpoint, outcome=outcome)
+)
+
+def check_rate_limit(endpoint, client=None):
+    """Charge the learner (or, without a session, the address) for one LLM-backed request"""
+    try:
+        ADMISSION.check_rate(client or session.get('user_id') or f"ip:{request.remote_addr}", endpoint)
+    except AdmissionRejected as e:
+        ADMISSION_REJECTIONS.inc(endpoint=endpoint, reason=e.reason)
+        raise
+
+def busy_response(e):
+    """429 for a learner over their rate limit, 503 while the upstream queue is saturated"""
+    retry_after = max(1, math.ceil(e.retry_after))
+    response = jsonify({'error': 'AI service is busy, please try again shortly', 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429 if e.reason == 'rate_limited' else 503
+
+def llm_available():
+    """False when no key is configured or the circuit breaker is rejecting calls"""
+    return bool(OPENROUTER_API_KEY) and not OPENROUTER.breaker.is_open()
+
+def openrouter_payload(prompt, temperature, max_tokens, response_format=None, model=None):
+    payload = {
+        "model": model or OPENROUTER_MODEL,
         "messages": [
-            {"role": "system", "content": "You are an expert Data Structures and Algorithms instructor. Create clear, well-formatted multiple choice questions."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         "temperature": temperature,
         "max_tokens": max_tokens
     }
-    
-    try:
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content']
-    except Exception as e:
-        print(f"OpenRouter API error: {e}")
-        return None
+    if response_format:
+        payload["response_format"] = response_format
+    return payload
 
-def parse_quiz_from_llm_response(text):
-    """Parse LLM response into structured quiz format - ROBUST PARSING"""
-    questions = []
+def call_openrouter(prompt, temperature=0.9, max_tokens=7000, endpoint='default', response_format=None,
+                    use_cache=True, coalesce=True):
+    """Call OpenRouter API with OpenAI GPT-OSS-120B (cached per endpoint unless the caller caches itself).
     
-    if not text or not isinstance(text, str):
-        print("ERROR: Empty or invalid text provided to parser")
-        return []
+    `coalesce=False` makes a call of its own even while an identical prompt is in
+    flight, for callers that need a fresh completion (new questions for the bank).
+    """
+    if not OPENROUTER_API_KEY:
+        return None
     
-    # Clean up the text - normalize line endings
-    text = text.replace('\r\n', '\n').replace('\r', '\n').strip()
-    
-    # Split by question patterns - more flexible matching
-    question_patterns = [
-        r'\n\s*Question\s*\d+\s*[\.:\)]\s*',
-        r'\n\s*Q\s*\d+\s*[\.:\)]\s*',
-        r'\n\s*#{1,3}\s*Question\s*\d+',
-        r'\n\s*\*\*Question\s*\d+\*\*',
-        r'\n\s*\d+\s*[\.:\)]\s+(?=[^A-Da-d][\.:\)])',  # Number not followed by option letter
-    ]
-    
-    question_blocks = []
-    used_pattern = None
-    
-    for pattern in question_patterns:
-        blocks = re.split(pattern, text, flags=re.IGNORECASE)
-        # Filter out empty blocks and headers
-        blocks = [b.strip() for b in blocks if b.strip() and len(b.strip()) > 20]
-        if len(blocks) >= 1:
-            question_blocks = blocks
-            used_pattern = pattern
-            break
+    cache_key = make_cache_key(OPENROUTER_MODEL, SYSTEM_PROMPT, prompt, temperature, max_tokens,
+                               extra=response_format)
+    cached = LLM_CACHE.get(cache_key, endpoint) if use_cache else None
+    if cached is not None:
+        LLM_REQUESTS.inc(endpoint=endpoint, outcome='cache_hit')
+        return cached
     
-    if not question_blocks:
-        # Fallback: split by double newlines and filter for question-like content
-        blocks = text.split('\n\n')
-        question_blocks = [b.strip() for b in blocks if len(b.strip()) > 30]
+    def attempt(model, lease, cancelled):
+        """One upstream call holding `lease`; a hedge's loser is recorded as 'discarded'"""
+        usage = {}
+        started = time.perf_counter()
+        try:
+            content = OPENROUTER.complete(openrouter_payload(prompt, temperature, max_tokens, response_format, model),
+                                          usage=usage, cancelled=cancelled)
+        except OpenRouterError as e:
+            if isinstance(e, RequestCancelled):
+                outcome = 'cancelled'
+            else:
+                outcome = 'circuit_open' if isinstance(e, CircuitOpenError) else 'error'
+            record_llm_call(endpoint, outcome, started, usage)
+            raise
+        finally:
+            ADMISSION.release(lease)
+        record_llm_call(endpoint, 'discarded' if cancelled and cancelled.is_set() else 'ok', started, usage)
+        return content
     
+    def backup(cancelled):
+        # Only into a free slot: hedging while requests queue would add load exactly when it hurts
+        try:
+            lease = ADMISSION.acquire(endpoint, timeout=0)
+        except AdmissionRejected as e:
+            raise HedgeSkipped(e.reason) from e
+        return attempt(HEDGE_MODEL, lease, cancelled)
     
-    for i, block in enumerate(question_blocks):
+    def fetch():
+        # Queue wait for a slot is measured by ADMISSION_WAIT, not as upstream latency
+        lease = acquire_upstream(endpoint)
         try:
-            block = block.strip()
-            if len(block) < 30:  # Too short to be valid
-                continue
-            
-            # Pre-process: handle code blocks by marking them
-            code_blocks = {}
-            code_counter = 0
-            
-            def store_code(match):
-                nonlocal code_counter
-                key = f"__CODE_BLOCK_{code_counter}__"
-                code_blocks[key] = match.group(0)
-                code_counter += 1
-                return key
-            
-            # Temporarily replace code blocks
-            block_processed = re.sub(r'```[\s\S]*?```', store_code, block)
-            block_processed = re.sub(r'`[^`]+`', store_code, block_processed)
-            
-            lines = [line.strip() for line in block_processed.split('\n') if line.strip()]
-            if not lines:
-                continue
-            
-            # Extract question text - accumulate until we hit options
-            question_lines = []
-            options_start_idx = 0
-            in_question = True
-            
-            for idx, line in enumerate(lines):
-                if not line:
-                    continue
-                
-                # Check if this is an option line (more strict check)
-                is_option = bool(re.match(r'^[A-D][\.\)]\s+\S', line)) or \
-                           bool(re.match(r'^\([A-D]\)\s+\S', line)) or \
-                           bool(re.match(r'^[A-D]:\s+\S', line))
-                
-                is_metadata = bool(re.match(r'^(Correct|Answer|Explanation|Reason)[\s:]', line, re.IGNORECASE))
-                
-                if is_option or is_metadata:
-                    in_question = False
-                    if is_option and options_start_idx == 0:
-                        options_start_idx = idx
-                    break
-                
-                if in_question and len(line) > 5:
-                    # Restore code blocks in question text
-                    for key, code in code_blocks.items():
-                        line = line.replace(key, code)
-                    question_lines.append(line)
-            
-            # Restore code blocks in all lines for option processing
-            def restore_codes(line):
-                for key, code in code_blocks.items():
-                    line = line.replace(key, code)
-                return line
-            
-            lines = [restore_codes(line) for line in lines]
-            
-            # Construct question text
-            if question_lines:
-                question_text = ' '.join(question_lines).strip()
-                # Clean up: remove "Question X:" prefix if still present
-                question_text = re.sub(r'^Question\s*\d+\s*[\.:\)]\s*', '', question_text, flags=re.IGNORECASE)
-                question_text = re.sub(r'^Q\s*\d+\s*[\.:\)]\s*', '', question_text, flags=re.IGNORECASE)
-            else:
-                question_text = lines[0][:200] if lines else "Unknown Question"
-                options_start_idx = 1
-            
-            # Validate question text
-            if len(question_text) < 10 or question_text.lower() in ['question', 'q']:
-                continue
-            
-            # Parse options with strict patterns
-            options = {}
-            correct = None
-            explanation_lines = []
-            
-            option_patterns = [
-                r'^([A-D])[\.]\s*(.+)$',      # A. text
-                r'^([A-D])[\)]\s*(.+)$',       # A) text  
-                r'^\(([A-D])\)\s*(.+)$',       # (A) text
-                r'^([A-D]):\s*(.+)$',          # A: text
-                r'^([A-D])\s+(.+)$',           # A text (space separated)
-            ]
-            
-            parsing_options = True
-            
-            for line in lines[options_start_idx:]:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Try to match option (only if we haven't found 4 options yet)
-                if parsing_options and len(options) < 4:
-                    matched = False
-                    for pattern in option_patterns:
-                        match = re.match(pattern, line, re.IGNORECASE)
-                        if match:
-                            key, value = match.groups()
-                            key = key.upper()
-                            
-                            # Clean up value - stop at metadata markers
-                            value = re.split(r'\s+(?:Correct|Answer|Explanation|Reason)[\s:]', value, flags=re.IGNORECASE)[0]
-                            value = value.strip()
-                            
-                            if key not in options and len(value) > 0:
-                                options[key] = value[:150]
-                                matched = True
-                                break
-                    
-                    if matched:
-                        continue
-                    else:
-                        if len(options) > 0:
-                            parsing_options = False
-                
-                # Look for correct answer
-                correct_match = re.search(r'(?:Correct|Answer)[\s:]+([A-D])', line, re.IGNORECASE)
-                if correct_match:
-                    correct = correct_match.group(1).upper()
-                    continue
-                
-                # Look for explanation start
-                expl_match = re.match(r'(?:Explanation|Reason)[\s:]+(.+)', line, re.IGNORECASE)
-                if expl_match:
-                    explanation_lines.append(expl_match.group(1).strip())
-                    continue
-                
-                # Continue explanation if we're in explanation mode
-                if explanation_lines and not re.match(r'^[A-D][\.\)]', line):
-                    explanation_lines.append(line)
-            
-            # Build explanation
-            explanation = ' '.join(explanation_lines).strip() if explanation_lines else ""
-            
-            # Validation - CRITICAL: Must have at least 2 options
-            if len(options) < 2:
-                print(f"WARNING: Block {i} has only {len(options)} options, skipping")
-                continue
-            
-            # Fill missing options
-            if len(options) < 4:
-                print(f"WARNING: Question {i+1} missing options, filling placeholders")
-                for key in ['A', 'B', 'C', 'D']:
-                    if key not in options:
-                        options[key] = f"Option {key}"
-            
-            # Validate correct answer
-            if not correct or correct not in options:
-                inferred = re.search(r'\boption\s+([A-D])\b', explanation, re.IGNORECASE)
-                if inferred and inferred.group(1).upper() in options:
-                    correct = inferred.group(1).upper()
-                    print(f"Inferred correct answer {correct} from explanation")
-                else:
-                    print(f"WARNING: Question {i+1}: No valid correct answer, defaulting to A")
-                    correct = 'A'
-            
-            if not explanation:
-                explanation = f"The correct answer is {correct}. Review the related concepts to understand why."
-            
-            question_text = question_text[:1000].strip()
-            
-            questions.append({
-                'question': question_text[:1000].strip(),  # Remove html.escape()
-                'options': {
-                    'A': options.get('A', 'Option A')[:120],  # Remove html.escape()
-                    'B': options.get('B', 'Option B')[:120],
-                    'C': options.get('C', 'Option C')[:120],
-                    'D': options.get('D', 'Option D')[:120]
-                },
-                'correct': correct,
-                'explanation': explanation[:350]  # Remove html.escape()
-            })
-            
-        except Exception as e:
-            print(f"ERROR parsing question block {i}: {e}")
-            continue
+            content = HEDGER.run(endpoint, lambda cancelled: attempt(OPENROUTER_MODEL, lease, cancelled), backup)
+        except OpenRouterError as e:
+            logger.error("OpenRouter API error: %s", e, extra={'endpoint': endpoint})
+            return None
+        if use_cache:
+            LLM_CACHE.set(cache_key, content, endpoint)
+        return content
     
-    return questions
+    if not coalesce:
+        return fetch()
+    # Identical concurrent prompts (e.g. a whole class opening one quiz) share one upstream call
+    return SINGLE_FLIGHT.do(f"{endpoint}:{cache_key}", fetch)
 
-def generate_quiz_with_llm(topic_id, difficulty='mixed', num_questions=5):
-    """Generate quiz using OpenRouter OpenAI GPT-OSS-120B"""
-    topic = get_topic_by_id(topic_id)
-    if not topic:
-        return None
+def stream_openrouter(prompt, temperature=0.9, max_tokens=7000, endpoint='default'):
+    """Yield completion text chunks as OpenRouter streams them (cache hits yield once)"""
+    cache_key = make_cache_key(OPENROUTER_MODEL, SYSTEM_PROMPT, prompt, temperature, max_tokens)
+    cached = LLM_CACHE.get(cache_key, endpoint)
+    if cached is not None:
+        LLM_REQUESTS.inc(endpoint=endpoint, outcome='cache_hit')
+        yield cached
+        return
     
-    template = QUIZ_TEMPLATES['templates'].get(topic_id, {})
-    prompt_template = template.get('prompt_template', 
-        f"Generate {{count}} multiple choice questions about {{difficulty}} level {topic['title']}.")
+    # Raw chunks are only kept so the finished answer can be cached
+    chunks = []
+    usage = {}
+    try:
+        with admitted(endpoint):
+            started = time.perf_counter()
+            for delta in OPENROUTER.stream(openrouter_payload(prompt, temperature, max_tokens), usage=usage):
+                chunks.append(delta)
+                yield delta
+    except GeneratorExit:
+        record_llm_call(endpoint, 'cancelled', started, usage)
+        raise
+    except OpenRouterError as e:
+        record_llm_call(endpoint, 'circuit_open' if isinstance(e, CircuitOpenError) else 'error', started, usage)
+        raise
+    record_llm_call(endpoint, 'ok', started, usage)
     
-    subtopics_str = ', '.join([st['name'] for st in topic['subtopics']])
-    concepts_str = ', '.join([c for st in topic['subtopics'] for c in st['concepts'][:3]])
+    LLM_CACHE.set(cache_key, ''.join(chunks), endpoint)
+
+def record_llm_call(endpoint, outcome, started, usage):
+    duration = time.perf_counter() - started
+    LLM_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+    LLM_REQUEST_DURATION.observe(duration, endpoint=endpoint, outcome=outcome)
+    for kind in ('prompt', 'completion'):
+        tokens = usage.get(f'{kind}_tokens')
+        if isinstance(tokens, int) and tokens > 0:
+            LLM_TOKENS.inc(tokens, endpoint=endpoint, kind=kind)
+    logger.debug("LLM call finished", extra={'endpoint': endpoint, 'outcome': outcome,
+                                             'duration_ms': round(duration * 1000), 'usage': usage})
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def record_parse_stats(stats):
+    for outcome, count in stats.items():
+        if count:
+            QUIZ_PARSER_QUESTIONS.inc(count, outcome=outcome)
+    if stats['skipped'] or stats['placeholder_filled'] or stats['answer_defaulted']:
+        logger.warning("Quiz parser recovered from malformed questions", extra=stats)
+
+def parse_quiz_from_llm_response(text):
+    """Parse LLM response into structured quiz format - ROBUST PARSING"""
+    if not text or not isinstance(text, str):
+        logger.error("Empty or invalid text provided to quiz parser")
+        return []
     
-    prompt = f"""Generate exactly {num_questions} multiple choice questions about {topic['title']} at {difficulty} difficulty level.
+    stats = new_parse_stats()
+    questions = parse_quiz(text, stats)
+    record_parse_stats(stats)
+    return questions
 
-TOPICS TO COVER: {subtopics_str}
-KEY CONCEPTS: {concepts_str}
+def avoid_prompt(avoid):
+    if not avoid:
+        return ''
+    return "\nDo NOT repeat these questions:\n" + '\n'.join(f"- {q[:120]}" for q in avoid) + "\n"
+
+def build_quiz_prompt(topic, difficulty, num_questions, avoid=None):
+    
+    return f"""Generate exactly {num_questions} multiple choice questions about {topic.title} at {difficulty} difficulty level.
 
+TOPICS TO COVER: {topic.subtopics_str}
+KEY CONCEPTS: {topic.concepts_str}
+{avoid_prompt(avoid)}
 STRICT FORMAT FOR EACH QUESTION:
 
 Question 1: [Clear, specific question text here]
@@ -328,91 +396,570 @@ IMPORTANT RULES:
 9. Ensure options are complete sentences or code, not single words when possible
 
 Generate {num_questions} questions now following this exact format:"""
+
+def build_json_quiz_prompt(topic, difficulty, num_questions, avoid=None):
+    return f"""Generate exactly {num_questions} multiple choice questions about {topic.title} at {difficulty} difficulty level.
+
+TOPICS TO COVER: {topic.subtopics_str}
+KEY CONCEPTS: {topic.concepts_str}
+{avoid_prompt(avoid)}
+Reply with JSON only, no prose, in this shape:
+{{"questions": [{{"question": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct": "A", "explanation": "..."}}]}}
+
+RULES:
+1. Exactly 4 options keyed A, B, C, D; "correct" is one of those letters
+2. Questions should test understanding, not just memorization
+3. Put code in the question as a fenced block with \\n newlines where relevant
+4. Explanations are 1-2 sentences explaining why the correct answer is right"""
+
+def question_key(question):
+    """Normalized question text used to drop duplicates across retries and chunks"""
+    return re.sub(r'[\W_]+', ' ', question['question']).strip().lower()
+
+def generate_questions_json(topic, difficulty, num_questions, endpoint='quiz', progress=None, avoid=()):
+    """Structured-output generation; re-requests only the missing count.
     
-    response_text = call_openrouter(prompt, temperature=0.8, max_tokens=4000)
+    Returns None when the model answered but no answer held a usable question, so
+    the caller can try the text format. An upstream failure returns what was
+    collected (possibly []) without a second prompt on the failing upstream.
+    """
+    questions = []
+    seen = set()
+    
+    for attempt in range(1 + QUIZ_JSON_REPAIR_ATTEMPTS):
+        missing = num_questions - len(questions)
+        if missing <= 0:
+            break
+        if progress and attempt:
+            progress('generating')
+        prompt = build_json_quiz_prompt(topic, difficulty, missing,
+                                        avoid=list(avoid) + [q['question'] for q in questions])
+        response_text = call_openrouter(prompt, temperature=0.8, max_tokens=min(4000, 250 + 350 * missing),
+                                        endpoint=endpoint, response_format=RESPONSE_FORMAT, coalesce=False)
+        if not response_text:
+            return questions[:num_questions]
+        if progress:
+            progress('parsing')
+        
+        batch, invalid = extract_questions(response_text)
+        if not batch and attempt == 0:
+            # Model ignored the JSON contract; salvage the reply with the text parser
+            batch = parse_quiz_from_llm_response(response_text)
+        if invalid:
+            logger.warning("Structured quiz: dropped invalid question objects", extra={'invalid': invalid})
+        
+        for q in batch:
+            key = question_key(q)
+            if key not in seen:
+                seen.add(key)
+                questions.append(q)
+    
+    if not questions:
+        return None
+    return questions[:num_questions]
+
+def generate_question_chunk(topic, difficulty, num_questions, endpoint='quiz', progress=None, avoid=()):
+    """One completion's worth of questions; may return fewer than requested.
+    
+    `progress(stage)` is told when parsing starts; it may raise to abandon the chunk.
+    """
+    if QUIZ_GENERATION_MODE == 'json':
+        questions = generate_questions_json(topic, difficulty, num_questions, endpoint, progress, avoid)
+        if questions is not None:
+            return questions
+        logger.warning("Structured quiz answers held no usable questions, retrying in text mode")
+    
+    if progress:
+        progress('generating')
+    prompt = build_quiz_prompt(topic, difficulty, num_questions, avoid)
+    response_text = call_openrouter(prompt, temperature=0.8, max_tokens=4000, endpoint=endpoint, coalesce=False)
     
     if not response_text:
-        print("No response from LLM, using fallback")
-        return get_fallback_quiz(topic_id, difficulty, num_questions)
+        return []
+    if progress:
+        progress('parsing')
+    
+    return parse_quiz_from_llm_response(response_text)[:num_questions]
+
+def generate_questions_streamed(topic, difficulty, num_questions, on_question, endpoint='quiz', progress=None,
+                                avoid=()):
+    """Text-format questions from a streamed completion, each handed to on_question as soon as it is parsed"""
+    prompt = build_quiz_prompt(topic, difficulty, num_questions, avoid)
+    parser = IncrementalQuizParser()
+    seen = set()
+    
+    def deliver(batch):
+        for q in batch:
+            key = question_key(q)
+            if key not in seen and len(seen) < num_questions:
+                seen.add(key)
+                on_question(q)
+                if progress:
+                    progress(None)  # a cancelled job stops here, closing the upstream stream
+    
+    try:
+        for chunk in stream_openrouter(prompt, temperature=0.8, max_tokens=4000, endpoint=endpoint):
+            deliver(parser.feed(chunk))
+    except OpenRouterError as e:
+        # Keep what arrived before the failure; the caller pads the rest
+        logger.error("Streamed quiz generation failed: %s", e, extra={'delivered': len(seen)})
+    if progress:
+        progress('parsing')
+    deliver(parser.close())
+    record_parse_stats(parser.stats)
+
+def plan_quiz_chunks(topic, num_questions, chunk_size):
+    """Split a quiz into (focused topic, count) chunks with the subtopics dealt round-robin"""
+    num_chunks = -(-num_questions // chunk_size)
+    base, extra = divmod(num_questions, num_chunks)
+    subtopics = topic.subtopics
+    chunks = []
+    for i in range(num_chunks):
+        if len(subtopics) >= num_chunks:
+            subset = subtopics[i::num_chunks]
+        elif subtopics:
+            subset = (subtopics[i % len(subtopics)],)
+        else:
+            subset = ()
+        chunks.append((topic.focused_on(subset) if subset else topic, base + (1 if i < extra else 0)))
+    return chunks
+
+QUIZ_CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=QUIZ_CHUNK_WORKERS, thread_name_prefix='quiz-chunk')
+
+def generate_questions_chunked(topic, difficulty, num_questions, endpoint='quiz', progress=None, avoid=()):
+    """Run the chunks concurrently and merge them in plan order, dropping duplicates.
     
-    questions = parse_quiz_from_llm_response(response_text)
+    `progress` is only called from this thread: once per finished chunk, then 'parsing'.
+    """
+    chunks = plan_quiz_chunks(topic, num_questions, QUIZ_CHUNK_SIZE)
+    futures = {QUIZ_CHUNK_EXECUTOR.submit(generate_question_chunk, chunk_topic, difficulty, count, endpoint,
+                                          avoid=avoid): i
+               for i, (chunk_topic, count) in enumerate(chunks)}
+    results = [[] for _ in chunks]
+    try:
+        for future in as_completed(futures, timeout=QUIZ_CHUNK_TIMEOUT):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                logger.error("Quiz chunk failed: %s", e, extra={'chunk': futures[future] + 1, 'chunks': len(chunks)})
+            if progress:
+                progress(None)
+    except FutureTimeoutError:
+        late = [i + 1 for f, i in futures.items() if not f.done()]
+        logger.warning("Quiz chunks timed out", extra={'chunks': late, 'timeout': QUIZ_CHUNK_TIMEOUT})
+    finally:
+        for future in futures:
+            future.cancel()  # chunks still queued behind other requests never start
+    if progress:
+        progress('parsing')
+    
+    questions = []
+    seen = set()
+    for batch in results:
+        for q in batch:
+            key = question_key(q)
+            if key not in seen:
+                seen.add(key)
+                questions.append(q)
+    return questions[:num_questions]
+
+def generate_questions_with_llm(topic_id, difficulty, num_questions, endpoint='quiz', progress=None,
+                                on_question=None, avoid=()):
+    """Ask the LLM for questions and parse them; may return fewer than requested.
+    
+    In 'stream' mode questions given to `on_question` as they arrive are not returned as well.
+    The prompt asks the model not to repeat the question texts in `avoid`.
+    """
+    topic = get_topic_by_id(topic_id)
+    if not topic:
+        return []
+    
+    if QUIZ_GENERATION_MODE == 'stream':
+        # One stream rather than chunks: what matters here is the first question, not the last
+        questions = []
+        generate_questions_streamed(topic, difficulty, num_questions, on_question or questions.append,
+                                    endpoint, progress, avoid)
+        return questions
+    if num_questions > QUIZ_CHUNK_SIZE and QUIZ_CHUNK_WORKERS > 1:
+        return generate_questions_chunked(topic, difficulty, num_questions, endpoint, progress, avoid)
+    return generate_question_chunk(topic, difficulty, num_questions, endpoint, progress, avoid)
+
+def generate_quiz_with_llm(topic_id, difficulty='mixed', num_questions=5, user_id=None, progress=None,
+                           on_questions=None):
+    """Generate quiz using OpenRouter OpenAI GPT-OSS-120B.
+    
+    Banked questions this user has not seen come first; only the remainder is
+    taken from the pool or generated, and new questions are banked for others.
+    `progress(stage)` (background jobs) hears 'generating' / 'parsing' and may
+    raise to cancel. `on_questions(questions)` is called whenever questions are
+    added, before fallback padding; every list extends the previous one.
+    """
+    topic = get_topic_by_id(topic_id)
+    if not topic:
+        return None
+    
+    questions = []
+    if QUESTION_BANK_REUSE:
+        _, questions = QUESTION_BANK.assemble(topic_id, difficulty, num_questions, user_id)
+        if questions and on_questions:
+            on_questions(list(questions))
+    
+    banked = []
+    
+    def accept(q):
+        question_id = QUESTION_BANK.add(topic_id, difficulty, q)
+        # Near-duplicates of banked questions may already have been served to this user
+        if question_id is not None or not QUESTION_BANK_REUSE:
+            banked.append(question_id)
+            questions.append(q)
+            if on_questions and len(questions) <= num_questions:
+                on_questions(list(questions))
+    
+    missing = num_questions - len(questions)
+    if missing > 0:
+        fresh = QUIZ_POOL.take(topic_id, difficulty, missing) if QUIZ_POOL else None
+        if fresh is None:
+            if llm_available():
+                try:
+                    if user_id:
+                        check_rate_limit('quiz', user_id)
+                    # New questions, not ones the bank would reject as repeats
+                    avoid = QUESTION_BANK.recent_questions(topic_id, difficulty, QUIZ_AVOID_BANKED)
+                    fresh = generate_questions_with_llm(topic_id, difficulty, missing, progress=progress,
+                                                        on_question=accept, avoid=avoid)
+                except AdmissionRejected as e:
+                    logger.warning("Quiz generation not admitted, using fallback",
+                                   extra={'topic_id': topic_id, 'reason': e.reason})
+                    fresh = []
+            else:
+                logger.info("LLM unavailable (no key or circuit open), using fallback")
+                fresh = []
+        for q in fresh:
+            accept(q)
+        QUESTION_BANK.mark_seen(user_id, [i for i in banked if i is not None])
     
     if len(questions) < num_questions:
-        print(f"Only got {len(questions)} questions, using fallback for rest")
         if len(questions) == 0:
-            return get_fallback_quiz(topic_id, difficulty, num_questions)
-        # Pad with fallback questions
-        fallback = get_fallback_quiz(topic_id, difficulty, num_questions - len(questions))
-        if fallback:
-            questions.extend(fallback['questions'][:num_questions - len(questions)])
+            QUIZZES.inc(source='fallback')
+            return get_fallback_quiz(topic_id, difficulty, num_questions, user_id)
+        QUIZZES.inc(source='padded')
+        logger.warning("Quiz short of questions, padding with fallback",
+                       extra={'topic_id': topic_id, 'got': len(questions), 'wanted': num_questions})
+        # Pad with fallback questions, skipping any already in the quiz; only as many as are missing, since
+        # banked ones are marked as served to this user
+        fallback = get_fallback_quiz(topic_id, difficulty, num_questions - len(questions), user_id)
+        present = {question_key(q) for q in questions}
+        for q in fallback['questions']:
+            if len(questions) >= num_questions:
+                break
+            if question_key(q) not in present:
+                present.add(question_key(q))
+                questions.append(q)
+    else:
+        QUIZZES.inc(source='generated')
     
-    template_data = QUIZ_TEMPLATES['templates'].get(topic_id, {})
-    time_per_q = template_data.get('time_per_question', 3)
+    return build_llm_quiz(topic, difficulty, num_questions, questions)
+
+def build_llm_quiz(topic, difficulty, num_questions, questions):
+    template = CONTENT.snapshot.get_template(topic.id)
+    time_per_q = template.time_per_question if template else 3
     
     return {
-        'title': template_data.get('title', f"{topic['title']} Quiz"),
-        'description': f"AI-generated {difficulty} difficulty quiz on {topic['title']}",
+        'title': template.title if template and template.title else f"{topic.title} Quiz",
+        'description': f"AI-generated {difficulty} difficulty quiz on {topic.title}",
         'time_limit': num_questions * time_per_q,
         'questions': questions[:num_questions],
         'generated_at': datetime.now().isoformat(),
         'difficulty': difficulty
     }
 
-def get_fallback_quiz(topic_id, difficulty, num_questions):
-    """Get fallback quiz from templates"""
-    fallback = QUIZ_TEMPLATES['fallback_quizzes'].get(topic_id)
-    if not fallback:
-        # Generic fallback
-        return {
-            'title': f"{topic_id.replace('-', ' ').title()} Quiz",
-            'description': "Basic quiz on fundamental concepts",
-            'time_limit': num_questions * 3,
-            'questions': [
-                {
-                    'question': f'What is a key concept in {topic_id.replace("-", " ")}?',
-                    'options': {
-                        'A': 'Fundamental understanding required',
-                        'B': 'Advanced optimization technique',
-                        'C': 'Memory management strategy',
-                        'D': 'Algorithm design pattern'
-                    },
-                    'correct': 'A',
-                    'explanation': 'This tests basic conceptual understanding of the topic.'
-                }
-            ] * num_questions,
-            'generated_at': datetime.now().isoformat(),
-            'difficulty': difficulty,
-            'fallback': True
-        }
-    
-    questions = fallback['questions'][:num_questions]
-    # Duplicate if needed
-    while len(questions) < num_questions:
-        questions.extend(fallback['questions'][:num_questions - len(questions)])
+def get_fallback_quiz(topic_id, difficulty, num_questions, user_id=None):
+    """Offline quiz: a few curated template questions, then banked ones, then procedurally generated ones.
     
+    Banked questions already served to `user_id` are skipped, as in generated quizzes.
+    """
+    fallback = CONTENT.snapshot.fallback_quizzes.get(topic_id)
+    topic = get_topic_by_id(topic_id)
+    
+    questions = []
+    if fallback:
+        # Copies: the snapshot's question dicts are shared by every request. At most half the quiz is
+        # curated, so retaking an offline quiz is not the same quiz again.
+        curated = fallback['questions']
+        picked = random.sample(curated, min(len(curated), max(1, num_questions // 2)))
+        questions = [dict(q) for q in picked]
+    if len(questions) < num_questions:
+        _, banked = QUESTION_BANK.assemble(topic_id, difficulty, num_questions - len(questions), user_id)
+        questions.extend(banked)
+    if len(questions) < num_questions:
+        # Answers computed by running the algorithm on a random instance; unlimited and instant
+        present = {q['question'] for q in questions}
+        questions.extend(generate_offline_questions(topic_id, difficulty, num_questions - len(questions),
+                                                    exclude=present))
+    
+    if fallback:
+        title, description = fallback['title'], fallback['description']
+    else:
+        name = topic.title if topic else topic_id.replace('-', ' ').title()
+        title, description = f"{name} Quiz", f"Practice quiz on {name} (Offline Mode)"
     return {
-        'title': fallback['title'],
-        'description': fallback['description'] + " (Offline Mode)",
-        'time_limit': fallback.get('time_limit', num_questions * 3),
+        'title': title,
+        'description': description,
+        'time_limit': (fallback or {}).get('time_limit', num_questions * 3),
         'questions': questions[:num_questions],
         'generated_at': datetime.now().isoformat(),
         'difficulty': difficulty,
         'fallback': True
     }
 
+QUIZ_DIFFICULTIES = ['easy', 'medium', 'hard', 'mixed']
+
+# Background question pool (needs an API key; every refill is an LLM call)
+QUIZ_POOL = None
+if OPENROUTER_API_KEY and os.getenv('QUIZ_POOL_ENABLED', '1') == '1':
+    QUIZ_POOL = QuizPool(
+        os.getenv('QUIZ_POOL_PATH', os.path.join(app.instance_path, 'quiz_pool.sqlite3')),
+        lambda topic_id, difficulty, count: generate_questions_with_llm(topic_id, difficulty, count, endpoint='quiz-pool'),
+        lambda: [(t.id, d) for t in CONTENT.snapshot.topics for d in QUIZ_DIFFICULTIES],
+        low_water=int(os.getenv('QUIZ_POOL_LOW_WATER', 10)),
+        high_water=int(os.getenv('QUIZ_POOL_HIGH_WATER', 25)),
+        batch_size=int(os.getenv('QUIZ_POOL_BATCH_SIZE', 5))
+    )
+
+# Every generated question is banked (near-duplicates rejected) and reused across learners
+QUESTION_BANK = QuestionBank(
+    os.getenv('QUESTION_BANK_PATH', os.path.join(app.instance_path, 'question_bank.sqlite3')),
+    threshold=float(os.getenv('QUESTION_BANK_THRESHOLD', 0.6))
+)
+QUESTION_BANK_REUSE = os.getenv('QUESTION_BANK_REUSE', '1') == '1'
+# Most recently banked questions of the topic listed in the prompt as ones not to repeat
+QUIZ_AVOID_BANKED = int(os.getenv('QUIZ_AVOID_BANKED', 15))
+
+# In-progress quizzes live server-side; the cookie only holds session['quiz_id']
+QUIZ_STORE = create_quiz_store(
+    os.getenv('QUIZ_STORE_URL', 'sqlite:///' + os.path.join(app.instance_path, 'quiz_sessions.sqlite3')),
+    ttl=int(os.getenv('QUIZ_STORE_TTL', 6 * 3600))
+)
+
+# Best scores and the materialized top-K leaderboards, shared by all workers
+PROGRESS = ProgressStore(
+    os.getenv('PROGRESS_DB_PATH', os.path.join(app.instance_path, 'progress.sqlite3')),
+    top_k=int(os.getenv('LEADERBOARD_SIZE', 10))
+)
+
+def render_quiz_questions(quiz_data):
+    """Attach question_html once, at generation time; it is stored with the quiz"""
+    for q in quiz_data['questions']:
+        if 'question_html' not in q:
+            q['question_html'] = render_markdown(q['question'], QUESTION_EXTENSIONS)
+    return quiz_data
+
+def store_quiz(topic_id, quiz_data):
+    """Save a new quiz server-side and return its id; no request context needed"""
+    render_quiz_questions(quiz_data)
+    quiz_id = QUIZ_STORE.new_id()
+    QUIZ_STORE.put(quiz_id, {
+        'topic_id': topic_id,
+        'quiz_data': quiz_data,
+        'start_time': datetime.now().isoformat(),
+        'answers': {}
+    })
+    return quiz_id
+
+def record_delivered(quiz_id, count):
+    """Remember how many questions of a quiz this learner has been sent; a streaming quiz is graded on those"""
+    key = f"{quiz_id}:delivered"
+    record = QUIZ_STORE.get(key)
+    if record is None or record['count'] < count:
+        QUIZ_STORE.put(key, {'count': count})
+
+def set_session_quiz(quiz_id):
+    old_id = session.pop('quiz_id', None)
+    if old_id and old_id != quiz_id:
+        QUIZ_STORE.delete(old_id)
+    session['quiz_id'] = quiz_id
+
+def start_quiz_session(topic_id, quiz_data):
+    quiz_id = store_quiz(topic_id, quiz_data)
+    set_session_quiz(quiz_id)
+    return quiz_id
+
+def run_quiz_job(params, progress):
+    """Background quiz job body: generate, store, and return the quiz id.
+    
+    The quiz is stored (and the job's result published) as soon as it has a
+    question, marked 'streaming'; each later question is added to it, and the
+    quiz page fetches them from /api/quiz/stream.
+    """
+    topic_id, difficulty, num_questions = params['topic_id'], params['difficulty'], params['num_questions']
+    topic = get_topic_by_id(topic_id)
+    published = []
+    
+    def update_quiz(quiz_data):
+        record = QUIZ_STORE.get(published[0])
+        if record is None:
+            raise JobCancelled(published[0])  # already submitted (or expired): nobody needs the rest
+        record['quiz_data'] = render_quiz_questions(quiz_data)
+        QUIZ_STORE.put(published[0], record)
+    
+    def on_questions(questions):
+        partial = dict(build_llm_quiz(topic, difficulty, num_questions, questions),
+                       streaming=True, expected_questions=num_questions)
+        if published:
+            update_quiz(partial)
+        else:
+            published.append(store_quiz(topic_id, partial))
+            progress(None, result=published[0])
+    
+    try:
+        quiz_data = generate_quiz_with_llm(topic_id, difficulty, num_questions, user_id=params['user_id'],
+                                           progress=progress, on_questions=on_questions)
+    except JobCancelled:
+        record = QUIZ_STORE.get(published[0]) if published else None
+        if record is not None:
+            # Close the partial quiz so its page stops waiting for more questions
+            record['quiz_data'] = dict(record['quiz_data'], streaming=False)
+            QUIZ_STORE.put(published[0], record)
+        raise
+    if not quiz_data:
+        raise RuntimeError("Failed to generate quiz")
+    if not published:
+        return store_quiz(topic_id, quiz_data)
+    update_quiz(quiz_data)
+    return published[0]
+
+# Quiz generation runs as background jobs so page requests return at once; the job table is shared by
+# all workers, so status can be polled from any of them. Jobs nobody polls for QUIZ_JOB_ABANDON_AFTER
+# seconds are cancelled.
+QUIZ_JOBS = QuizJobs(
+    os.getenv('QUIZ_JOBS_PATH', os.path.join(app.instance_path, 'quiz_jobs.sqlite3')),
+    run_quiz_job,
+    workers=int(os.getenv('QUIZ_JOB_WORKERS', 4)),
+    abandon_after=float(os.getenv('QUIZ_JOB_ABANDON_AFTER', 60)),
+    stale_after=float(os.getenv('OPENROUTER_READ_TIMEOUT', 60)) * 5
+)
+QUIZ_JOB_POLL_INTERVAL = 0.5
+QUIZ_JOB_EVENTS_TIMEOUT = 60
+QUIZ_STREAM_POLL_INTERVAL = 0.25
+
+def submit_quiz_job(topic_id, difficulty, num_questions):
+    """Queue (or, for a repeated submission, find) this learner's quiz job"""
+    user_id = get_user_id()
+    params = {'topic_id': topic_id, 'difficulty': difficulty, 'num_questions': num_questions, 'user_id': user_id}
+    job, created = QUIZ_JOBS.submit(user_id, params, request.headers.get('Idempotency-Key'))
+    QUIZ_JOB_SUBMISSIONS.inc(outcome='created' if created else 'deduplicated')
+    return job
+
+def quiz_job_options(data):
+    """(difficulty, num_questions) from a form or JSON body; ValueError if either is invalid"""
+    difficulty = data.get('difficulty', 'mixed')
+    if difficulty not in QUIZ_DIFFICULTIES:
+        raise ValueError("Invalid difficulty")
+    num_questions = data.get('num_questions', 5)
+    try:
+        if isinstance(num_questions, (bool, float)):
+            raise TypeError(num_questions)
+        num_questions = int(num_questions)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid num_questions") from None
+    return difficulty, min(max(num_questions, 1), 20)
+
+def quiz_job_json(job):
+    data = {'id': job['id'], 'status': job['status'], 'topic_id': job['params']['topic_id'],
+            'status_url': url_for('quiz_job_status', job_id=job['id']),
+            'events_url': url_for('quiz_job_events', job_id=job['id'])}
+    if job['result'] and job['status'] not in ('failed', 'cancelled'):
+        # Also before 'done': a streamed quiz can be started once its first question is in
+        data['redirect'] = url_for('start_quiz_job', job_id=job['id'])
+    if job['error']:
+        data['error'] = job['error']
+    return data
+
+def get_own_job(job_id, touch=True):
+    """The learner's job, or None; `touch` records that its client is still waiting for it"""
+    job = QUIZ_JOBS.get(job_id, touch=touch)
+    if not job or job['owner'] != session.get('user_id'):
+        return None
+    return job
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json' or request.is_json
+
+def get_quiz_session():
+    quiz_id = session.get('quiz_id')
+    return QUIZ_STORE.get(quiz_id) if quiz_id else None
+
+def get_user_id():
+    """Anonymous per-browser learner id; imports progress from the old cookie format once"""
+    user_id = session.get('user_id')
+    if not user_id:
+        user_id = session['user_id'] = QUIZ_STORE.new_id()
+    legacy_progress = session.pop('quiz_progress', None)
+    if legacy_progress:
+        for topic_id, p in legacy_progress.items():
+            PROGRESS.record_attempt(user_id, get_user_name(user_id), topic_id, p.get('score', 0),
+                                    p.get('correct', 0), p.get('total', 0), p.get('difficulty', 'mixed'))
+    return user_id
+
+def get_user_name(user_id):
+    return f"Learner {user_id[:6]}"
+
+def get_user_progress():
+    return PROGRESS.get_progress(get_user_id())
+
+# Fingerprinted, precompressed CSS/JS (built by `python static_assets.py`)
+ASSETS = StaticAssets(app.static_folder)
+app.jinja_env.globals['asset_url'] = ASSETS.url
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    return ASSETS.send(filename)
+
+def templates_version():
+    """Hash of the template sources, identical across workers of one deploy"""
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(app.template_folder)):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+# Pages depend only on these, the content version and (for some) the learner's progress
+PAGE_VERSION = f"{templates_version()}:{ASSETS.version}"
+
+# Rendered user-independent fragments, keyed by content version
+FRAGMENTS = FragmentCache()
+CONTENT.on_reload(lambda snapshot: FRAGMENTS.clear())
+
+def progress_fingerprint(progress):
+    return json.dumps(progress, sort_keys=True)
+
 @app.route('/')
 def index():
-    quiz_progress = session.get('quiz_progress', {})
-    return render_template('index.html', topics=DSA_CONTENT['topics'], quiz_progress=quiz_progress)
+    quiz_progress = get_user_progress()
+    snapshot = CONTENT.snapshot
+    etag = make_etag('index', PAGE_VERSION, snapshot.version, progress_fingerprint(quiz_progress))
+    return conditional_page(etag, lambda: render_template(
+        'index.html', topics=snapshot.topics, quiz_progress=quiz_progress))
 
 @app.route('/topic/<topic_id>')
 def topic(topic_id):
-    topic_data = get_topic_by_id(topic_id)
+    snapshot = CONTENT.snapshot
+    topic_data = snapshot.get_topic(topic_id)
     if not topic_data:
         return "Topic not found", 404
     
-    quiz_score = session.get('quiz_progress', {}).get(topic_id, None)
-    return render_template('topic.html', topic=topic_data, quiz_score=quiz_score)
+    quiz_score = get_user_progress().get(topic_id)
+    etag = make_etag('topic', topic_id, PAGE_VERSION, snapshot.version, progress_fingerprint(quiz_score))
+    
+    def render():
+        subtopics_html = FRAGMENTS.get_or_render(
+            ('topic_subtopics', snapshot.version, topic_id),
+            lambda: Markup(render_template('partials/topic_subtopics.html', topic=topic_data)))
+        return render_template('topic.html', topic=topic_data, quiz_score=quiz_score,
+                               subtopics_html=subtopics_html)
+    
+    return conditional_page(etag, render)
 
 @app.route('/generate-quiz/<topic_id>', methods=['GET', 'POST'])
 def generate_quiz_page(topic_id):
@@ -421,51 +968,38 @@ def generate_quiz_page(topic_id):
         return "Topic not found", 404
     
     if request.method == 'POST':
-        difficulty = request.form.get('difficulty', 'mixed')
-        num_questions = int(request.form.get('num_questions', 5))
-        
-        quiz_data = generate_quiz_with_llm(topic_id, difficulty, num_questions)
-        
-        if not quiz_data:
-            return "Failed to generate quiz", 500
-        
-        session['current_quiz'] = {
-            'topic_id': topic_id,
-            'quiz_data': quiz_data,
-            'start_time': datetime.now().isoformat(),
-            'answers': {}
-        }
+        try:
+            difficulty, num_questions = quiz_job_options(request.form)
+        except ValueError as e:
+            return (jsonify({'error': str(e)}), 400) if wants_json() else (str(e), 400)
         
-        return redirect(url_for('take_quiz', topic_id=topic_id))
+        job = submit_quiz_job(topic_id, difficulty, num_questions)
+        if wants_json():
+            return jsonify(quiz_job_json(job)), 202
+        # Without JavaScript: the generate page picks the job up and waits on it
+        return redirect(url_for('generate_quiz_page', topic_id=topic_id, job=job['id']))
     
-    return render_template('generate_quiz.html', topic=topic_data)
+    job = get_own_job(request.args['job']) if request.args.get('job') else None
+    if job and job['result'] and job['status'] not in ('failed', 'cancelled'):
+        return redirect(url_for('start_quiz_job', job_id=job['id']))
+    return render_template('generate_quiz.html', topic=topic_data,
+                           quiz_score=get_user_progress().get(topic_id),
+                           job=quiz_job_json(job) if job else None)
 
 @app.route('/quiz/<topic_id>')
 def take_quiz(topic_id):
-    quiz_session = session.get('current_quiz')
+    quiz_session = get_quiz_session()
     
     if not quiz_session or quiz_session.get('topic_id') != topic_id:
-        quiz_data = generate_quiz_with_llm(topic_id, 'mixed', 5)
-        if not quiz_data:
-            return "Failed to generate quiz", 500
-        
-        session['current_quiz'] = {
-            'topic_id': topic_id,
-            'quiz_data': quiz_data,
-            'start_time': datetime.now().isoformat(),
-            'answers': {}
-        }
-        quiz_session = session['current_quiz']
+        if not get_topic_by_id(topic_id):
+            return "Topic not found", 404
+        job = submit_quiz_job(topic_id, 'mixed', 5)
+        return redirect(url_for('generate_quiz_page', topic_id=topic_id, job=job['id']))
     
-    quiz_data = quiz_session['quiz_data']
+    quiz_data = render_quiz_questions(quiz_session['quiz_data'])
     topic_data = get_topic_by_id(topic_id)
-
-    for q in quiz_data['questions']:
-        q['question_html'] = markdown.markdown(q['question'], extensions=['fenced_code', 'nl2br'])
-    
-    # DEBUG: Print quiz data
-    for i, q in enumerate(quiz_data['questions']):
-        print(f"Q{i+1}: {q['question'][:50]}... Options: {list(q['options'].keys())}")
+    if quiz_data.get('streaming'):
+        record_delivered(session['quiz_id'], len(quiz_data['questions']))
     
     return render_template('quiz.html', 
                          topic=topic_data, 
@@ -477,22 +1011,33 @@ def submit_quiz():
     data = request.json
     user_answers = data.get('answers', {})
     
-    print(f"Received answers: {user_answers}")  # Debug
-    
-    quiz_session = session.get('current_quiz')
+    quiz_id = session.pop('quiz_id', None)
+    quiz_session = QUIZ_STORE.pop(quiz_id) if quiz_id else None
     if not quiz_session:
         return jsonify({'error': 'No active quiz session'}), 400
     
     quiz_data = quiz_session['quiz_data']
     questions = quiz_data['questions']
     topic_id = quiz_session['topic_id']
+    session.pop('quiz_job_id', None)
+    
+    # A quiz still streaming is graded on the questions the server sent, not on ones still arriving.
+    # A page reporting fewer is a partial submission: the rest count as unanswered, the total stays.
+    sent = QUIZ_STORE.pop(f"{quiz_id}:delivered")
+    answerable = len(questions)
+    if quiz_data.get('streaming'):
+        questions = questions[:sent['count'] if sent else len(questions)]
+        answerable = len(questions)
+        delivered = data.get('delivered')
+        if isinstance(delivered, int) and not isinstance(delivered, bool) and 0 <= delivered < answerable:
+            answerable = delivered
     
     
     correct_count = 0
     results = []
     
     for i, question in enumerate(questions):
-        user_answer = user_answers.get(str(i), '').upper()
+        user_answer = user_answers.get(str(i), '').upper() if i < answerable else ''
         correct_answer = question['correct'].upper()
         is_correct = user_answer == correct_answer
         
@@ -512,24 +1057,10 @@ def submit_quiz():
     score = (correct_count / len(questions)) * 100 if questions else 0
     passed = score >= 70
     
-    quiz_progress = session.get('quiz_progress', {})
-    prev_best = quiz_progress.get(topic_id, {}).get('score', 0)
-    
-    if topic_id not in quiz_progress or score > prev_best:
-        quiz_progress[topic_id] = {
-            'score': round(score, 1),
-            'correct': correct_count,
-            'total': len(questions),
-            'passed': passed,
-            'last_attempt': datetime.now().isoformat(),
-            'difficulty': quiz_data.get('difficulty', 'mixed')
-        }
-        session['quiz_progress'] = quiz_progress
-        improved = score > prev_best
-    else:
-        improved = False
-    
-    session.pop('current_quiz', None)
+    user_id = get_user_id()
+    prev_best, improved = PROGRESS.record_attempt(
+        user_id, get_user_name(user_id), topic_id, score, correct_count, len(questions),
+        quiz_data.get('difficulty', 'mixed'))
     
     return jsonify({
         'score': round(score, 1),
@@ -537,7 +1068,7 @@ def submit_quiz():
         'total': len(questions),
         'passed': passed,
         'improved': improved,
-        'previous_best': prev_best if topic_id in quiz_progress else 0,
+        'previous_best': prev_best or 0,
         'results': results,
         'topic_id': topic_id,
         'generated_at': quiz_data.get('generated_at'),
@@ -546,42 +1077,149 @@ def submit_quiz():
 
 @app.route('/api/regenerate-quiz', methods=['POST'])
 def regenerate_quiz():
-    data = request.json
+    data = request.get_json(silent=True) or {}
     topic_id = data.get('topic_id')
-    difficulty = data.get('difficulty', 'mixed')
-    num_questions = data.get('num_questions', 5)
     
     if not topic_id:
         return jsonify({'error': 'Topic ID required'}), 400
+    if not get_topic_by_id(topic_id):
+        return jsonify({'error': 'Topic not found'}), 404
+    try:
+        difficulty, num_questions = quiz_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    quiz_data = generate_quiz_with_llm(topic_id, difficulty, num_questions)
-    
-    if not quiz_data:
-        return jsonify({'error': 'Failed to generate quiz'}), 500
-    
-    session['current_quiz'] = {
-        'topic_id': topic_id,
-        'quiz_data': quiz_data,
-        'start_time': datetime.now().isoformat(),
-        'answers': {}
-    }
+    job = submit_quiz_job(topic_id, difficulty, num_questions)
     
     return jsonify({
         'success': True,
-        'redirect': f'/quiz/{topic_id}'
+        'job': quiz_job_json(job),
+        'redirect': url_for('generate_quiz_page', topic_id=topic_id, job=job['id'])
     })
 
-@app.route('/api/explain', methods=['POST'])
-def explain_concept():
-    data = request.json
-    concept = data.get('concept', '')
-    context = data.get('context', '')
-    difficulty = data.get('difficulty', 'beginner')
+@app.route('/api/quiz-jobs', methods=['POST'])
+def create_quiz_job():
+    data = request.get_json(silent=True) or {}
+    topic_id = data.get('topic_id')
+    if not get_topic_by_id(topic_id):
+        return jsonify({'error': 'Topic not found'}), 404
+    try:
+        difficulty, num_questions = quiz_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if not OPENROUTER_API_KEY:
-        return jsonify({'error': 'AI service not configured'}), 503
+    job = submit_quiz_job(topic_id, difficulty, num_questions)
+    return jsonify(quiz_job_json(job)), 202
+
+@app.route('/api/quiz-jobs/<job_id>')
+def quiz_job_status(job_id):
+    job = get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(quiz_job_json(job))
+
+@app.route('/api/quiz-jobs/<job_id>/events')
+def quiz_job_events(job_id):
+    """Server-sent status events until the job finishes; each poll also counts as the client being present"""
+    job = get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        last = None
+        deadline = time.time() + QUIZ_JOB_EVENTS_TIMEOUT
+        current = job
+        while True:
+            if current is None:
+                yield sse_event('error', {'error': 'Job not found'})
+                return
+            if current['status'] != last:
+                last = current['status']
+                yield sse_event('status', quiz_job_json(current))
+            if current['status'] in QUIZ_JOB_TERMINAL:
+                return
+            if time.time() > deadline:
+                # The client reconnects (EventSource does so by itself) and resumes from the current status
+                yield sse_event('timeout', {})
+                return
+            time.sleep(QUIZ_JOB_POLL_INTERVAL)
+            current = QUIZ_JOBS.get(job_id, touch=True)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/quiz-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_quiz_job(job_id):
+    job = get_own_job(job_id, touch=False)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    cancelled = QUIZ_JOBS.cancel(job_id, job['owner'])
+    return jsonify({'id': job_id, 'cancelled': cancelled})
+
+@app.route('/quiz-jobs/<job_id>')
+def start_quiz_job(job_id):
+    """Make a finished job's quiz the learner's current quiz"""
+    job = get_own_job(job_id, touch=False)
+    if not job:
+        return "Quiz job not found", 404
+    topic_id = job['params']['topic_id']
+    if not job['result'] or job['status'] in ('failed', 'cancelled'):
+        return redirect(url_for('generate_quiz_page', topic_id=topic_id, job=job_id))
+    
+    quiz_id = QUIZ_JOBS.consume(job_id, job['owner'])
+    if quiz_id:
+        set_session_quiz(quiz_id)
+        # The quiz page's question stream keeps a still-running job from being abandoned
+        session['quiz_job_id'] = job_id
+    elif session.get('quiz_id') != job['result']:
+        # Already taken (e.g. submitted, then the back button); generate a fresh one
+        return redirect(url_for('generate_quiz_page', topic_id=topic_id))
+    return redirect(url_for('take_quiz', topic_id=topic_id))
+
+@app.route('/api/quiz/stream')
+def quiz_stream():
+    """Server-sent questions of the current quiz from index `from` on, as they are generated"""
+    quiz_id = session.get('quiz_id')
+    if not quiz_id:
+        return jsonify({'error': 'No active quiz session'}), 404
+    job_id = session.get('quiz_job_id')
+    start = request.args.get('from', 0, type=int)
+    
+    def generate():
+        sent = start
+        deadline = time.time() + QUIZ_JOB_EVENTS_TIMEOUT
+        while True:
+            record = QUIZ_STORE.get(quiz_id)
+            if record is None:
+                yield sse_event('done', {'total': sent})
+                return
+            quiz_data = record['quiz_data']
+            questions = quiz_data['questions']
+            for idx in range(sent, len(questions)):
+                fragment = render_template('partials/quiz_question.html', question=questions[idx],
+                                           question_idx=idx, is_first=idx == 0, is_last=False)
+                record_delivered(quiz_id, idx + 1)
+                yield sse_event('question', {'index': idx, 'html': fragment})
+            sent = max(sent, len(questions))
+            if not quiz_data.get('streaming'):
+                yield sse_event('done', {'total': len(questions)})
+                return
+            if time.time() > deadline:
+                yield sse_event('timeout', {'total': sent})
+                return
+            time.sleep(QUIZ_STREAM_POLL_INTERVAL)
+            if job_id:
+                QUIZ_JOBS.get(job_id, touch=True)
     
-    prompt = f"""
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/quiz-jobs/stats')
+def quiz_job_stats():
+    return jsonify(QUIZ_JOBS.stats())
+
+def build_explain_prompt(concept, context, difficulty):
+    return f"""
     You are an expert DSA instructor teaching a {difficulty}-level student.
     
     Topic: {concept}
@@ -607,32 +1245,115 @@ def explain_concept():
     |---------|---------|
     | Value1  | Value2  |
     """
+
+@app.route('/api/explain', methods=['POST'])
+def explain_concept():
+    data = request.json
+    concept = data.get('concept', '')
+    context = data.get('context', '')
+    difficulty = data.get('difficulty', 'beginner')
     
-    response_text = call_openrouter(prompt, temperature=0.7, max_tokens=8000)
+    if not OPENROUTER_API_KEY:
+        return jsonify({'error': 'AI service not configured'}), 503
+    if not llm_available():
+        return jsonify({'error': 'AI service temporarily unavailable'}), 503
+    
+    prompt = build_explain_prompt(concept, context, difficulty)
+    try:
+        check_rate_limit('explain')
+        response_text = call_openrouter(prompt, temperature=0.7, max_tokens=8000, endpoint='explain')
+    except AdmissionRejected as e:
+        return busy_response(e)
     
     if not response_text:
         return jsonify({'error': 'Failed to get AI explanation'}), 500
     
-    explanation = markdown.markdown(response_text, extensions=['tables', 'fenced_code'])
+    explanation = render_markdown(response_text)
     return jsonify({'explanation': explanation})
 
-@app.route('/api/code-help', methods=['POST'])
-def code_help():
+@app.route('/api/explain/stream', methods=['POST'])
+def explain_concept_stream():
+    """SSE variant of /api/explain: one `html` event per completed markdown block"""
     data = request.json
-    code = data.get('code', '')
-    language = data.get('language', 'python')
-    issue = data.get('issue', '')
+    concept = data.get('concept', '')
+    context = data.get('context', '')
+    difficulty = data.get('difficulty', 'beginner')
     
     if not OPENROUTER_API_KEY:
         return jsonify({'error': 'AI service not configured'}), 503
+    if not llm_available():
+        return jsonify({'error': 'AI service temporarily unavailable'}), 503
     
-    prompt = f"""
-    You are a code reviewer and debugging assistant. Analyze the following {language} code:
+    try:
+        check_rate_limit('explain')
+    except AdmissionRejected as e:
+        return busy_response(e)
+    
+    prompt = build_explain_prompt(concept, context, difficulty)
     
-    ```{language}
+    def generate():
+        renderer = MarkdownStreamRenderer(extensions=['tables', 'fenced_code'])
+        # Flush headers immediately so the client sees the first byte at once
+        yield ": stream open\n\n"
+        try:
+            for chunk in stream_openrouter(prompt, temperature=0.7, max_tokens=8000, endpoint='explain'):
+                for block_html in renderer.feed(chunk):
+                    yield sse_event('html', {'html': block_html})
+            tail = renderer.close()
+            if tail:
+                yield sse_event('html', {'html': tail})
+            yield sse_event('done', {})
+        except AdmissionRejected as e:
+            yield sse_event('error', {'error': 'AI service is busy, please try again shortly',
+                                      'retry_after': max(1, math.ceil(e.retry_after))})
+        except Exception as e:
+            logger.error("OpenRouter streaming error: %s", e, extra={'endpoint': 'explain'})
+            yield sse_event('error', {'error': 'Failed to get AI explanation'})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Code help input limits: longer code is cut to whole lines (and the model told so); past the hard limit it is refused
+CODE_HELP_MAX_CHARS = int(os.getenv('CODE_HELP_MAX_CHARS', 12000))
+CODE_HELP_MAX_LINES = int(os.getenv('CODE_HELP_MAX_LINES', 400))
+CODE_HELP_HARD_LIMIT = int(os.getenv('CODE_HELP_HARD_LIMIT', 100000))
+CODE_HELP_ISSUE_MAX_CHARS = int(os.getenv('CODE_HELP_ISSUE_MAX_CHARS', 1000))
+
+@app.route('/api/code-help', methods=['POST'])
+def code_help():
+    data = request.get_json(silent=True) or {}
+    code = str(data.get('code') or '')
+    language = normalize_language(data.get('language'))
+    issue = ' '.join(str(data.get('issue') or '').split())[:CODE_HELP_ISSUE_MAX_CHARS]
+    
+    if not code.strip():
+        return jsonify({'error': 'No code submitted'}), 400
+    if len(code) > CODE_HELP_HARD_LIMIT:
+        return jsonify({'error': f'Code is too long (limit {CODE_HELP_HARD_LIMIT} characters)'}), 413
+    code, dropped_lines = truncate_code(code, CODE_HELP_MAX_CHARS, CODE_HELP_MAX_LINES)
+    
+    # Same code modulo formatting, comments and local names (and the same question) shares one analysis
+    fp = fingerprint(code, language, issue)
+    cache_key = f"code-fingerprint:{fp.digest}"
+    cached = LLM_CACHE.get(cache_key, 'code-help')
+    if cached is not None:
+        LLM_REQUESTS.inc(endpoint='code-help', outcome='cache_hit')
+    else:
+        if not OPENROUTER_API_KEY:
+            return jsonify({'error': 'AI service not configured'}), 503
+        if not llm_available():
+            return jsonify({'error': 'AI service temporarily unavailable'}), 503
+    
+    def analyze():
+        truncation_note = (f"\n    Note: the code was truncated; the last {dropped_lines} lines are omitted."
+                           if dropped_lines else '')
+        prompt = f"""
+    You are a code reviewer and debugging assistant. Analyze the following {fp.language} code:
+    
+    ```{fp.language}
     {code}
     ```
-    
+    {truncation_note}
     Issue/Question: {issue}
     
     Provide:
@@ -643,30 +1364,193 @@ def code_help():
     
     Be constructive and educational.
     """
+        analysis = call_openrouter(prompt, temperature=0.7, max_tokens=1500, endpoint='code-help', use_cache=False)
+        if not analysis:
+            return None
+        entry = json.dumps({'analysis': analysis, 'names': fp.names})
+        LLM_CACHE.set(cache_key, entry, 'code-help')
+        return entry
     
-    response_text = call_openrouter(prompt, temperature=0.7, max_tokens=1500)
-    
-    if not response_text:
+    try:
+        if cached is None:
+            check_rate_limit('code-help')
+        entry = cached or SINGLE_FLIGHT.do(f"code-help:{fp.digest}", analyze)
+    except AdmissionRejected as e:
+        return busy_response(e)
+    if not entry:
         return jsonify({'error': 'Failed to analyze code'}), 500
     
-    return jsonify({'analysis': markdown.markdown(response_text, extensions=['tables', 'fenced_code'])})
+    entry = json.loads(entry)
+    # The analysis was written against the first submitter's identifiers; show this submitter's
+    analysis = rename_in_code(entry['analysis'], dict(zip(entry['names'], fp.names)))
+    return jsonify({'analysis': render_markdown(analysis), 'truncated': bool(dropped_lines)})
+
+@app.route('/api/llm-cache/stats')
+def llm_cache_stats():
+    stats = LLM_CACHE.stats()
+    stats['coalescing'] = SINGLE_FLIGHT.stats()
+    stats['markdown'] = MARKDOWN_CACHE.stats()
+    return jsonify(stats)
+
+@app.route('/api/admission/stats')
+def admission_stats():
+    return jsonify(ADMISSION.stats())
+
+@app.route('/api/hedging/stats')
+def hedging_stats():
+    return jsonify({'model': OPENROUTER_MODEL, 'hedge_model': HEDGE_MODEL, 'endpoints': HEDGER.stats()})
+
+@app.route('/api/quiz-pool/stats')
+def quiz_pool_stats():
+    if not QUIZ_POOL:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'pools': QUIZ_POOL.sizes()})
+
+@app.route('/api/question-bank/stats')
+def question_bank_stats():
+    return jsonify(QUESTION_BANK.stats())
+
+PRACTICE_PAGE_SIZE = int(os.getenv('PRACTICE_PAGE_SIZE', 24))
+
+def build_practice_index(snapshot):
+    return PracticeIndex(snapshot.practice_problems, snapshot.version)
+
+def get_practice_index():
+    return CONTENT.snapshot.index('practice', build_practice_index)
 
 @app.route('/practice')
 def practice():
-    return render_template('practice.html', problems=DSA_CONTENT['practice_problems'])
+    index = get_practice_index()
+    
+    def render():
+        first_page = index.query(limit=PRACTICE_PAGE_SIZE)
+        return render_template('practice.html',
+                               problems=first_page['problems'],
+                               next_cursor=first_page['next_cursor'],
+                               total=first_page['total'],
+                               difficulty_counts=first_page['facets']['difficulty'],
+                               categories=index.categories,
+                               page_size=PRACTICE_PAGE_SIZE)
+    
+    # Nothing on this page is per-learner: the whole page is one cached fragment
+    return conditional_page(
+        make_etag('practice', PAGE_VERSION, index.version),
+        lambda: FRAGMENTS.get_or_render(('practice', index.version), render))
+
+@app.route('/api/practice')
+def practice_api():
+    """Filtered page of practice problems.
+    
+    Query args: category, difficulty, concept (repeatable, all must match),
+    q (title/concept substring), sort (id|title|difficulty), limit, cursor.
+    """
+    index = get_practice_index()
+    filters = [(facet, value) for facet in FACETS
+               for value in request.args.getlist(facet) if value and value != 'all']
+    limit = max(1, min(request.args.get('limit', PRACTICE_PAGE_SIZE, type=int), 100))
+    try:
+        page = index.query(filters,
+                           sort=request.args.get('sort', 'id'),
+                           limit=limit,
+                           cursor=request.args.get('cursor') or None,
+                           text=request.args.get('q', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    page['problems'] = [p._asdict() for p in page['problems']]
+    return jsonify(page)
+
+def get_search_index():
+    return CONTENT.snapshot.index('search', SearchIndex)
+
+@app.route('/api/search')
+def search():
+    query = request.args.get('q', '')[:200]
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    return jsonify({'query': query, 'results': get_search_index().search(query, limit)})
+
+@app.route('/api/autocomplete')
+def autocomplete():
+    prefix = request.args.get('q', '')[:100]
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+    response = jsonify({'query': prefix, 'suggestions': get_search_index().autocomplete(prefix, limit)})
+    # Keystroke-level and identical for everyone until the content changes
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
 
 @app.route('/leaderboard')
 def leaderboard():
-    mock_leaderboard = [
-        {'name': 'Alice', 'score': 95, 'topic': 'Arrays & Strings'},
-        {'name': 'Bob', 'score': 90, 'topic': 'Dynamic Programming'},
-        {'name': 'Charlie', 'score': 88, 'topic': 'Graphs'},
-    ]
-    return render_template('leaderboard.html', leaderboard=mock_leaderboard)
+    boards = PROGRESS.leaderboards()
+    snapshot = CONTENT.snapshot
+    topic_boards = [(t, boards[t.id]) for t in snapshot.topics if t.id in boards]
+    return render_template('leaderboard.html',
+                           overall=boards.get(OVERALL, []),
+                           topic_boards=topic_boards,
+                           user_id=session.get('user_id'))
+
+# Everything derived from the content, built ahead of the first request by create_app
+CONTENT_INDEXES = {'practice': build_practice_index, 'search': SearchIndex}
+
+MODULE_LOADED = time.perf_counter()
+STARTUP_REPORT = None
+
+def startup_report(content_started, content_loaded, indexed, warmed):
+    report = {
+        'imports_ms': round((IMPORTS_DONE - IMPORT_STARTED) * 1000, 1),
+        'module_init_ms': round((MODULE_LOADED - IMPORTS_DONE) * 1000, 1),
+        'content_ms': round((content_loaded - content_started) * 1000, 1),
+        'indexes_ms': round((indexed - content_loaded) * 1000, 1),
+        'templates_ms': round((warmed - indexed) * 1000, 1),
+        'total_ms': round((warmed - IMPORT_STARTED) * 1000, 1),
+        'content_source': CONTENT.loaded_from,
+        'pid': os.getpid(),
+    }
+    try:
+        import resource
+        report['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:  # Windows
+        pass
+    return report
+
+def create_app():
+    """Application factory for WSGI servers: gunicorn 'app:create_app()'.
+    
+    Loads the content, builds its indexes and compiles every template
+    before the first request. With
+    gunicorn --preload this runs once in the master and workers share the
+    result copy-on-write. The SQLite stores open a connection at import to
+    create their tables, but every process (and thread) reconnects on first
+    use, and lease owners include the pid; HTTP sessions and background
+    threads are only created per process, on first use.
+    """
+    global STARTUP_REPORT
+    if STARTUP_REPORT is None:
+        content_started = time.perf_counter()
+        snapshot = CONTENT.snapshot
+        content_loaded = time.perf_counter()
+        for name, build in CONTENT_INDEXES.items():
+            snapshot.index(name, build)
+        indexed = time.perf_counter()
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        STARTUP_REPORT = startup_report(content_started, content_loaded, indexed, time.perf_counter())
+        logger.info("App ready", extra=STARTUP_REPORT)
+    return app
+
+@app.route('/api/startup/stats')
+def startup_stats():
+    return jsonify(STARTUP_REPORT or {'ready': False})
+
+@app.cli.command('build-content')
+def build_content_command():
+    """Validate data/*.json and write the compiled content snapshot."""
+    header = CONTENT.compile(CONTENT_INDEXES)
+    print(f"Wrote {CONTENT.compiled_path} (content version {header['version']}, "
+          f"indexes: {', '.join(CONTENT_INDEXES)})")
 
 if __name__ == '__main__':
     os.makedirs('data', exist_ok=True)
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static/css', exist_ok=True)
     os.makedirs('static/js', exist_ok=True)
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
@@ -0,0 +1,55 @@
+"""Leveled, structured logging for the app and its helper modules.
+
+Modules log through `logging.getLogger(__name__)` and pass context as
+`extra={...}`; those fields are rendered as key=value pairs (LOG_FORMAT=text)
+or as JSON object keys (LOG_FORMAT=json, one object per line).
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={json.dumps(value, default=str)}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level='INFO', fmt='text'):
+    """Install one stderr handler on the root logger (replacing earlier ones)"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else KeyValueFormatter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
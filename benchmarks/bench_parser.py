@@ -0,0 +1,125 @@
+"""Quiz parser micro-benchmark and corpus check.
+
+Usage:
+    python benchmarks/bench_parser.py [--repeat N] [--batch-size N] [--json]
+
+Every benchmarks/corpus/*.txt response is parsed and compared with its
+*.expected.json, both whole and fed to IncrementalQuizParser in random-sized
+chunks as a stream would be; any difference fails the run (exit code 1). Parse time is
+then reported per KB for each corpus file and for one large synthetic batch
+(the corpus concatenated and renumbered), which is how pre-generated pools are
+parsed.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quiz_parser import IncrementalQuizParser, parse_quiz  # noqa: E402
+
+CORPUS_DIR = os.path.join(ROOT, 'benchmarks', 'corpus')
+
+
+def load_corpus():
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt'))):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        with open(path[:-4] + '.expected.json', 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        corpus.append((os.path.basename(path), text, expected))
+    return corpus
+
+
+def parse_streamed(text, rng):
+    parser = IncrementalQuizParser()
+    questions = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 64)
+        questions.extend(parser.feed(text[position:position + size]))
+        position += size
+    return questions + parser.close()
+
+
+def check_corpus(corpus, chunkings=50):
+    failures = []
+    rng = random.Random(0)
+    for name, text, expected in corpus:
+        if parse_quiz(text) != expected:
+            failures.append(name)
+        elif any(parse_streamed(text, rng) != expected for _ in range(chunkings)):
+            failures.append(f"{name} (streamed)")
+    return failures
+
+
+def build_batch(corpus, batch_size):
+    """Concatenate corpus responses into one response with ~batch_size questions"""
+    parts = []
+    number = 0
+    while number < batch_size:
+        for _, text, expected in corpus:
+            if not expected:
+                continue
+            renumbered = re.sub(r'(?m)^Question\s*\d+', lambda m: f"Question {number + 1}", text)
+            parts.append(renumbered.replace('\r\n', '\n'))
+            number += len(expected)
+    return '\n\n'.join(parts)
+
+
+def time_parse(text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_quiz(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='timing repetitions (best-of)')
+    parser.add_argument('--batch-size', type=int, default=500, help='questions in the synthetic batch')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable results')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    if failures:
+        print(f"Parser output differs from expected for: {', '.join(failures)}")
+        return 1
+
+    results = []
+    for name, text, expected in corpus:
+        seconds = time_parse(text, args.repeat)
+        kb = len(text.encode('utf-8')) / 1024
+        results.append({'name': name, 'kb': round(kb, 2), 'questions': len(expected),
+                         'us_per_kb': round(seconds * 1e6 / kb, 1)})
+
+    batch = build_batch(corpus, args.batch_size)
+    batch_seconds = time_parse(batch, max(1, args.repeat // 20))
+    batch_kb = len(batch.encode('utf-8')) / 1024
+    results.append({'name': f'batch-{args.batch_size}', 'kb': round(batch_kb, 2),
+                    'questions': len(parse_quiz(batch)),
+                    'us_per_kb': round(batch_seconds * 1e6 / batch_kb, 1)})
+
+    if args.json:
+        print(json.dumps({'corpus_ok': True, 'results': results}, indent=2))
+        return 0
+
+    print(f"Corpus: {len(corpus)} responses match expected output")
+    print(f"{'input':<36}{'KB':>8}{'questions':>11}{'us/KB':>10}")
+    for row in results:
+        print(f"{row['name']:<36}{row['kb']:>8}{row['questions']:>11}{row['us_per_kb']:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Throughput and uniqueness of the procedural (offline) question generator.
+
+Usage:
+    python benchmarks/bench_question_generator.py [--count 200] [--difficulty mixed] [--json]
+
+For every topic with generators, asks generate_questions() for --count
+questions and reports microseconds per question, how many distinct questions
+came back and whether every one is well formed (four distinct options, the
+correct letter among them). Exits non-zero on any malformed question.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_generator import GENERATORS, generate_questions  # noqa: E402
+
+
+def well_formed(question):
+    options = question['options']
+    return (sorted(options) == list('ABCD') and len(set(options.values())) == 4
+            and question['correct'] in options and question['question'] and question['explanation'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200, help='questions requested per topic')
+    parser.add_argument('--difficulty', default='mixed', choices=['easy', 'medium', 'hard', 'mixed'])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='emit machine-readable results')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    for topic_id in sorted(GENERATORS):
+        started = time.perf_counter()
+        questions = generate_questions(topic_id, args.difficulty, args.count, rng=rng)
+        elapsed = time.perf_counter() - started
+        results[topic_id] = {
+            'generators': len(GENERATORS[topic_id]),
+            'questions': len(questions),
+            'unique': len({q['question'] for q in questions}),
+            'malformed': sum(not well_formed(q) for q in questions),
+            'us_per_question': round(elapsed / max(1, len(questions)) * 1e6, 1),
+        }
+
+    malformed = sum(r['malformed'] for r in results.values())
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 1 if malformed else 0
+    print(f"{'topic':<22}{'generators':>11}{'questions':>11}{'unique':>8}{'malformed':>11}{'us/question':>13}")
+    for topic_id, row in results.items():
+        print(f"{topic_id:<22}{row['generators']:>11}{row['questions']:>11}{row['unique']:>8}"
+              f"{row['malformed']:>11}{row['us_per_question']:>13}")
+    return 1 if malformed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
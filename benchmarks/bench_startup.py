@@ -0,0 +1,90 @@
+"""Cold-start benchmark: time and memory to boot one app worker.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--json]
+
+Each run is a fresh interpreter that imports the app, calls create_app() and
+serves one page, as a gunicorn worker does without --preload. Runs alternate
+between the compiled content snapshot (built first, in a temp directory) and
+plain JSON parsing. The report is the median of the app's own startup timings
+(ms) plus the time for the first page and the worker's peak RSS after it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+
+WORKER = """
+import json, resource, sys, time
+import app
+client = app.create_app().test_client()
+started = time.perf_counter()
+client.get('/')
+report = dict(app.STARTUP_REPORT, first_page_ms=round((time.perf_counter() - started) * 1000, 1),
+              rss_after_first_page_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+              loaded_requests='requests' in sys.modules, loaded_markdown='markdown' in sys.modules)
+print(json.dumps(report))
+"""
+
+
+def boot(env):
+    output = subprocess.run([sys.executable, '-c', WORKER], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='cold boots per variant')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable results')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='algopro-startup-') as workdir:
+        env = dict(os.environ, LOG_LEVEL='WARNING', FLASK_SECRET_KEY='bench', QUIZ_POOL_ENABLED='0',
+                   CONTENT_SNAPSHOT_PATH=os.path.join(workdir, 'content_snapshot.pickle'),
+                   LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.sqlite3'),
+                   SINGLE_FLIGHT_PATH=os.path.join(workdir, 'singleflight.sqlite3'),
+                   ADMISSION_PATH=os.path.join(workdir, 'admission.sqlite3'),
+                   QUIZ_JOBS_PATH=os.path.join(workdir, 'quiz_jobs.sqlite3'),
+                   QUIZ_STORE_URL='sqlite:///' + os.path.join(workdir, 'quiz_sessions.sqlite3'),
+                   PROGRESS_DB_PATH=os.path.join(workdir, 'progress.sqlite3'),
+                   QUESTION_BANK_PATH=os.path.join(workdir, 'question_bank.sqlite3'),
+                   METRICS_DIR=os.path.join(workdir, 'metrics'))
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'build-content'], cwd=ROOT, env=env,
+                       check=True, capture_output=True)
+        boot(env)  # creates the SQLite files, so every measured run opens existing ones
+        variants = {'compiled': env, 'json': dict(env, CONTENT_SNAPSHOT_PATH=os.path.join(workdir, 'missing'))}
+        runs = {name: [] for name in variants}
+        for _ in range(args.runs):
+            for name, variant_env in variants.items():
+                runs[name].append(boot(variant_env))
+
+    results = {}
+    for name, reports in runs.items():
+        results[name] = {key: statistics.median(r[key] for r in reports)
+                         for key in ('imports_ms', 'module_init_ms', 'content_ms', 'indexes_ms', 'templates_ms',
+                                     'total_ms', 'first_page_ms', 'rss_after_first_page_mb')}
+        results[name]['loaded_requests'] = any(r['loaded_requests'] for r in reports)
+        results[name]['loaded_markdown'] = any(r['loaded_markdown'] for r in reports)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"Median of {args.runs} cold boots (import + create_app + GET /)")
+    print(f"{'content':<10}{'imports':>9}{'init':>8}{'content':>9}{'indexes':>9}{'templates':>11}{'total':>8}"
+          f"{'1st page':>10}{'RSS MB':>8}  lazily skipped")
+    for name, row in results.items():
+        skipped = [m for m in ('requests', 'markdown') if not row[f'loaded_{m}']]
+        print(f"{name:<10}{row['imports_ms']:>9}{row['module_init_ms']:>8}{row['content_ms']:>9}"
+              f"{row['indexes_ms']:>9}{row['templates_ms']:>11}{row['total_ms']:>8}{row['first_page_ms']:>10}"
+              f"{row['rss_after_first_page_mb']:>8}  {', '.join(skipped)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
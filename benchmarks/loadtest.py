@@ -0,0 +1,358 @@
+"""End-to-end load test against a local OpenRouter stub.
+
+Usage:
+    python benchmarks/loadtest.py [--users 20] [--duration 60] [--workers 4] [--threads 8]
+                                  [--mix quiz=3,explain=1] [--stub-latency lognormal:0.8,0.5]
+                                  [--stub-error-rate 0.02] [--stub-malformed-rate 0.1] [--quiz-mode stream]
+                                  [--json]
+
+Starts benchmarks/openrouter_stub.py and the app under gunicorn (--server dev
+uses Flask's threaded server where gunicorn is unavailable), with every
+SQLite store in a throwaway directory. Virtual users then loop over scripted
+journeys until --duration is up:
+
+    quiz     GET /, GET /topic/<id>, POST /generate-quiz/<id> (a background job), poll the job
+             until it can be taken ('quiz-ready'), GET /quiz-jobs/<job> -> /quiz/<id>, read
+             /api/quiz/stream to `done` if questions are still arriving ('quiz-complete', with
+             --quiz-mode stream), POST /api/submit-quiz
+    explain  a burst of --burst concurrent POST /api/explain calls (a few repeated concepts)
+    stream   POST /api/explain/stream, read to the `done` event
+
+The report lists throughput and p50/p95/p99 latency per step, and worker
+saturation: server busy time (from the app's own /metrics request histogram)
+divided by the time all worker threads had available.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB = os.path.join(ROOT, 'benchmarks', 'openrouter_stub.py')
+CONCEPTS = ('Hash tables', 'Binary search', 'Two pointers', 'Sliding window', 'Heaps',
+            'Dijkstra', 'Union-find', 'Tries', 'Topological sort', 'Memoization')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def server_busy_seconds(base_url):
+    """Sum of the app's request durations, all routes and workers"""
+    text = requests.get(f"{base_url}/metrics", timeout=10).text
+    return sum(float(m.group(1)) for m in re.finditer(r'^http_request_duration_seconds_sum\{[^}]*\} (\S+)$', text, re.M))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def timed(self, step, call, ok=lambda r: r.status_code < 400):
+        started = time.perf_counter()
+        try:
+            response = call()
+            success = ok(response)
+        except requests.RequestException:
+            response, success = None, False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(step, []).append(elapsed)
+            if not success:
+                self.errors[step] = self.errors.get(step, 0) + 1
+        return response if success else None
+
+    def report(self, duration):
+        rows = []
+        for step, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            rows.append({
+                'step': step,
+                'requests': len(samples),
+                'errors': self.errors.get(step, 0),
+                'rps': round(len(samples) / duration, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 99) * 1000, 1),
+                'max_ms': round(samples[-1] * 1000, 1),
+            })
+        return rows
+
+
+def quiz_journey(base_url, recorder, topics, args):
+    session = requests.Session()
+    topic_id = random.choice(topics)
+    if not recorder.timed('index', lambda: session.get(f"{base_url}/")):
+        return
+    if not recorder.timed('topic', lambda: session.get(f"{base_url}/topic/{topic_id}")):
+        return
+    generated = recorder.timed('generate', lambda: session.post(
+        f"{base_url}/generate-quiz/{topic_id}",
+        data={'difficulty': random.choice(['easy', 'medium', 'hard', 'mixed']), 'num_questions': args.questions},
+        headers={'Accept': 'application/json'}, allow_redirects=False), ok=lambda r: r.status_code == 202)
+    if not generated:
+        return
+    job = generated.json()
+
+    def wait_for_quiz():
+        # Polled like the generate page does when EventSource is unavailable
+        while True:
+            response = session.get(f"{base_url}{job['status_url']}", timeout=10)
+            if response.status_code != 200 or response.json().get('redirect') \
+                    or response.json()['status'] not in ('queued', 'generating', 'parsing'):
+                return response
+            time.sleep(0.25)
+
+    # A streamed quiz is ready at its first question, so this is the time to first question there
+    ready = recorder.timed('quiz-ready', wait_for_quiz, ok=lambda r: r.status_code == 200
+                           and r.json().get('redirect') is not None)
+    if not ready:
+        return
+    if not recorder.timed('take', lambda: session.get(f"{base_url}{ready.json()['redirect']}")):
+        return
+    delivered = args.questions
+    if ready.json()['status'] != 'done':
+        def read_questions():
+            with session.get(f"{base_url}/api/quiz/stream", stream=True, timeout=120) as response:
+                body = ''.join(response.iter_content(chunk_size=None, decode_unicode=True))
+            response.done = re.search(r'event: done\ndata: (.*)', body)
+            return response
+
+        complete = recorder.timed('quiz-complete', read_questions, ok=lambda r: r.status_code == 200 and r.done)
+        if not complete:
+            return
+        delivered = json.loads(complete.done.group(1))['total']
+    answers = {str(i): random.choice('ABCD') for i in range(delivered)}
+    recorder.timed('submit', lambda: session.post(f"{base_url}/api/submit-quiz",
+                                                  json={'answers': answers, 'delivered': delivered}))
+
+
+def explain_journey(base_url, recorder, pool, args):
+    # A handful of concepts per burst, as when a class opens the same lesson
+    concepts = random.sample(CONCEPTS, 3)
+    payloads = [{'concept': random.choice(concepts), 'context': 'load test', 'difficulty': 'beginner'}
+                for _ in range(args.burst)]
+    futures = [pool.submit(recorder.timed, 'explain', lambda p=p: requests.post(f"{base_url}/api/explain", json=p,
+                                                                                timeout=120))
+               for p in payloads]
+    for future in futures:
+        future.result()
+
+
+def stream_journey(base_url, recorder, topics, args):
+    payload = {'concept': random.choice(CONCEPTS) + f" #{random.randint(1, 50)}", 'context': 'load test'}
+
+    def read_stream():
+        with requests.post(f"{base_url}/api/explain/stream", json=payload, stream=True, timeout=120) as response:
+            body = ''.join(response.iter_content(chunk_size=None, decode_unicode=True))
+        response.done = 'event: done' in body
+        return response
+
+    recorder.timed('explain-stream', read_stream, ok=lambda r: r.status_code == 200 and r.done)
+
+
+JOURNEYS = {'quiz': quiz_journey, 'explain': explain_journey, 'stream': stream_journey}
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name not in JOURNEYS:
+            raise SystemExit(f"Unknown journey {name!r}; choose from {', '.join(JOURNEYS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def start_processes(args, workdir):
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen([sys.executable, STUB, '--port', str(stub_port),
+                             '--latency', args.stub_latency, '--chunk-delay', str(args.stub_chunk_delay),
+                             '--error-rate', str(args.stub_error_rate),
+                             '--malformed-rate', str(args.stub_malformed_rate)],
+                            stdout=subprocess.DEVNULL)
+    processes = [stub]
+    wait_until_up(f"http://127.0.0.1:{stub_port}/stub/stats", stub)
+
+    env = dict(os.environ,
+               OPENROUTER_URL=f"http://127.0.0.1:{stub_port}/api/v1/chat/completions",
+               OPENROUTER_API_KEY='stub',
+               FLASK_SECRET_KEY='loadtest',  # shared by all workers, or sessions break between them
+               LOG_LEVEL=args.log_level,
+               QUIZ_POOL_ENABLED='1' if args.quiz_pool else '0',
+               LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.sqlite3'),
+               SINGLE_FLIGHT_PATH=os.path.join(workdir, 'singleflight.sqlite3'),
+               ADMISSION_PATH=os.path.join(workdir, 'admission.sqlite3'),
+               QUIZ_JOBS_PATH=os.path.join(workdir, 'quiz_jobs.sqlite3'),
+               # Every virtual user comes from one address; per-learner limits are off unless asked for
+               ADMISSION_RATE_PER_MINUTE=str(args.admission_rate),
+               HEDGE_BUDGETS=args.hedge_budgets,
+               QUIZ_GENERATION_MODE=args.quiz_mode,
+               QUIZ_POOL_PATH=os.path.join(workdir, 'quiz_pool.sqlite3'),
+               QUIZ_STORE_URL='sqlite:///' + os.path.join(workdir, 'quiz_sessions.sqlite3'),
+               PROGRESS_DB_PATH=os.path.join(workdir, 'progress.sqlite3'),
+               QUESTION_BANK_PATH=os.path.join(workdir, 'question_bank.sqlite3'),
+               METRICS_DIR=os.path.join(workdir, 'metrics'))
+    if args.server == 'gunicorn':
+        command = ['gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--bind', f"127.0.0.1:{app_port}", '--timeout', '120', 'app:create_app()']
+        if args.preload:
+            command.insert(1, '--preload')
+    else:
+        command = [sys.executable, '-c',
+                   "import logging, app; logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+                   f"app.create_app().run(host='127.0.0.1', port={app_port}, threaded=True)"]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    processes.append(server)
+    wait_until_up(f"http://127.0.0.1:{app_port}/metrics", server, timeout=60)
+    return processes, f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{stub_port}"
+
+
+def run(args, base_url):
+    with open(os.path.join(ROOT, 'data', 'dsa_content.json'), encoding='utf-8') as f:
+        topics = [t['id'] for t in json.load(f)['topics']]
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    burst_pool = ThreadPoolExecutor(max_workers=args.users * args.burst)
+    busy_before = server_busy_seconds(base_url)
+    started = time.monotonic()
+    deadline = started + args.duration
+
+    def user():
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            extra = burst_pool if name == 'explain' else topics
+            JOURNEYS[name](base_url, recorder, extra, args)
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    burst_pool.shutdown()
+
+    busy = server_busy_seconds(base_url) - busy_before
+    # The dev server starts a thread per request, so it has no fixed capacity to saturate
+    capacity = elapsed * args.workers * args.threads if args.server == 'gunicorn' else None
+    rows = recorder.report(elapsed)
+    total = sum(row['requests'] for row in rows)
+    return {
+        'server': args.server,
+        'workers': args.workers,
+        'threads': args.threads,
+        'users': args.users,
+        'duration_s': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'saturation': round(busy / capacity, 3) if capacity else None,
+        'steps': rows,
+    }
+
+
+def print_report(result, stub_stats):
+    saturation = f"{result['saturation']:.0%}" if result['saturation'] is not None else 'n/a'
+    if result['server'] == 'gunicorn':
+        server = f"gunicorn: {result['workers']} workers x {result['threads']} threads"
+    else:
+        server = "dev server (thread per request)"
+    print(f"{server}, {result['users']} users, {result['duration_s']}s")
+    print(f"{result['requests']} requests, {result['throughput_rps']} req/s, worker saturation {saturation}")
+    print(f"{'step':<16}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in result['steps']:
+        print(f"{row['step']:<16}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print(f"stub: {stub_stats['requests']} completions ({stub_stats['streams']} streamed), "
+          f"{stub_stats['errors']} errors, {stub_stats['malformed']} malformed, by kind {stub_stats['by_kind']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=['gunicorn', 'dev'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--preload', action='store_true', help='gunicorn --preload (load the app before forking)')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run')
+    parser.add_argument('--mix', default='quiz=3,explain=1,stream=1', help='journey weights')
+    parser.add_argument('--questions', type=int, default=5, help='questions per generated quiz')
+    parser.add_argument('--burst', type=int, default=5, help='concurrent calls per explain burst')
+    parser.add_argument('--admission-rate', type=float, default=0,
+                        help='ADMISSION_RATE_PER_MINUTE per learner (0: off, all users share one address)')
+    parser.add_argument('--hedge-budgets', default='',
+                        help="HEDGE_BUDGETS for the app, e.g. explain:0.05,quiz:0.05 (default: no hedging)")
+    parser.add_argument('--quiz-pool', action='store_true', help='enable the background question pool')
+    parser.add_argument('--quiz-mode', choices=['json', 'text', 'stream'], default='json',
+                        help="QUIZ_GENERATION_MODE for the app under test ('stream' delivers questions as generated)")
+    parser.add_argument('--stub-latency', default='lognormal:0.8,0.5')
+    parser.add_argument('--stub-chunk-delay', type=float, default=0.02)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    parser.add_argument('--stub-malformed-rate', type=float, default=0.0)
+    parser.add_argument('--log-level', default='WARNING', help='LOG_LEVEL for the app under test')
+    parser.add_argument('--json', action='store_true', help='emit machine-readable results')
+    args = parser.parse_args()
+
+    if args.server == 'gunicorn' and shutil.which('gunicorn') is None:
+        print("gunicorn is not installed (pip install gunicorn), or run with --server dev")
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix='algopro-loadtest-')
+    processes = []
+    try:
+        processes, base_url, stub_url = start_processes(args, workdir)
+        result = run(args, base_url)
+        stub_stats = requests.get(f"{stub_url}/stub/stats", timeout=5).json()
+    finally:
+        for process in reversed(processes):
+            process.send_signal(signal.SIGTERM)
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(dict(result, stub=stub_stats), indent=2))
+    else:
+        print_report(result, stub_stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Usage:
+    python benchmarks/openrouter_stub.py [--port 8900] [--latency lognormal:0.8,0.5]
+                                         [--error-rate 0.02] [--malformed-rate 0.1] ...
+
+Point the app at it with OPENROUTER_URL=http://127.0.0.1:8900/api/v1/chat/completions
+(and any non-empty OPENROUTER_API_KEY). It answers POST /api/v1/chat/completions
+the way call_openrouter and stream_openrouter use it:
+
+- `response_format` json_schema requests get {"questions": [...]} JSON,
+- text-format quiz prompts get canned responses from benchmarks/corpus/,
+- anything else (explain, code help) gets a markdown explanation,
+- `stream: true` requests are answered as SSE deltas, usage in the last chunk.
+
+Latency is drawn per request from --latency (fixed:S, uniform:A,B or
+lognormal:MEDIAN,SIGMA); streams wait that long for the first chunk and
+--chunk-delay between chunks. --error-rate answers with --error-status,
+--malformed-rate swaps in a malformed quiz (missing answers, truncated
+output, prose instead of JSON). GET /stub/stats returns request counters and
+POST /stub/config changes any of these settings while running.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+# Corpus responses the parser has to recover from rather than parse cleanly
+MALFORMED_CORPUS = ('missing_correct.txt', 'truncated.txt')
+
+EXPLANATION = """## Intuition
+
+Think of a **hash table** as a row of labelled lockers: the hash function turns a key
+into a locker number, so finding an item never requires walking past the others.
+
+## Complexity
+
+| Operation | Average | Worst |
+|-----------|---------|-------|
+| Insert    | O(1)    | O(n)  |
+| Lookup    | O(1)    | O(n)  |
+| Delete    | O(1)    | O(n)  |
+
+## Example
+
+```python
+def two_sum(nums, target):
+    seen = {}
+    for i, x in enumerate(nums):
+        if target - x in seen:
+            return seen[target - x], i
+        seen[x] = i
+```
+
+## Common pitfalls
+
+1. Forgetting that a poor hash function degrades every operation to O(n).
+2. Mutating keys after insertion.
+
+Use a hash table whenever you need constant-time membership tests.
+"""
+
+
+def parse_distribution(spec):
+    """'fixed:0.5', 'uniform:0.2,1.0' or 'lognormal:0.8,0.5' -> sampler returning seconds"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda: median * random.lognormvariate(0, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def load_corpus():
+    wellformed, malformed = [], []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt'))):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read().replace('\r\n', '\n')
+        blocks = [b.strip() for b in re.split(r'(?m)^(?=(?:#+\s*)?(?:\*\*)?Question\s*\d+)', text) if b.strip()]
+        blocks = [b for b in blocks if re.match(r'(?:#+\s*)?(?:\*\*)?Question\s*\d+', b)]
+        (malformed if os.path.basename(path) in MALFORMED_CORPUS else wellformed).extend(blocks)
+    return wellformed, malformed
+
+
+def renumber(blocks):
+    return '\n\n'.join(re.sub(r'Question\s*\d+', f"Question {n}", block, count=1)
+                       for n, block in enumerate(blocks, 1))
+
+
+STRUCTURES = ('array', 'linked list', 'stack', 'queue', 'binary heap', 'hash map', 'trie', 'segment tree',
+              'graph adjacency list', 'binary search tree', 'deque', 'union-find forest')
+OPERATIONS = ('insert', 'delete', 'search', 'find the minimum', 'merge two', 'reverse', 'count elements in',
+              'update a range of', 'iterate over', 'split')
+STEMS = ('What is the worst-case cost to {op} a {ds} of {size} elements?',
+         'Which technique lets you {op} a {ds} holding {size} items fastest?',
+         'When you {op} a {ds} with {size} entries, which bound is tight?',
+         'For a {ds} storing {size} keys, how long does it take to {op} it in the average case?')
+CONTEXTS = ('in a ride-sharing dispatcher', 'inside a compiler symbol table', 'for an autocomplete service',
+            'in a network packet scheduler', 'while deduplicating log lines', 'in a chess engine',
+            'for a leaderboard backend', 'in an LRU cache', 'while routing on a road map',
+            'for a spell checker', 'in a stock order book', 'while parsing JSON', 'for a music playlist',
+            'in a garbage collector', 'for a file system index', 'in a multiplayer game lobby')
+COMPLEXITIES = ('O(1)', 'O(log n)', 'O(n)', 'O(n log n)', 'O(n^2)', 'O(sqrt n)', 'O(alpha(n))')
+
+
+def json_question(topic):
+    """A well-formed question; random enough that the question bank keeps most of them"""
+    correct = random.choice('ABCD')
+    stem = random.choice(STEMS).format(op=random.choice(OPERATIONS), ds=random.choice(STRUCTURES),
+                                       size=random.randint(10, 10 ** 6))
+    stem = f"{random.choice(CONTEXTS).capitalize()}: {stem}"
+    answers = random.sample(COMPLEXITIES, 4)
+    return {
+        'question': f"{stem} ({topic})",
+        'options': dict(zip('ABCD', answers)),
+        'correct': correct,
+        'explanation': f"{answers['ABCD'.index(correct)]} follows from how the structure lays out its elements."
+    }
+
+
+class Stub:
+    def __init__(self, args):
+        self.lock = threading.Lock()
+        self.wellformed, self.malformed = load_corpus()
+        self.stats = {'requests': 0, 'streams': 0, 'errors': 0, 'malformed': 0, 'by_kind': {}}
+        self.configure(vars(args))
+
+    def configure(self, settings):
+        with self.lock:
+            for key in ('latency', 'chunk_delay', 'error_rate', 'error_status', 'malformed_rate'):
+                if key in settings:
+                    setattr(self, key, settings[key])
+            self.sample_latency = parse_distribution(self.latency)
+
+    def count(self, key, kind=None):
+        with self.lock:
+            self.stats[key] += 1
+            if kind:
+                self.stats['by_kind'][kind] = self.stats['by_kind'].get(kind, 0) + 1
+
+    def respond(self, payload):
+        """(kind, content) for a chat completion payload"""
+        prompt = payload['messages'][-1]['content']
+        wanted = re.search(r'Generate exactly (\d+)', prompt)
+        count = int(wanted.group(1)) if wanted else 5
+        topic = re.search(r'questions about (.+?) at ', prompt)
+        topic = topic.group(1) if topic else 'data structures'
+        malformed = random.random() < self.malformed_rate
+
+        if payload.get('response_format'):
+            if malformed:
+                self.count('malformed')
+                body = json.dumps({'questions': [json_question(topic) for _ in range(count)]})
+                # Cut off mid-object, or prose in the text format instead of JSON
+                return 'quiz-json', random.choice([body[:len(body) * 2 // 3], renumber(self.wellformed[:count])])
+            return 'quiz-json', json.dumps({'questions': [json_question(topic) for _ in range(count)]})
+        if 'Question 1:' in prompt:
+            if malformed:
+                self.count('malformed')
+                source = self.malformed
+            else:
+                source = self.wellformed
+            blocks = [random.choice(source) for _ in range(count)]
+            return 'quiz-text', renumber(blocks)
+        return 'explain', EXPLANATION
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path == '/stub/stats':
+            with self.stub.lock:
+                stats = dict(self.stub.stats, by_kind=dict(self.stub.stats['by_kind']))
+            return self._json(200, stats)
+        self._json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path == '/stub/config':
+            self.stub.configure(self._read_json())
+            return self._json(200, {'ok': True})
+        if self.path != '/api/v1/chat/completions':
+            return self._json(404, {'error': 'not found'})
+
+        stub = self.stub
+        payload = self._read_json()
+        kind, content = stub.respond(payload)
+        stub.count('requests', kind)
+        time.sleep(stub.sample_latency())
+        if random.random() < stub.error_rate:
+            stub.count('errors')
+            return self._json(stub.error_status, {'error': {'message': 'stub upstream error'}})
+
+        usage = {'prompt_tokens': len(payload['messages'][-1]['content']) // 4,
+                 'completion_tokens': len(content) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+        if not payload.get('stream'):
+            return self._json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'model': payload.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+        stub.count('streams')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            pieces = re.findall(r'\S*\s*', content)
+            for i in range(0, len(pieces), 4):
+                delta = ''.join(pieces[i:i + 4])
+                chunk = {'id': completion_id, 'choices': [{'index': 0, 'delta': {'content': delta}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(stub.chunk_delay)
+            final = {'id': completion_id, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                     'usage': usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the app cancelled the stream
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', default='lognormal:0.8,0.5',
+                        help='fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA (seconds)')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='seconds between streamed chunks')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    return parser
+
+
+def serve(args):
+    Handler.stub = Stub(args)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    args = build_parser().parse_args()
+    print(f"OpenRouter stub on http://{args.host}:{args.port}/api/v1/chat/completions "
+          f"(latency {args.latency}, errors {args.error_rate:.0%}, malformed {args.malformed_rate:.0%})")
+    sys.stdout.flush()
+    try:
+        serve(args)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""Fingerprints of code-help submissions that survive cosmetic edits.
+
+Two pastes of the same solution that differ only in whitespace, comments,
+docstrings or local variable names get the same fingerprint. Python is
+compared by AST with every name bound in the snippet renamed to v0, v1, ...
+in order of first use; other languages (and Python that does not parse) by
+their token stream with comments dropped and local-looking identifiers
+renamed the same way. Python's token stream keeps line breaks and
+indentation, which decide what the code means there. Names that carry meaning on their own (keywords,
+builtins, imports, members after `.`, calls to functions defined elsewhere,
+capitalized types) are kept, so different code does not share an analysis.
+
+`Fingerprint.names` lists the original identifiers in canonical order, which
+lets a cached analysis be shown with the current submitter's names
+(`rename_in_code`).
+"""
+import ast
+import builtins
+import hashlib
+import json
+import keyword
+import re
+from typing import NamedTuple, Tuple
+
+
+LANGUAGE_ALIASES = {
+    'py': 'python', 'python3': 'python',
+    'js': 'javascript', 'node': 'javascript', 'ts': 'typescript',
+    'c++': 'cpp', 'cc': 'cpp', 'cxx': 'cpp',
+    'golang': 'go', 'c#': 'csharp', 'cs': 'csharp',
+}
+
+C_FAMILY_KEYWORDS = {
+    'auto', 'bool', 'break', 'case', 'catch', 'char', 'class', 'const', 'continue', 'default', 'delete',
+    'do', 'double', 'else', 'enum', 'extern', 'false', 'float', 'for', 'goto', 'if', 'inline', 'int',
+    'long', 'new', 'null', 'nullptr', 'private', 'protected', 'public', 'return', 'short', 'signed',
+    'sizeof', 'static', 'struct', 'switch', 'template', 'this', 'throw', 'true', 'try', 'typedef',
+    'typename', 'union', 'unsigned', 'using', 'virtual', 'void', 'volatile', 'while', 'namespace',
+    'std', 'string', 'cout', 'cin', 'endl', 'printf', 'size_t', 'include', 'define',
+}
+KEYWORDS = {
+    'python': set(keyword.kwlist) | set(dir(builtins)) | {'self', 'cls'},
+    'javascript': {
+        'async', 'await', 'break', 'case', 'catch', 'class', 'const', 'continue', 'default', 'delete',
+        'do', 'else', 'export', 'extends', 'false', 'finally', 'for', 'function', 'if', 'import', 'in',
+        'instanceof', 'let', 'new', 'null', 'of', 'return', 'static', 'super', 'switch', 'this', 'throw',
+        'true', 'try', 'typeof', 'undefined', 'var', 'void', 'while', 'yield', 'console', 'number',
+        'string', 'boolean', 'any', 'interface', 'type', 'readonly',
+    },
+    'java': C_FAMILY_KEYWORDS | {
+        'abstract', 'boolean', 'byte', 'extends', 'final', 'finally', 'implements', 'import', 'instanceof',
+        'interface', 'package', 'super', 'synchronized', 'throws', 'var',
+    },
+    'cpp': C_FAMILY_KEYWORDS | {'vector', 'map', 'set', 'unordered_map', 'pair', 'queue', 'stack', 'deque'},
+    'go': {
+        'break', 'case', 'chan', 'const', 'continue', 'default', 'defer', 'else', 'fallthrough', 'for',
+        'func', 'go', 'goto', 'if', 'import', 'interface', 'map', 'package', 'range', 'return', 'select',
+        'struct', 'switch', 'type', 'var', 'int', 'int64', 'string', 'bool', 'byte', 'rune', 'float64',
+        'true', 'false', 'nil', 'len', 'cap', 'append', 'make', 'fmt',
+    },
+}
+KEYWORDS['typescript'] = KEYWORDS['javascript']
+KEYWORDS['c'] = C_FAMILY_KEYWORDS
+KEYWORDS['csharp'] = KEYWORDS['java']
+
+HASH_COMMENT_LANGUAGES = {'python', 'ruby', 'shell', 'bash', 'r', 'perl'}
+
+STRING = r'''"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`'''
+TOKEN_RES = {
+    'hash': re.compile(rf'(?P<comment>#[^\n]*)|(?P<string>{STRING})|(?P<number>\d[\w.]*)'
+                       r'|(?P<ident>[A-Za-z_$][\w$]*)|(?P<op>\S)'),
+    'c': re.compile(rf'(?P<comment>//[^\n]*|/\*.*?\*/)|(?P<string>{STRING})|(?P<number>\d[\w.]*)'
+                    r'|(?P<ident>[A-Za-z_$][\w$]*)|(?P<op>\S)', re.S),
+}
+MEMBER_OPS = {'.', '->', ':'}
+CODE_SPAN_RE = re.compile(r'```.*?```|`[^`\n]+`', re.S)
+
+
+class Fingerprint(NamedTuple):
+    digest: str
+    language: str
+    method: str  # 'ast' or 'tokens'
+    names: Tuple[str, ...]
+
+
+def normalize_language(language):
+    language = (language or 'python').strip().lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def normalize_issue(issue):
+    """Case, whitespace and trailing punctuation do not change the question"""
+    return re.sub(r'\s+', ' ', (issue or '').lower()).strip().rstrip('?.!')
+
+
+class _Renamer:
+    def __init__(self):
+        self.names = {}
+
+    def __call__(self, name):
+        if name not in self.names:
+            self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+
+def _bound_names(tree):
+    bound, imported = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            bound.add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            imported.update((alias.asname or alias.name).split('.')[0] for alias in node.names)
+    return bound - imported - {'self', 'cls'}
+
+
+def _strip_docstring(body):
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        return body[1:] or [ast.Pass()]
+    return body
+
+
+def normalize_python(code):
+    """(canonical AST dump, original names in canonical order); raises SyntaxError"""
+    tree = ast.parse(code)
+    bound = _bound_names(tree)
+    rename = _Renamer()
+    # ast.walk is breadth-first, so first use is by nesting depth; the same for equivalent code
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in bound:
+            node.id = rename(node.id)
+        elif isinstance(node, ast.arg) and node.arg in bound:
+            node.arg = rename(node.arg)
+        elif isinstance(node, ast.keyword) and node.arg in bound:
+            node.arg = rename(node.arg)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            node.names = [rename(n) if n in bound else n for n in node.names]
+        elif isinstance(node, ast.ExceptHandler) and node.name in bound:
+            node.name = rename(node.name)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if node.name in bound:
+                node.name = rename(node.name)
+            node.body = _strip_docstring(node.body)
+        elif isinstance(node, ast.Module):
+            node.body = _strip_docstring(node.body)
+    return ast.dump(tree, annotate_fields=False, include_attributes=False), tuple(rename.names)
+
+
+def _declared_names(tokens, keywords):
+    """Identifiers introduced by the snippet: preceded by a keyword or type (`int f`, `function f`, `Node *f`)"""
+    declared = set()
+    for i, (kind, text) in enumerate(tokens):
+        if kind != 'ident' or i == 0:
+            continue
+        j = i - 1
+        while j > 0 and tokens[j][1] in ('*', '&'):
+            j -= 1
+        previous_kind, previous = tokens[j]
+        if previous_kind == 'ident' and (previous in keywords or previous[0].isupper()):
+            declared.add(text)
+    return declared
+
+
+def normalize_tokens(code, language):
+    """(token stream without comments or whitespace, original names in canonical order)
+
+    For Python each line's first token is preceded by a newline and the line's
+    indentation, so broken snippets that differ only in nesting stay apart.
+    """
+    token_re = TOKEN_RES['hash' if language in HASH_COMMENT_LANGUAGES else 'c']
+    keywords = KEYWORDS.get(language, C_FAMILY_KEYWORDS)
+    matches = [m for m in token_re.finditer(code) if m.lastgroup != 'comment']
+    tokens = [(m.lastgroup, m.group()) for m in matches]
+    layout = [''] * len(tokens)
+    if language == 'python':
+        end = 0
+        for i, m in enumerate(matches):
+            gap = code[end:m.start()]
+            if i == 0 or '\n' in gap:
+                layout[i] = '\n' + gap.rsplit('\n', 1)[-1]
+            end = m.end()
+    declared = _declared_names(tokens, keywords)
+    rename = _Renamer()
+    out = []
+    for i, (kind, text) in enumerate(tokens):
+        if kind == 'ident' and language in KEYWORDS and text not in keywords and not text[0].isupper():
+            previous = tokens[i - 1][1] if i else ''
+            following = tokens[i + 1][1] if i + 1 < len(tokens) else ''
+            # Calls to functions the snippet does not define (library calls) keep their names
+            if previous not in MEMBER_OPS and (following != '(' or text in declared):
+                text = rename(text)
+        out.append(layout[i] + text)
+    return ' '.join(out), tuple(rename.names)
+
+
+def fingerprint(code, language, issue=''):
+    language = normalize_language(language)
+    method = 'tokens'
+    if language == 'python':
+        try:
+            normalized, names = normalize_python(code)
+            method = 'ast'
+        except (SyntaxError, ValueError, RecursionError):
+            normalized, names = normalize_tokens(code, language)
+    else:
+        normalized, names = normalize_tokens(code, language)
+    payload = json.dumps([language, method, normalized, normalize_issue(issue)], separators=(',', ':'))
+    return Fingerprint(hashlib.sha256(payload.encode('utf-8')).hexdigest(), language, method, names)
+
+
+def rename_in_code(markdown_text, mapping):
+    """Apply {old: new} identifier renames inside fenced blocks and inline code only"""
+    mapping = {old: new for old, new in mapping.items() if old != new}
+    if not mapping:
+        return markdown_text
+    names_re = re.compile(r'(?<![\w$])(' + '|'.join(re.escape(n) for n in sorted(mapping, key=len, reverse=True))
+                          + r')(?![\w$])')
+    return CODE_SPAN_RE.sub(lambda span: names_re.sub(lambda m: mapping[m.group(1)], span.group()), markdown_text)
+
+
+def truncate_code(code, max_chars, max_lines):
+    """Code cut to whole lines within both limits; returns (code, lines dropped)"""
+    lines = code.splitlines()
+    kept, size = [], 0
+    for line in lines[:max_lines]:
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    if not kept and lines:
+        kept = [lines[0][:max_chars]]  # one enormous line (minified code)
+    return '\n'.join(kept), len(lines) - len(kept)
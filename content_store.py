@@ -0,0 +1,284 @@
+"""Indexed, immutable view of data/*.json with mtime-based hot reload.
+
+A ContentSnapshot is built once per file version: topics indexed by id,
+per-topic prompt fragments and quiz template lookups precomputed, and every
+record an immutable NamedTuple. Derived structures (search and practice
+indexes) are cached on the snapshot they were built from. ContentStore
+loads lazily, on first use, and swaps in a new snapshot when a source
+file's mtime changes, so edits ship without restarting workers.
+
+A compiled snapshot (`compile_snapshot`) is the validated snapshot with all
+its indexes built, pickled. It is only used while its source version and the
+code of every module it contains match; otherwise the JSON is parsed as usual.
+It is a local build artefact: never load one from an untrusted location.
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import NamedTuple, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+COMPILED_FORMAT = 1
+OPTION_KEYS = ('A', 'B', 'C', 'D')
+
+
+class Subtopic(NamedTuple):
+    name: str
+    video: str
+    concepts: Tuple[str, ...]
+
+
+def subtopics_str(subtopics):
+    return ', '.join(st.name for st in subtopics)
+
+
+def concepts_str(subtopics):
+    return ', '.join(c for st in subtopics for c in st.concepts[:3])
+
+
+class Topic(NamedTuple):
+    id: str
+    title: str
+    icon: str
+    description: str
+    difficulty: str
+    subtopics: Tuple[Subtopic, ...]
+    # Prompt fragments used by quiz generation
+    subtopics_str: str
+    concepts_str: str
+
+    def focused_on(self, subtopics):
+        """Copy of this topic whose prompt fragments cover only `subtopics`"""
+        subtopics = tuple(subtopics)
+        return self._replace(subtopics=subtopics, subtopics_str=subtopics_str(subtopics),
+                             concepts_str=concepts_str(subtopics))
+
+
+class QuizTemplate(NamedTuple):
+    title: str
+    description: str
+    prompt_template: str
+    time_per_question: int
+
+
+class PracticeProblem(NamedTuple):
+    id: int
+    title: str
+    difficulty: str
+    category: str
+    link: str
+    concepts: Tuple[str, ...]
+
+
+class ContentSnapshot:
+    __slots__ = ('topics', 'topics_by_id', 'practice_problems', 'templates_by_id',
+                 'fallback_quizzes', 'version', 'loaded_at', 'indexes')
+
+    def __init__(self, dsa_content, quiz_templates, version):
+        topics = []
+        for t in dsa_content.get('topics', []):
+            subtopics = tuple(
+                Subtopic(st.get('name', ''), st.get('video', ''), tuple(st.get('concepts', [])))
+                for st in t.get('subtopics', []))
+            topics.append(Topic(
+                id=t['id'],
+                title=t.get('title', t['id']),
+                icon=t.get('icon', ''),
+                description=t.get('description', ''),
+                difficulty=t.get('difficulty', ''),
+                subtopics=subtopics,
+                subtopics_str=subtopics_str(subtopics),
+                concepts_str=concepts_str(subtopics)
+            ))
+        self.topics = tuple(topics)
+        self.topics_by_id = {t.id: t for t in self.topics}
+
+        self.practice_problems = tuple(
+            PracticeProblem(p['id'], p.get('title', ''), p.get('difficulty', ''), p.get('category', ''),
+                            p.get('link', ''), tuple(p.get('concepts', [])))
+            for p in dsa_content.get('practice_problems', []))
+
+        self.templates_by_id = {
+            topic_id: QuizTemplate(
+                title=tpl.get('title', ''),
+                description=tpl.get('description', ''),
+                prompt_template=tpl.get('prompt_template', ''),
+                time_per_question=tpl.get('time_per_question', 3))
+            for topic_id, tpl in quiz_templates.get('templates', {}).items()}
+        # Plain dicts: questions are copied into quiz records, never mutated here
+        self.fallback_quizzes = quiz_templates.get('fallback_quizzes', {})
+        self.version = version
+        self.loaded_at = time.time()
+        self.indexes = {}
+
+    def get_topic(self, topic_id):
+        return self.topics_by_id.get(topic_id)
+
+    def get_template(self, topic_id):
+        return self.templates_by_id.get(topic_id)
+
+    def index(self, name, build):
+        """Derived structure for this version, built by build(snapshot) on first use"""
+        index = self.indexes.get(name)
+        if index is None:
+            # Concurrent first calls may both build; either result is equivalent
+            index = self.indexes[name] = build(self)
+        return index
+
+    def validate(self):
+        """Problems that would break pages or quizzes, as messages (empty when valid)"""
+        problems = []
+        if len(self.topics_by_id) != len(self.topics):
+            problems.append("duplicate topic ids")
+        if len({p.id for p in self.practice_problems}) != len(self.practice_problems):
+            problems.append("duplicate practice problem ids")
+        for topic_id in list(self.templates_by_id) + list(self.fallback_quizzes):
+            if topic_id not in self.topics_by_id:
+                problems.append(f"quiz template for unknown topic {topic_id!r}")
+        for topic_id, quiz in self.fallback_quizzes.items():
+            for n, q in enumerate(quiz.get('questions', []), 1):
+                if not q.get('question') or sorted(q.get('options', {})) != list(OPTION_KEYS):
+                    problems.append(f"fallback question {n} of {topic_id!r} needs text and options A-D")
+                elif q.get('correct') not in OPTION_KEYS:
+                    problems.append(f"fallback question {n} of {topic_id!r} has no valid answer")
+        return problems
+
+
+def _module_digest(name):
+    module = importlib.import_module(name)
+    with open(module.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def compile_snapshot(snapshot, path, builders):
+    """Validate `snapshot`, build every index in `builders` ({name: build}) and pickle it to `path`"""
+    problems = snapshot.validate()
+    if problems:
+        raise ValueError("Invalid content: " + "; ".join(problems))
+    for name, build in builders.items():
+        snapshot.index(name, build)
+    # The pickle refers to these modules' classes; any code change invalidates it
+    modules = sorted({__name__} | {type(index).__module__ for index in snapshot.indexes.values()})
+    header = {'format': COMPILED_FORMAT, 'version': snapshot.version,
+              'modules': {name: _module_digest(name) for name in modules}}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return header
+
+
+def load_compiled(path, version):
+    """The compiled snapshot at `path` if it is current for `version`, else None"""
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('format') != COMPILED_FORMAT or header.get('version') != version:
+                logger.info("Compiled content snapshot is stale, parsing JSON", extra={'path': path})
+                return None
+            if any(_module_digest(name) != digest for name, digest in header['modules'].items()):
+                logger.info("Compiled content snapshot predates a code change, parsing JSON", extra={'path': path})
+                return None
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+        logger.warning("Unreadable compiled content snapshot: %s", e, extra={'path': path})
+        return None
+    snapshot.loaded_at = time.time()
+    return snapshot
+
+
+class ContentStore:
+    def __init__(self, content_path, templates_path, check_interval=2.0, compiled_path=None):
+        self.paths = (content_path, templates_path)
+        self.check_interval = check_interval
+        self.compiled_path = compiled_path
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._mtimes = None
+        self._next_check = 0.0
+        self._snapshot = None
+        self.loaded_from = None  # 'compiled' or 'json', for the current snapshot
+
+    def _stat(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self.paths)
+
+    def _load(self, use_compiled=True):
+        mtimes = self._stat()
+        raw = []
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                raw.append(f.read())
+        version = hashlib.sha1(b'\0'.join(raw)).hexdigest()[:16]
+        snapshot = None
+        if use_compiled and self.compiled_path:
+            snapshot = load_compiled(self.compiled_path, version)
+        source = 'compiled'
+        if snapshot is None:
+            snapshot = ContentSnapshot(json.loads(raw[0]), json.loads(raw[1]), version)
+            source = 'json'
+        self._mtimes = mtimes
+        self.loaded_from = source
+        return snapshot
+
+    def compile(self, builders):
+        """Write the compiled form of the current source files to compiled_path"""
+        return compile_snapshot(self._load(use_compiled=False), self.compiled_path, builders)
+
+    def on_reload(self, callback):
+        """Register callback(snapshot), called for every snapshot loaded (now, if one is)"""
+        self._listeners.append(callback)
+        if self._snapshot is not None:
+            callback(self._snapshot)
+
+    @property
+    def snapshot(self):
+        if self._snapshot is None:
+            self._first_load()
+        now = time.monotonic()
+        if self.check_interval >= 0 and now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._maybe_reload()
+        return self._snapshot
+
+    def _first_load(self):
+        with self._lock:
+            if self._snapshot is not None:
+                return
+            snapshot = self._snapshot = self._load()
+            self._next_check = time.monotonic() + self.check_interval
+        for callback in self._listeners:
+            callback(snapshot)
+
+    def _maybe_reload(self):
+        try:
+            if self._stat() == self._mtimes:
+                return
+        except OSError:
+            return
+        with self._lock:
+            mtimes = self._mtimes
+            try:
+                mtimes = self._stat()
+                if mtimes == self._mtimes:
+                    return
+                snapshot = self._load()
+            except (OSError, ValueError, KeyError) as e:
+                # Half-written or invalid file: keep serving the previous snapshot until the next edit
+                self._mtimes = mtimes
+                logger.error("Content reload failed, keeping current version", extra={'version': self._snapshot.version, 'error': str(e)})
+                return
+            self._snapshot = snapshot
+            logger.info("Content reloaded", extra={'version': snapshot.version})
+        for callback in self._listeners:
+            callback(snapshot)
@@ -0,0 +1,180 @@
+"""Hedged upstream calls: race a backup request against a slow primary.
+
+If the primary call has not returned after a delay taken from the recent
+latency distribution of that endpoint (e.g. its p95), a backup call is
+started and whichever succeeds first wins. The loser's result is discarded
+and its `cancelled` event set, so it makes no further retries.
+
+Hedges are paid for from a per-endpoint budget: every primary call adds
+`ratio` tokens (up to `burst`) and a hedge spends one, so at most about
+`ratio` of an endpoint's calls are ever doubled. Latencies, budgets and win
+counts are per process.
+"""
+import bisect
+import queue
+import threading
+import time
+from collections import deque
+
+
+class HedgeSkipped(Exception):
+    """Raised by a backup attempt that cannot start (e.g. no upstream slot free)"""
+
+
+class LatencyWindow:
+    """The last `size` latencies, sorted for percentile lookups"""
+
+    def __init__(self, size=200):
+        self._recent = deque(maxlen=size)
+        self._sorted = []
+
+    def add(self, seconds):
+        if len(self._recent) == self._recent.maxlen:
+            del self._sorted[bisect.bisect_left(self._sorted, self._recent[0])]
+        self._recent.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, p):
+        if not self._sorted:
+            return None
+        return self._sorted[min(len(self._sorted) - 1, int(len(self._sorted) * p / 100))]
+
+    def __len__(self):
+        return len(self._sorted)
+
+
+class Hedger:
+    def __init__(self, budgets, percentile=95, min_delay=1.0, max_delay=20.0, min_samples=20, burst=3,
+                 window=200, on_outcome=None):
+        self.budgets = dict(budgets)  # endpoint -> share of calls that may be hedged; unlisted are never hedged
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.burst = burst
+        self.window = window
+        self.on_outcome = on_outcome  # on_outcome(endpoint, outcome), e.g. for a metrics counter
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._tokens = {endpoint: 1.0 for endpoint in self.budgets}
+        self._stats = {}
+
+    def enabled_for(self, endpoint):
+        return self.budgets.get(endpoint, 0) > 0
+
+    def delay(self, endpoint):
+        """Seconds to wait on the primary before hedging; max_delay until enough latencies are known"""
+        with self._lock:
+            window = self._latencies.get(endpoint)
+            if window is None or len(window) < self.min_samples:
+                return self.max_delay
+            return min(self.max_delay, max(self.min_delay, window.percentile(self.percentile)))
+
+    def _record_latency(self, endpoint, seconds):
+        with self._lock:
+            self._latencies.setdefault(endpoint, LatencyWindow(self.window)).add(seconds)
+
+    def _count(self, endpoint, outcome):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+        if self.on_outcome:
+            self.on_outcome(endpoint, outcome)
+
+    def _earn(self, endpoint):
+        with self._lock:
+            self._tokens[endpoint] = min(self.burst, self._tokens.get(endpoint, 0) + self.budgets[endpoint])
+
+    def _spend(self, endpoint):
+        with self._lock:
+            if self._tokens.get(endpoint, 0) < 1:
+                return False
+            self._tokens[endpoint] -= 1
+            return True
+
+    def _refund(self, endpoint):
+        with self._lock:
+            self._tokens[endpoint] = min(self.burst, self._tokens[endpoint] + 1)
+
+    def run(self, endpoint, primary, backup):
+        """Result of primary(cancelled), or of backup(cancelled) if that succeeds first.
+
+        Both are called with a threading.Event that is set once the other has won.
+        Raises the primary's exception if neither succeeds.
+        """
+        if not self.enabled_for(endpoint):
+            return primary(None)
+        self._earn(endpoint)
+
+        results = queue.Queue()
+        cancelled = {'primary': threading.Event(), 'backup': threading.Event()}
+
+        def attempt(tier, call):
+            started = time.perf_counter()
+            try:
+                value = call(cancelled[tier])
+            except Exception as e:
+                results.put((tier, False, e))
+                return
+            if tier == 'primary':
+                # Losing primaries still finish; their latency keeps the percentile honest
+                self._record_latency(endpoint, time.perf_counter() - started)
+            results.put((tier, True, value))
+
+        threading.Thread(target=attempt, args=('primary', primary), name='hedge-primary', daemon=True).start()
+        try:
+            tier, ok, value = results.get(timeout=self.delay(endpoint))
+        except queue.Empty:
+            tier = None
+        if tier is not None:
+            self._count(endpoint, 'not_hedged')
+            if ok:
+                return value
+            raise value
+
+        if not self._spend(endpoint):
+            self._count(endpoint, 'skipped_budget')
+            tier, ok, value = results.get()
+            if ok:
+                return value
+            raise value
+
+        threading.Thread(target=attempt, args=('backup', backup), name='hedge-backup', daemon=True).start()
+        errors = {}
+        while len(errors) < 2:
+            tier, ok, value = results.get()
+            if ok:
+                loser = 'backup' if tier == 'primary' else 'primary'
+                cancelled[loser].set()
+                self._count(endpoint, f"{tier}_won")
+                return value
+            if isinstance(value, HedgeSkipped):
+                # The backup never ran: this is an unhedged call after all
+                self._refund(endpoint)
+                self._count(endpoint, 'skipped_busy')
+                tier, ok, value = results.get()
+                if ok:
+                    return value
+                raise value
+            errors[tier] = value
+        self._count(endpoint, 'both_failed')
+        raise errors['primary']
+
+    def stats(self):
+        stats = {}
+        for endpoint in self.budgets:
+            with self._lock:
+                counts = dict(self._stats.get(endpoint, {}))
+                samples = len(self._latencies.get(endpoint, ()))
+                tokens = self._tokens.get(endpoint, 0)
+            hedged = counts.get('primary_won', 0) + counts.get('backup_won', 0)
+            stats[endpoint] = {
+                'budget': self.budgets[endpoint],
+                'budget_tokens': round(tokens, 2),
+                'delay_seconds': round(self.delay(endpoint), 3),
+                'latency_samples': samples,
+                'outcomes': counts,
+                'hedge_rate': round(hedged / max(1, sum(counts.values())), 4),
+                'backup_win_rate': round(counts.get('backup_won', 0) / hedged, 4) if hedged else None,
+            }
+        return stats
@@ -0,0 +1,52 @@
+"""Conditional GET helpers and a cache for rendered, user-independent fragments."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import make_response, request
+
+
+def make_etag(*parts):
+    """Strong ETag over everything a page's bytes depend on"""
+    return hashlib.sha1('\0'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:24]
+
+
+def conditional_page(etag, render):
+    """304 if the client already has `etag`, otherwise the rendered page tagged with it.
+
+    Pages are revalidated on every navigation (no-cache) but only re-rendered
+    when their inputs changed.
+    """
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class FragmentCache:
+    """Rendered HTML keyed by (name, content version, args); bounded LRU"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,174 @@
+"""Two-tier (in-process LRU + shared SQLite) cache for LLM completions."""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TTL = 3600
+
+
+def make_cache_key(model, system_prompt, prompt, temperature, max_tokens, extra=None):
+    """Content-addressed key for a completion request (`extra`: other payload fields)"""
+    parts = [model, system_prompt, prompt, temperature, max_tokens]
+    if extra:
+        parts.append(extra)
+    payload = json.dumps(parts, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """LRU memory tier in front of a SQLite tier shared by all workers.
+
+    TTLs are per endpoint (``ttls={'explain': 86400, ...}``); a TTL of 0
+    disables caching for that endpoint. Both tiers are size bounded.
+    """
+
+    def __init__(self, path, ttls=None, max_memory_entries=256, max_disk_entries=5000):
+        self.path = path
+        self.ttls = dict(ttls or {})
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inserts = 0
+        self._stats = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # Never reuse a connection inherited across fork (gunicorn --preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, DEFAULT_TTL)
+
+    def _count(self, endpoint, field):
+        with self._lock:
+            counters = self._stats.setdefault(endpoint, {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0})
+            counters[field] += 1
+
+    def get(self, key, endpoint='default'):
+        if self.ttl_for(endpoint) <= 0:
+            return None
+        now = time.time()
+
+        value = None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    value = entry[1]
+                else:
+                    del self._memory[key]
+        if value is not None:
+            self._count(endpoint, 'hits')
+            return value
+
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read error: %s", e)
+            row = None
+
+        if row is None:
+            self._count(endpoint, 'misses')
+            return None
+
+        value, expires_at = row
+        self._remember(key, value, expires_at)
+        self._count(endpoint, 'hits')
+        self._count(endpoint, 'disk_hits')
+        return value
+
+    def set(self, key, value, endpoint='default'):
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0 or not value:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        self._remember(key, value, expires_at)
+
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, endpoint, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, value, now, expires_at))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write error: %s", e)
+            return
+
+        self._count(endpoint, 'stores')
+        with self._lock:
+            self._inserts += 1
+            should_evict = self._inserts % 50 == 0
+        if should_evict:
+            self.evict()
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def evict(self):
+        """Drop expired rows, then the oldest rows beyond the disk bound"""
+        try:
+            conn = self._conn()
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_disk_entries,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache eviction error: %s", e)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._stats.items()}
+            memory_entries = len(self._memory)
+        try:
+            disk_entries = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except sqlite3.Error:
+            disk_entries = None
+        return {
+            'memory_entries': memory_entries,
+            'disk_entries': disk_entries,
+            'endpoints': endpoints
+        }
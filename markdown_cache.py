@@ -0,0 +1,79 @@
+"""Render-once markdown: reusable converters plus a content-addressed HTML cache.
+
+Building a ``markdown.Markdown`` instance loads and registers every extension,
+which costs more than converting a short question. Converters are therefore
+kept per (thread, extension set) and ``reset()`` between documents, and the
+resulting HTML is cached by (extension set, sha1 of the source).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+QUESTION_EXTENSIONS = ('fenced_code', 'nl2br')
+RESPONSE_EXTENSIONS = ('tables', 'fenced_code')
+
+_local = threading.local()
+
+
+def get_converter(extensions):
+    """The calling thread's Markdown instance for this extension set"""
+    extensions = tuple(extensions)
+    converters = getattr(_local, 'converters', None)
+    if converters is None:
+        converters = _local.converters = {}
+    converter = converters.get(extensions)
+    if converter is None:
+        import markdown  # deferred: workers that never render markdown never load it
+
+        converter = converters[extensions] = markdown.Markdown(extensions=list(extensions))
+    return converter
+
+
+def convert(text, extensions):
+    """Uncached conversion with a reused converter"""
+    converter = get_converter(extensions)
+    try:
+        return converter.convert(text)
+    finally:
+        converter.reset()
+
+
+class MarkdownCache:
+    """Bounded LRU of rendered HTML keyed by extension set and source hash"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, extensions):
+        extensions = tuple(extensions)
+        key = (extensions, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = convert(text, extensions)
+        with self._lock:
+            self._entries[key] = html
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+MARKDOWN_CACHE = MarkdownCache()
+
+
+def render_markdown(text, extensions=RESPONSE_EXTENSIONS):
+    return MARKDOWN_CACHE.render(text or '', extensions)
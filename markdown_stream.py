@@ -0,0 +1,69 @@
+"""Incremental markdown rendering for streamed LLM output."""
+import re
+
+from markdown_cache import convert
+
+
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+\.)[ \t]')
+LIST_CONTINUATION_RE = re.compile(r'^(?: {4}|\t)')
+
+
+class MarkdownStreamRenderer:
+    """Render markdown block by block as text arrives.
+
+    A block is complete at a blank line outside a fenced code block, so each
+    block is converted exactly once and only the unfinished tail is buffered.
+    A list stays open across blank lines while the next line continues it (an
+    item or an indented line), so a loose list renders as one list.
+    """
+
+    def __init__(self, extensions=('tables', 'fenced_code')):
+        self.extensions = tuple(extensions)
+        self._pending = ''
+        self._block_lines = []
+        self._in_fence = False
+        self._blank_after_list = False  # a list block ended by a blank line, unless the next line continues it
+
+    def feed(self, text):
+        """Add streamed text; returns HTML for every block it completed"""
+        self._pending += text
+        html_parts = []
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            rendered = self._push_line(line)
+            if rendered:
+                html_parts.append(rendered)
+        return html_parts
+
+    def close(self):
+        """Flush the trailing partial block"""
+        rendered = self._push_line(self._pending) if self._pending else ''
+        self._pending = ''
+        return rendered + self._flush()
+
+    def _push_line(self, line):
+        rendered = ''
+        if self._blank_after_list and line.strip():
+            self._blank_after_list = False
+            if LIST_ITEM_RE.match(line) or LIST_CONTINUATION_RE.match(line):
+                self._block_lines.append('')
+            else:
+                rendered = self._flush()
+        if FENCE_RE.match(line):
+            self._in_fence = not self._in_fence
+        if not line.strip() and not self._in_fence:
+            if self._block_lines and LIST_ITEM_RE.match(self._block_lines[0]):
+                self._blank_after_list = True
+                return rendered
+            return rendered + self._flush()
+        self._block_lines.append(line)
+        return rendered
+
+    def _flush(self):
+        self._blank_after_list = False
+        if not self._block_lines:
+            return ''
+        block = '\n'.join(self._block_lines)
+        self._block_lines = []
+        return convert(block, self.extensions)
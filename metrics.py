@@ -0,0 +1,323 @@
+"""In-process counters and histograms with Prometheus text exposition.
+
+Under a multi-worker server every process records into its own memory and a
+background thread flushes a snapshot to `<directory>/metrics_<pid>_<id>.json`
+(atomic replace). A scrape merges every file in the directory, so /metrics
+reports the sum over all workers, including ones that have since exited,
+whichever worker happens to serve it. Each process flushes once more at
+exit, so nothing recorded since its last flush is lost. Files left by exited
+workers are folded into one archive file when a worker starts recording and
+every COMPACT_INTERVAL seconds after, so totals stay monotonic while the
+directory stays small. Without a directory the registry is a plain
+single-process one.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no compaction of dead workers' files
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+ARCHIVE = 'metrics_archive.json'
+COMPACT_INTERVAL = 60.0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry._update(self, self._key(labels), amount)
+
+    def _merge(self, current, value):
+        return (current or 0) + value
+
+    def _render(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        index = bisect_left(self.buckets, value)
+        self.registry._update(self, self._key(labels), (index, value))
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def _merge(self, current, value):
+        """`value` is one observation (bucket index, value) or another state list to add"""
+        if current is None:
+            current = [0] * (len(self.buckets) + 3)  # per-bucket counts, +Inf, sum, count
+        if isinstance(value, tuple):
+            index, observed = value
+            current[index] += 1
+            current[-2] += observed
+            current[-1] += 1
+        else:
+            for i, v in enumerate(value):
+                current[i] += v
+        return current
+
+    def _render(self, values):
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-2]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', le))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]:g}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._values = {}  # metric name -> {label values: counter value / histogram state}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.directory = None
+        self.flush_interval = 5.0
+        self._path = None
+        self._flusher = None
+        self._flusher_pid = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def configure_multiprocess(self, directory, flush_interval=5.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.compact()
+
+    @contextmanager
+    def _directory_lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def compact(self):
+        """Fold the files of exited processes into the archive file"""
+        if not self.directory or fcntl is None:
+            return
+        archive = os.path.join(self.directory, ARCHIVE)
+        with self._directory_lock(exclusive=True):
+            dead = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*_*.json')):
+                pid = os.path.basename(path).split('_')[1]
+                if pid.isdigit() and not _pid_alive(int(pid)):
+                    dead.append(path)
+            if not dead:
+                return
+            # Keep every series: this process may not have registered all the metrics dead ones recorded
+            merged = self._merge_files(dead + [archive], known_only=False)
+            self._write(archive, merged)
+            for path in dead:
+                os.remove(path)
+
+    def _update(self, metric, key, value):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: values recorded before the fork belong to the parent's file
+                self._pid = os.getpid()
+                self._values = {}
+                self._path = None
+            series = self._values.setdefault(metric.name, {})
+            series[key] = metric._merge(series.get(key), value)
+        if self.directory:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            if self._flusher_pid != os.getpid():
+                # Handlers are inherited across fork; each one flushes only its own process
+                atexit.register(self._flush_at_exit, os.getpid())
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_at_exit(self, pid):
+        if pid == os.getpid():
+            self.flush()
+
+    def _flush_loop(self):
+        # Under --preload configure_multiprocess() ran in the master only; workers compact from here
+        compacted_at = 0.0
+        while True:
+            if time.monotonic() - compacted_at >= COMPACT_INTERVAL:
+                compacted_at = time.monotonic()
+                try:
+                    self.compact()
+                except OSError as e:
+                    logger.warning("Metrics compaction failed: %s", e)
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file (multiprocess mode only)"""
+        if not self.directory:
+            return
+        # The exit flush may race the flusher thread; an older snapshot must not be written last
+        with self._flush_lock:
+            with self._lock:
+                if self._path is None:
+                    self._path = os.path.join(self.directory, f"metrics_{os.getpid()}_{uuid.uuid4().hex[:8]}.json")
+                values = self._copy_values()
+                path = self._path
+            try:
+                self._write(path, values)
+            except OSError as e:
+                logger.warning("Metrics flush failed: %s", e)
+
+    def _copy_values(self):
+        return {name: {key: (list(v) if isinstance(v, list) else v) for key, v in series.items()}
+                for name, series in self._values.items()}
+
+    @staticmethod
+    def _write(path, values):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({name: [[list(key), value] for key, value in series.items()]
+                       for name, series in values.items()}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _add(current, value):
+        """Stored states add up whatever the metric: counter values, or histogram state lists"""
+        if current is None:
+            return list(value) if isinstance(value, list) else value
+        if isinstance(value, list):
+            return [a + b for a, b in zip(current, value)]
+        return current + value
+
+    def _merge_files(self, paths, known_only=True):
+        merged = {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # not written yet; picked up next time
+            for name, series in data.items():
+                if known_only and name not in self.metrics:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in series:
+                    key = tuple(key)
+                    target[key] = self._add(target.get(key), value)
+        return merged
+
+    def collect(self):
+        """{metric name: {label values: value}} for this process, or merged over all workers"""
+        if not self.directory:
+            with self._lock:
+                return self._copy_values()
+        self.flush()
+        # Shared lock: never see a dead worker's values both in its file and in the archive
+        with self._directory_lock(exclusive=False):
+            return self._merge_files(glob.glob(os.path.join(self.directory, 'metrics_*.json')))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric._render(values.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
@@ -0,0 +1,241 @@
+"""Shared OpenRouter HTTP client: pooled session, retries and a circuit breaker.
+
+`requests` is imported on the first call, so processes that never reach the
+LLM (e.g. workers only serving pages) do not load it.
+"""
+import json
+import random
+import threading
+import time
+
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class OpenRouterError(Exception):
+    """The upstream call failed (after retries)"""
+
+
+class CircuitOpenError(OpenRouterError):
+    """The breaker is open; the upstream is not being called at all"""
+
+
+class RequestCancelled(OpenRouterError):
+    """The caller no longer wants the result (e.g. a hedged call's loser); no further retries"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe.
+
+    After `failure_threshold` consecutive failures the breaker opens for
+    `reset_timeout` seconds; then one probe call is let through and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def is_open(self):
+        """True while calls would be rejected outright"""
+        with self._lock:
+            state = self._state_locked()
+            return state == 'open' or (state == 'half-open' and self._probing)
+
+    def allow(self):
+        with self._lock:
+            state = self._state_locked()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class OpenRouterClient:
+    def __init__(self, url, api_key, referer="http://localhost:5000", title="DSA Learning Platform",
+                 connect_timeout=3.05, read_timeout=60, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, pool_size=20, breaker=None, total_timeout=None):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        # No retry starts unless it can finish within this many seconds of the first attempt
+        self.total_timeout = total_timeout if total_timeout is not None else 2 * read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": referer,
+            "X-Title": title
+        }
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def _backoff(self, attempt, response=None, cancelled=None):
+        """Full-jitter exponential backoff, honouring a short Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+        if cancelled is not None:
+            cancelled.wait(delay)
+        else:
+            time.sleep(delay)
+
+    @staticmethod
+    def _connect_failed(error):
+        """True when the request never reached the upstream, so sending it again cannot bill it twice"""
+        import requests
+        from urllib3.exceptions import NewConnectionError
+
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+    def _post(self, payload, stream=False, cancelled=None):
+        """POST with retries; returns an OK response or raises OpenRouterError.
+
+        Completions are paid and not idempotent, so only connect failures and
+        RETRYABLE_STATUSES are retried, never a timeout or error while reading,
+        and only while the retry fits in `total_timeout`. Setting the
+        `cancelled` event stops further retries; an attempt already in flight
+        runs to completion.
+        """
+        import requests
+
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenRouter circuit breaker is open")
+
+        started = time.monotonic()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt and cancelled is not None and cancelled.is_set():
+                # Nobody wants the retry's result, but the failed attempts still count against the upstream
+                self.breaker.record_failure()
+                raise RequestCancelled(f"Cancelled after {attempt} failed attempt(s)") from last_error
+            response = None
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout, stream=stream)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    response.raise_for_status()
+                    return response
+                last_error = OpenRouterError(f"HTTP {response.status_code} from OpenRouter")
+                response.close()
+            except requests.HTTPError as e:
+                # Non-retryable 4xx: the request itself is wrong, not the upstream
+                self.breaker.record_success()
+                raise OpenRouterError(str(e)) from e
+            except requests.RequestException as e:
+                last_error = e
+                if not self._connect_failed(e):
+                    break  # the upstream may be working on it already
+            if attempt == self.max_retries \
+                    or time.monotonic() - started + self.backoff_max + sum(self.timeout) > self.total_timeout:
+                break
+            self._backoff(attempt, response, cancelled)
+
+        self.breaker.record_failure()
+        raise OpenRouterError(str(last_error)) from last_error
+
+    def complete(self, payload, usage=None, cancelled=None):
+        """Blocking chat completion; returns the message content.
+
+        Token counts reported by the upstream are copied into `usage` (a dict) if given.
+        """
+        response = self._post(payload, cancelled=cancelled)
+        try:
+            body = response.json()
+            content = body['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self.breaker.record_failure()
+            raise OpenRouterError(f"Malformed OpenRouter response: {e}") from e
+        self.breaker.record_success()
+        if usage is not None and isinstance(body.get('usage'), dict):
+            usage.update(body['usage'])
+        return content
+
+    def stream(self, payload, usage=None):
+        """Yield content deltas from a `stream: true` chat completion (usage as in complete)"""
+        import requests
+
+        payload = dict(payload, stream=True)
+        response = self._post(payload, stream=True)
+        try:
+            with response:
+                # SSE is always UTF-8; without a charset in the Content-Type requests would assume ISO-8859-1
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue  # blank separators and ": OPENROUTER PROCESSING" keep-alives
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    try:
+                        chunk = json.loads(data)
+                        if usage is not None and isinstance(chunk.get('usage'), dict):
+                            usage.update(chunk['usage'])  # sent with the final chunk
+                        delta = chunk['choices'][0].get('delta', {}).get('content')
+                    except (ValueError, KeyError, IndexError, AttributeError):
+                        continue
+                    if delta:
+                        yield delta
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise OpenRouterError(str(e)) from e
+        except GeneratorExit:
+            # Client went away mid-stream; the upstream itself was healthy
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
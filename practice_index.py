@@ -0,0 +1,139 @@
+"""Inverted indexes over practice problems for filtered, cursor-paginated queries.
+
+Every problem gets a rank in each supported sort order. Postings map a
+facet value (category, difficulty, concept) to the set of matching problems
+and, per sort order, to the sorted ranks of those problems. A query walks
+the shortest matching posting list in rank order from the cursor, checking
+the other filters by set membership, and stops after one page, so the cost
+depends on the page size and the filters' selectivity, not the catalogue.
+"""
+import base64
+import json
+from bisect import bisect_left
+from itertools import islice
+
+
+DIFFICULTY_ORDER = {'Easy': 0, 'Medium': 1, 'Hard': 2}
+SORTS = {
+    'id': lambda p: (p.id,),
+    'title': lambda p: (p.title.lower(), p.id),
+    'difficulty': lambda p: (DIFFICULTY_ORDER.get(p.difficulty, len(DIFFICULTY_ORDER)), p.id),
+}
+FACETS = ('category', 'difficulty', 'concept')
+
+
+class CursorError(ValueError):
+    pass
+
+
+def facet_values(problem, facet):
+    if facet == 'concept':
+        return [c.lower() for c in problem.concepts]
+    if facet == 'category':
+        return [problem.category.lower()]
+    return [problem.difficulty.lower()]
+
+
+class PracticeIndex:
+    def __init__(self, problems, version=''):
+        self.problems = tuple(problems)
+        self.version = version
+        doc_ids = range(len(self.problems))
+        # order[sort] lists doc ids by rank; rank[sort][doc] is the inverse
+        self.order = {name: sorted(doc_ids, key=lambda d, k=key: k(self.problems[d])) for name, key in SORTS.items()}
+        self.rank = {}
+        for name, order in self.order.items():
+            ranks = [0] * len(order)
+            for position, doc in enumerate(order):
+                ranks[doc] = position
+            self.rank[name] = ranks
+
+        self.postings = {}
+        for doc, problem in enumerate(self.problems):
+            for facet in FACETS:
+                for value in facet_values(problem, facet):
+                    self.postings.setdefault((facet, value), set()).add(doc)
+        self.sorted_postings = {
+            name: {key: sorted(ranks[d] for d in docs) for key, docs in self.postings.items()}
+            for name, ranks in self.rank.items()}
+        self.text = [' '.join((p.title, *p.concepts)).lower() for p in self.problems]
+        self.categories = sorted({p.category for p in self.problems})
+        self.concepts = sorted({c for p in self.problems for c in p.concepts})
+
+    def encode_cursor(self, sort, rank):
+        raw = json.dumps([self.version, sort, rank], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, sort):
+        try:
+            version, cursor_sort, rank = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (ValueError, TypeError):
+            raise CursorError("Invalid cursor")
+        if version != self.version or cursor_sort != sort:
+            raise CursorError("Cursor is stale; restart from the first page")
+        return rank
+
+    def query(self, filters=(), sort='id', limit=24, cursor=None, text='', with_totals=None):
+        """Page of problems matching every (facet, value) filter and, optionally,
+        a substring of the title or concepts.
+
+        Returns {'problems', 'next_cursor'} plus 'total' and difficulty
+        'facets' on the first page (or when with_totals is set).
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        keys = [(facet, value.lower()) for facet, value in filters]
+        text = text.strip().lower()
+        start = self.decode_cursor(cursor, sort) + 1 if cursor else 0
+        page = []
+        next_rank = None
+        if all(key in self.postings for key in keys):
+            keys.sort(key=lambda key: len(self.postings[key]))
+            if keys:
+                driver = self.sorted_postings[sort][keys[0]]
+                ranks = islice(driver, bisect_left(driver, start), None)
+            else:
+                ranks = range(start, len(self.problems))
+            others = [self.postings[key] for key in keys[1:]]
+            order = self.order[sort]
+            last_rank = None
+            for rank in ranks:
+                doc = order[rank]
+                if all(doc in docs for docs in others) and (not text or text in self.text[doc]):
+                    if len(page) == limit:
+                        next_rank = last_rank
+                        break
+                    page.append(doc)
+                    last_rank = rank
+
+        result = {
+            'problems': [self.problems[doc] for doc in page],
+            'next_cursor': self.encode_cursor(sort, next_rank) if next_rank is not None else None
+        }
+        if with_totals is None:
+            with_totals = cursor is None
+        if with_totals:
+            result.update(self.totals(keys, text))
+        return result
+
+    def totals(self, keys, text=''):
+        """Match count and per-difficulty counts for a query"""
+        if not keys and not text:
+            by_difficulty = {name: len(self.postings.get(('difficulty', name.lower()), ()))
+                             for name in DIFFICULTY_ORDER}
+            return {'total': len(self.problems), 'facets': {'difficulty': by_difficulty}}
+        matched = self.match_all(keys, text)
+        by_difficulty = {name: len(matched & self.postings.get(('difficulty', name.lower()), set()))
+                         for name in DIFFICULTY_ORDER}
+        return {'total': len(matched), 'facets': {'difficulty': by_difficulty}}
+
+    def match_all(self, keys, text=''):
+        if any(key not in self.postings for key in keys):
+            return set()
+        if keys:
+            matched = set.intersection(*sorted((self.postings[key] for key in keys), key=len))
+        else:
+            matched = set(range(len(self.problems)))
+        if text:
+            matched = {doc for doc in matched if text in self.text[doc]}
+        return matched
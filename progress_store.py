@@ -0,0 +1,166 @@
+"""Persistent quiz progress with an incrementally maintained leaderboard.
+
+Every submission is appended to `quiz_attempts`; `best_scores` keeps one row
+per (user, topic) and `user_totals` the sum of a user's best scores. The
+`leaderboard` table is a materialized top-K per board (each topic id, plus
+'overall'): a submission touches at most one row per board and trims the
+board back to K, so reading it never scans attempts. Best scores only ever
+go up, which is what keeps the incremental top-K exact.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+OVERALL = 'overall'
+
+
+class ProgressStore:
+    def __init__(self, path, top_k=10):
+        self.path = path
+        self.top_k = top_k
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS quiz_attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                topic_id TEXT NOT NULL,
+                score REAL NOT NULL,
+                correct INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                difficulty TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user_topic ON quiz_attempts(user_id, topic_id);
+            CREATE TABLE IF NOT EXISTS best_scores (
+                user_id TEXT NOT NULL,
+                topic_id TEXT NOT NULL,
+                score REAL NOT NULL,
+                correct INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                passed INTEGER NOT NULL,
+                difficulty TEXT NOT NULL,
+                last_attempt TEXT NOT NULL,
+                PRIMARY KEY (user_id, topic_id)
+            );
+            CREATE TABLE IF NOT EXISTS user_totals (
+                user_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                total_score REAL NOT NULL,
+                topics_passed INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                board TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                score REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (board, user_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_rank ON leaderboard(board, score DESC, updated_at);
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record_attempt(self, user_id, name, topic_id, score, correct, total, difficulty='mixed'):
+        """Store an attempt; returns (previous best or None, improved)"""
+        score = round(score, 1)
+        passed = score >= 70
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO quiz_attempts (user_id, topic_id, score, correct, total, difficulty, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, topic_id, score, correct, total, difficulty, now))
+            row = conn.execute(
+                "SELECT score, passed FROM best_scores WHERE user_id = ? AND topic_id = ?",
+                (user_id, topic_id)).fetchone()
+            previous_best = row[0] if row else None
+            improved = row is None or score > previous_best
+            if improved:
+                conn.execute(
+                    "INSERT OR REPLACE INTO best_scores "
+                    "(user_id, topic_id, score, correct, total, passed, difficulty, last_attempt) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, topic_id, score, correct, total, int(passed), difficulty, now))
+                delta = score - (previous_best or 0)
+                newly_passed = int(passed and not (row and row[1]))
+                conn.execute("""
+                    INSERT INTO user_totals (user_id, name, total_score, topics_passed) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        name = excluded.name,
+                        total_score = total_score + ?,
+                        topics_passed = topics_passed + ?
+                """, (user_id, name, delta, newly_passed, delta, newly_passed))
+                total_score = conn.execute(
+                    "SELECT total_score FROM user_totals WHERE user_id = ?", (user_id,)).fetchone()[0]
+                self._offer(conn, topic_id, user_id, name, score)
+                self._offer(conn, OVERALL, user_id, name, total_score)
+            else:
+                conn.execute("UPDATE best_scores SET last_attempt = ? WHERE user_id = ? AND topic_id = ?",
+                             (now, user_id, topic_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return previous_best, improved
+
+    def _offer(self, conn, board, user_id, name, score):
+        """Place a (higher) score on a top-K board if it makes the cut"""
+        rows = conn.execute(
+            "SELECT score FROM leaderboard WHERE board = ? ORDER BY score DESC, updated_at LIMIT ?",
+            (board, self.top_k)).fetchall()
+        on_board = conn.execute(
+            "SELECT 1 FROM leaderboard WHERE board = ? AND user_id = ?", (board, user_id)).fetchone()
+        if not on_board and len(rows) >= self.top_k and score <= rows[-1][0]:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO leaderboard (board, user_id, name, score, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (board, user_id, name, score, time.time()))
+        conn.execute("""
+            DELETE FROM leaderboard WHERE board = ? AND user_id NOT IN (
+                SELECT user_id FROM leaderboard WHERE board = ? ORDER BY score DESC, updated_at LIMIT ?
+            )
+        """, (board, board, self.top_k))
+
+    def get_progress(self, user_id):
+        """Best score per topic, in the shape templates expect for quiz_progress"""
+        rows = self._conn().execute(
+            "SELECT topic_id, score, correct, total, passed, difficulty, last_attempt "
+            "FROM best_scores WHERE user_id = ?", (user_id,)).fetchall()
+        return {
+            topic_id: {
+                'score': score,
+                'correct': correct,
+                'total': total,
+                'passed': bool(passed),
+                'last_attempt': last_attempt,
+                'difficulty': difficulty
+            }
+            for topic_id, score, correct, total, passed, difficulty, last_attempt in rows
+        }
+
+    def leaderboards(self):
+        """{board: [{'rank', 'user_id', 'name', 'score'}, ...]} for every board"""
+        boards = {}
+        rows = self._conn().execute(
+            "SELECT board, user_id, name, score FROM leaderboard ORDER BY board, score DESC, updated_at")
+        for board, user_id, name, score in rows:
+            entries = boards.setdefault(board, [])
+            entries.append({'rank': len(entries) + 1, 'user_id': user_id, 'name': name, 'score': round(score, 1)})
+        return boards
@@ -0,0 +1,236 @@
+"""Persistent question bank with MinHash/LSH near-duplicate rejection.
+
+Every generated question is offered to the bank for its topic. A question is
+reduced to word 2-shingles over its text and options, summarized by a MinHash
+signature, and split into LSH bands; only questions sharing a band bucket are
+compared, so a near-duplicate check touches a handful of rows however large
+the bank grows. Quizzes are assembled from banked questions the learner has
+not been served yet (`bank_seen`).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def shingles(question, size=2):
+    text = question.get('question', '') + ' ' + ' '.join(
+        str(question.get('options', {}).get(key, '')) for key in sorted(question.get('options', {})))
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def signature(self, tokens):
+        hashed = [struct.unpack('<Q', hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest())[0]
+                  for t in tokens]
+        return array('Q', (min(((a * h + b) % MERSENNE_PRIME) for h in hashed) for a, b in self._params))
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class QuestionBank:
+    def __init__(self, path, num_perm=128, bands=32, threshold=0.6):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._local = threading.local()
+        self._stats = {'added': 0, 'rejected_exact': 0, 'rejected_near': 0, 'served': 0}
+        self._stats_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS bank_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic_id TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                question TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (topic_id, fingerprint)
+            );
+            CREATE INDEX IF NOT EXISTS idx_bank_questions_key ON bank_questions(topic_id, difficulty);
+            CREATE INDEX IF NOT EXISTS idx_bank_questions_topic ON bank_questions(topic_id);
+            CREATE TABLE IF NOT EXISTS bank_lsh (
+                topic_id TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                question_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_bank_lsh_bucket ON bank_lsh(topic_id, band, bucket);
+            CREATE TABLE IF NOT EXISTS bank_seen (
+                user_id TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                served_at REAL NOT NULL,
+                PRIMARY KEY (user_id, question_id)
+            );
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, field, n=1):
+        with self._stats_lock:
+            self._stats[field] += n
+
+    def _bands(self, signature):
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [hashlib.blake2b(raw[i * width:(i + 1) * width], digest_size=8).hexdigest()
+                for i in range(self.bands)]
+
+    def add(self, topic_id, difficulty, question):
+        """Bank a question; returns its id, or None if it (nearly) duplicates a banked one"""
+        tokens = shingles(question)
+        fingerprint = hashlib.sha1('\n'.join(sorted(tokens)).encode('utf-8')).hexdigest()
+        signature = self.hasher.signature(tokens)
+        buckets = self._bands(signature)
+        record = {k: v for k, v in question.items() if k != 'question_html'}
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM bank_questions WHERE topic_id = ? AND fingerprint = ?",
+                            (topic_id, fingerprint)).fetchone():
+                conn.execute("ROLLBACK")
+                self._count('rejected_exact')
+                return None
+
+            clauses = ' OR '.join('(band = ? AND bucket = ?)' for _ in buckets)
+            params = [topic_id] + [v for band, bucket in enumerate(buckets) for v in (band, bucket)]
+            candidates = conn.execute(f"""
+                SELECT signature FROM bank_questions WHERE id IN (
+                    SELECT DISTINCT question_id FROM bank_lsh WHERE topic_id = ? AND ({clauses})
+                )
+            """, params).fetchall()
+            for (blob,) in candidates:
+                if similarity(signature, array('Q', blob)) >= self.threshold:
+                    conn.execute("ROLLBACK")
+                    self._count('rejected_near')
+                    return None
+
+            question_id = conn.execute(
+                "INSERT INTO bank_questions (topic_id, difficulty, fingerprint, signature, question, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (topic_id, difficulty, fingerprint, signature.tobytes(), json.dumps(record), time.time())).lastrowid
+            conn.executemany(
+                "INSERT INTO bank_lsh (topic_id, band, bucket, question_id) VALUES (?, ?, ?, ?)",
+                [(topic_id, band, bucket, question_id) for band, bucket in enumerate(buckets)])
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        self._count('added')
+        return question_id
+
+    def assemble(self, topic_id, difficulty, count, user_id=None, exclude_ids=()):
+        """Up to `count` random banked questions the user has not been served; marks them served.
+
+        'mixed' draws from every difficulty of the topic. Returns (ids, questions).
+        Each question is the first eligible one at or after a random id (wrapping
+        around), an index seek instead of ORDER BY RANDOM() over the whole topic.
+        """
+        conn = self._conn()
+        # Separate subqueries: SQLite answers MIN or MAX of the rowid alone from the b-tree ends, not both
+        low, high = conn.execute(
+            "SELECT (SELECT MIN(id) FROM bank_questions), (SELECT MAX(id) FROM bank_questions)").fetchone()
+        if low is None or count <= 0:
+            return [], []
+        where = "topic_id = ?"
+        params = [topic_id]
+        if difficulty != 'mixed':
+            where += " AND difficulty = ?"
+            params.append(difficulty)
+        if user_id:
+            where += " AND NOT EXISTS (SELECT 1 FROM bank_seen s WHERE s.user_id = ? AND s.question_id = q.id)"
+            params.append(user_id)
+        if exclude_ids:
+            where += f" AND id NOT IN ({','.join('?' * len(exclude_ids))})"
+            params.extend(exclude_ids)
+
+        picked = {}
+        probe = f"SELECT id, question FROM bank_questions q WHERE {where} AND id >= ? ORDER BY id LIMIT 1"
+        for _ in range(count * 3):
+            if len(picked) >= count:
+                break
+            row = (conn.execute(probe, params + [random.randint(low, high)]).fetchone()
+                   or conn.execute(probe, params + [low]).fetchone())
+            if row is None:
+                break  # nothing eligible
+            picked.setdefault(row[0], row[1])
+        if 0 < len(picked) < count:
+            # Fewer eligible questions than probes could find (or an unlucky run): take the rest in order
+            rest = conn.execute(
+                f"SELECT id, question FROM bank_questions q WHERE {where} "
+                f"AND id NOT IN ({','.join('?' * len(picked))}) ORDER BY id LIMIT ?",
+                params + list(picked) + [count - len(picked)]).fetchall()
+            picked.update(rest)
+        rows = list(picked.items())
+        ids = [row[0] for row in rows]
+        if user_id:
+            self.mark_seen(user_id, ids)
+        self._count('served', len(ids))
+        return ids, [json.loads(row[1]) for row in rows]
+
+    def recent_questions(self, topic_id, difficulty, limit):
+        """Question texts of the `limit` most recently banked questions ('mixed': any difficulty)"""
+        if limit <= 0:
+            return []
+        sql = "SELECT question FROM bank_questions WHERE topic_id = ?"
+        params = [topic_id]
+        if difficulty != 'mixed':
+            sql += " AND difficulty = ?"
+            params.append(difficulty)
+        rows = self._conn().execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [json.loads(row[0])['question'] for row in rows]
+
+    def mark_seen(self, user_id, question_ids):
+        if not user_id or not question_ids:
+            return
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR IGNORE INTO bank_seen (user_id, question_id, served_at) VALUES (?, ?, ?)",
+            [(user_id, question_id, now) for question_id in question_ids])
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        rows = self._conn().execute(
+            "SELECT topic_id, difficulty, COUNT(*) FROM bank_questions GROUP BY topic_id, difficulty").fetchall()
+        stats['questions'] = {f"{topic_id}/{difficulty}": count for topic_id, difficulty, count in rows}
+        return stats
@@ -0,0 +1,1131 @@
+"""Procedural quiz questions whose answers are computed, not written.
+
+Each generator builds a random instance (an array, a graph, a knapsack, a
+loop nest), runs the algorithm in question on it and asks for the result.
+Distractors come from the mistakes learners actually make: the neighbouring
+algorithm (DFS for BFS, upper for lower bound), an off-by-one, a greedy
+shortcut where DP is needed. Every question is checked to have four distinct
+options with exactly one right answer, so offline and outage quizzes are real
+quizzes at no upstream cost.
+
+    generate_questions('graphs', 'medium', 5)  # -> [{'question', 'options', 'correct', 'explanation'}, ...]
+"""
+import functools
+import heapq
+import itertools
+import math
+import random
+from collections import deque
+
+
+GENERATORS = {}
+SIZES = {'easy': 5, 'medium': 7, 'hard': 9}
+LETTERS = 'ABCD'
+
+
+def generator(*topic_ids):
+    def register(fn):
+        for topic_id in topic_ids:
+            GENERATORS.setdefault(topic_id, []).append(fn)
+        return fn
+    return register
+
+
+def fmt(values):
+    return '[' + ', '.join(str(v) for v in values) + ']'
+
+
+def chain(values):
+    return ' → '.join(str(v) for v in values) if values else '(empty)'
+
+
+def make_question(rng, text, correct, distractors, perturb, explanation):
+    """Question dict with the right answer at a random letter; None if four distinct options cannot be found"""
+    correct = str(correct)
+    wrong = []
+    for candidate in itertools.chain(distractors, (perturb() for _ in range(40))):
+        candidate = str(candidate)
+        if candidate != correct and candidate not in wrong:
+            wrong.append(candidate)
+        if len(wrong) == 3:
+            break
+    else:
+        return None
+    position = rng.randrange(4)
+    wrong.insert(position, correct)
+    return {'question': text, 'options': dict(zip(LETTERS, wrong)), 'correct': LETTERS[position],
+            'explanation': explanation}
+
+
+def near(rng, value, spread=3, low=0):
+    return lambda: max(low, value + rng.choice([d for d in range(-spread, spread + 1) if d]))
+
+
+def shuffled(rng, values):
+    values = list(values)
+    return lambda: fmt(rng.sample(values, len(values)))
+
+
+# ---------------------------------------------------------------- arrays & strings
+
+@generator('arrays-strings')
+def prefix_sum_query(rng, size):
+    a = [rng.randint(1, 9) for _ in range(size + 2)]
+    left = rng.randrange(1, len(a) - 2)
+    right = rng.randrange(left + 1, len(a))
+    prefix = [0]
+    for x in a:
+        prefix.append(prefix[-1] + x)
+    answer = prefix[right + 1] - prefix[left]
+    return make_question(
+        rng, f"With prefix sums `P[i] = a[0] + ... + a[i-1]` over `a = {fmt(a)}`, what is the sum of "
+             f"`a[{left}..{right}]` (both ends inclusive)?",
+        answer, [prefix[right] - prefix[left], prefix[right + 1] - prefix[left + 1], prefix[right + 1]],
+        near(rng, answer, 4, 1),
+        f"P[{right + 1}] - P[{left}] = {prefix[right + 1]} - {prefix[left]} = {answer}; "
+        f"P[r] - P[l] would drop a[{right}].")
+
+
+@generator('arrays-strings')
+def sliding_window_max(rng, size):
+    a = [rng.randint(-5, 9) for _ in range(size + 3)]
+    k = rng.randint(2, 4)
+    sums = [sum(a[i:i + k]) for i in range(len(a) - k + 1)]
+    answer = max(sums)
+    return make_question(
+        rng, f"Using a sliding window, what is the largest sum of any {k} consecutive elements of `{fmt(a)}`?",
+        answer, [sum(sorted(a)[-k:]), sums[0], max(sum(a[i:i + k - 1]) for i in range(len(a) - k + 2))],
+        near(rng, answer, 4),
+        f"Window sums are {fmt(sums)}; the maximum is {answer}. Taking the {k} largest values ignores contiguity.")
+
+
+@generator('arrays-strings')
+def longest_unique_substring(rng, size):
+    s = ''.join(rng.choice('abcd'[:3 + (size > 6)]) for _ in range(size + 4))
+    best, start, last = 0, 0, {}
+    for i, ch in enumerate(s):
+        if last.get(ch, -1) >= start:
+            start = last[ch] + 1
+        last[ch] = i
+        best = max(best, i - start + 1)
+    return make_question(
+        rng, f"What is the length of the longest substring of `\"{s}\"` without repeating characters?",
+        best, [len(set(s)) + (best == len(set(s))), best + 1, best - 1], near(rng, best, 2, 1),
+        f"A sliding window that jumps past the previous occurrence of a repeated character finds length {best}.")
+
+
+# ---------------------------------------------------------------- linked lists
+
+@generator('linked-lists')
+def remove_nth_from_end(rng, size):
+    values = rng.sample(range(1, 30), size)
+    n = rng.randint(1, size - 1)
+    answer = values[:size - n] + values[size - n + 1:]
+    from_start = values[:n - 1] + values[n:]
+    one_more = values[:size - n - 1] + values[size - n:]
+    return make_question(
+        rng, f"Remove the {n}th node from the end of `{chain(values)}` (two pointers {n} apart). What is the list?",
+        chain(answer), [chain(from_start), chain(one_more), chain(values[:-1])],
+        lambda: chain(rng.sample(answer, len(answer))),
+        f"The {n}th node from the end is {values[size - n]}, so the result is {chain(answer)}.")
+
+
+@generator('linked-lists')
+def reverse_between(rng, size):
+    values = rng.sample(range(1, 30), size)
+    m = rng.randint(1, size - 2)
+    n = rng.randint(m + 1, size)
+
+    def rev(lo, hi):
+        return values[:lo - 1] + values[lo - 1:hi][::-1] + values[hi:]
+    return make_question(
+        rng, f"Reverse positions {m} to {n} (1-indexed, inclusive) of `{chain(values)}`. What is the result?",
+        chain(rev(m, n)), [chain(rev(m, n - 1)) if n - 1 > m else chain(values[::-1]), chain(rev(m + 1, n)),
+                           chain(values[::-1])],
+        lambda: chain(rng.sample(values, size)),
+        f"Only the nodes {chain(values[m - 1:n])} are reversed in place.")
+
+
+@generator('linked-lists')
+def slow_fast_middle(rng, size):
+    values = rng.sample(range(1, 50), size + rng.randint(0, 1))
+    slow = fast = 0
+    while fast < len(values) and fast + 1 < len(values):
+        slow, fast = slow + 1, fast + 2
+    answer = values[slow]
+    return make_question(
+        rng, f"On `{chain(values)}`, `slow` moves 1 step and `fast` 2 steps while `fast and fast.next`. "
+             f"Which value is `slow` on when the loop ends?",
+        answer, [values[slow - 1], values[min(slow + 1, len(values) - 1)], values[-1]],
+        lambda: rng.choice(values),
+        f"The list has {len(values)} nodes, so slow stops at index {slow} (the "
+        f"{'second ' if len(values) % 2 == 0 else ''}middle): {answer}.")
+
+
+# ---------------------------------------------------------------- stacks & queues
+
+def random_expression(rng, leaves):
+    if leaves == 1:
+        value = rng.randint(1, 9)
+        return [str(value)], value
+    left_leaves = rng.randint(1, leaves - 1)
+    left_tokens, left = random_expression(rng, left_leaves)
+    right_tokens, right = random_expression(rng, leaves - left_leaves)
+    op = rng.choice('+-*')
+    value = left + right if op == '+' else left - right if op == '-' else left * right
+    return left_tokens + right_tokens + [op], value
+
+
+@generator('stacks-queues')
+def postfix_evaluation(rng, size):
+    tokens, value = random_expression(rng, max(3, size // 2 + 1))
+    stack = []
+    swapped = []
+    for token in tokens:
+        if token.isdigit():
+            stack.append(int(token))
+            swapped.append(int(token))
+            continue
+        b, a = stack.pop(), stack.pop()
+        stack.append(a + b if token == '+' else a - b if token == '-' else a * b)
+        b, a = swapped.pop(), swapped.pop()
+        swapped.append(b + a if token == '+' else b - a if token == '-' else b * a)
+    return make_question(
+        rng, f"Evaluate the postfix expression `{' '.join(tokens)}` with a stack.",
+        value, [swapped[0], value + 1, -value], near(rng, value, 5),
+        f"Each operator pops the right operand first, then the left; the final stack holds {value}. "
+        f"Popping them in the wrong order gives {swapped[0]}.")
+
+
+@generator('stacks-queues')
+def next_greater(rng, size):
+    a = [rng.randint(1, 9) for _ in range(size)]
+    answer, stack = [-1] * size, []
+    for i, x in enumerate(a):
+        while stack and a[stack[-1]] < x:
+            answer[stack.pop()] = x
+        stack.append(i)
+    greater_or_equal = [next((y for y in a[i + 1:] if y >= x), -1) for i, x in enumerate(a)]
+    previous = [next((y for y in reversed(a[:i]) if y > x), -1) for i, x in enumerate(a)]
+    suffix_max = [max(a[i + 1:], default=-1) for i in range(size)]
+    return make_question(
+        rng, f"Using a monotonic stack, what is the next greater element array of `{fmt(a)}` (-1 if none)?",
+        fmt(answer), [fmt(greater_or_equal), fmt(previous), fmt(suffix_max)], shuffled(rng, answer),
+        f"Each value is popped when a strictly larger value arrives, giving {fmt(answer)}.")
+
+
+@generator('stacks-queues')
+def stack_vs_queue(rng, size):
+    ops, pushed, removed_stack, removed_queue = [], [], [], []
+    stack, queue, value = [], deque(), 1
+    for _ in range(size + 3):
+        if stack and rng.random() < 0.4:
+            ops.append('pop')
+            removed_stack.append(stack.pop())
+            removed_queue.append(queue.popleft())
+        else:
+            value += rng.randint(1, 5)
+            ops.append(f"push {value}")
+            pushed.append(value)
+            stack.append(value)
+            queue.append(value)
+    if not removed_stack:
+        ops.append('pop')
+        removed_stack.append(stack.pop())
+        removed_queue.append(queue.popleft())
+    return make_question(
+        rng, f"A stack runs `{', '.join(ops)}`. In what order are values removed?",
+        fmt(removed_stack), [fmt(removed_queue), fmt(pushed[:len(removed_stack)]), fmt(removed_stack[::-1])],
+        shuffled(rng, pushed[:len(removed_stack) + 1]),
+        f"LIFO: each pop removes the most recent push still on the stack, giving {fmt(removed_stack)}; "
+        f"a queue would give {fmt(removed_queue)}.")
+
+
+# ---------------------------------------------------------------- trees
+
+def bst_insert(keys):
+    tree = {}
+    root = keys[0]
+    tree[root] = [None, None]
+    for key in keys[1:]:
+        node = root
+        while True:
+            side = 0 if key < node else 1
+            if tree[node][side] is None:
+                tree[node][side] = key
+                tree[key] = [None, None]
+                break
+            node = tree[node][side]
+    return root, tree
+
+
+def traverse(tree, node, order):
+    if node is None:
+        return []
+    left, right = tree[node]
+    if order == 'preorder':
+        return [node] + traverse(tree, left, order) + traverse(tree, right, order)
+    if order == 'inorder':
+        return traverse(tree, left, order) + [node] + traverse(tree, right, order)
+    return traverse(tree, left, order) + traverse(tree, right, order) + [node]
+
+
+def level_order(tree, root):
+    order, queue = [], deque([root])
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        queue.extend(child for child in tree[node] if child is not None)
+    return order
+
+
+@generator('trees')
+def bst_traversal(rng, size):
+    keys = rng.sample(range(1, 60), size)
+    root, tree = bst_insert(keys)
+    orders = {name: traverse(tree, root, name) for name in ('preorder', 'inorder', 'postorder')}
+    orders['level-order'] = level_order(tree, root)
+    asked = rng.choice(['preorder', 'postorder', 'level-order'])
+    return make_question(
+        rng, f"Insert `{fmt(keys)}` into an empty BST in that order. What is its {asked} traversal?",
+        fmt(orders[asked]), [fmt(v) for k, v in orders.items() if k != asked], shuffled(rng, keys),
+        f"The root is {root}; the {asked} traversal of the resulting tree is {fmt(orders[asked])}.")
+
+
+@generator('trees')
+def bst_height(rng, size):
+    keys = rng.sample(range(1, 60), size + 2)
+    root, tree = bst_insert(keys)
+
+    def height(node):
+        return -1 if node is None else 1 + max(height(tree[node][0]), height(tree[node][1]))
+    answer = height(root)
+    return make_question(
+        rng, f"What is the height (in edges) of the BST built by inserting `{fmt(keys)}` in order?",
+        answer, [answer + 1, math.floor(math.log2(len(keys))), answer - 1], near(rng, answer, 3),
+        f"The longest root-to-leaf path has {answer} edges; the tree is only as balanced as the insertion order.")
+
+
+# ---------------------------------------------------------------- heaps
+
+def heap_after_inserts(values):
+    heap = []
+    for v in values:
+        heapq.heappush(heap, v)
+    return heap
+
+
+@generator('heaps')
+def heap_inserts(rng, size):
+    values = rng.sample(range(1, 60), size)
+    answer = heap_after_inserts(values)
+    heapified = list(values)
+    heapq.heapify(heapified)
+    max_heap = [-v for v in heap_after_inserts([-v for v in values])]
+    explanation = f"Each insert appends and sifts up, giving {fmt(answer)}."
+    if heapified != answer:
+        first = fmt(heapified)
+        explanation += f" Bottom-up heapify of the same values gives {first}, which differs."
+    else:
+        # Heapify agrees here; forgetting the last sift-up is the mistake to offer instead
+        first = fmt(heap_after_inserts(values[:-1]) + values[-1:])
+    return make_question(
+        rng, f"Insert `{fmt(values)}` one at a time into an empty binary min-heap. What is the heap's array?",
+        fmt(answer), [first, fmt(sorted(values)), fmt(max_heap), fmt(values)], shuffled(rng, values),
+        explanation)
+
+
+@generator('heaps')
+def heap_extract_min(rng, size):
+    values = rng.sample(range(1, 60), size)
+    heap = heap_after_inserts(values)
+    before = list(heap)
+    heapq.heappop(heap)
+    no_sift = before[1:]
+    last_to_root = [before[-1]] + before[1:-1]
+    return make_question(
+        rng, f"A min-heap is stored as `{fmt(before)}`. What is the array after one extract-min?",
+        fmt(heap), [fmt(no_sift), fmt(last_to_root), fmt(sorted(before[1:]))], shuffled(rng, heap),
+        f"The last element {before[-1]} moves to the root and sifts down, giving {fmt(heap)}.")
+
+
+@generator('heaps')
+def heapify_array(rng, size):
+    values = rng.sample(range(1, 60), size)
+    answer = list(values)
+    heapq.heapify(answer)
+    return make_question(
+        rng, f"Run bottom-up heapify (sift-down from the last parent to the root) on `{fmt(values)}` to build a "
+             f"min-heap. What is the resulting array?",
+        fmt(answer), [fmt(heap_after_inserts(values)), fmt(sorted(values)), fmt(values)], shuffled(rng, values),
+        f"Sifting down indices {len(values) // 2 - 1}..0 in turn gives {fmt(answer)} in O(n) time.")
+
+
+# ---------------------------------------------------------------- hashing
+
+@generator('hashing')
+def linear_probing(rng, size):
+    m = rng.choice([7, 11, 13])
+    keys = rng.sample(range(10, 100), min(size, m - 2))
+    table = [None] * m
+    slots, probes = {}, {}
+    for key in keys:
+        i, steps = key % m, 0
+        while table[(i + steps) % m] is not None:
+            steps += 1
+        table[(i + steps) % m] = key
+        slots[key], probes[key] = (i + steps) % m, steps
+    key = max(keys, key=lambda k: (probes[k], keys.index(k)))
+    quadratic = next(((key % m + j * j) % m for j in range(m) if table[(key % m + j * j) % m] in (None, key)),
+                     (key % m + 1) % m)
+    return make_question(
+        rng, f"Keys `{fmt(keys)}` are inserted in order into a table of size {m} with `h(k) = k mod {m}` and "
+             f"linear probing. At which index does {key} end up?",
+        slots[key], [key % m, quadratic, (slots[key] + 1) % m], lambda: rng.randrange(m),
+        f"{key} hashes to {key % m} and probes {probes[key]} occupied slot(s), landing at {slots[key]}.")
+
+
+@generator('hashing')
+def chaining_longest(rng, size):
+    m = rng.choice([5, 7, 11])
+    keys = rng.sample(range(10, 100), size + 3)
+    chains = [0] * m
+    for key in keys:
+        chains[key % m] += 1
+    answer = max(chains)
+    return make_question(
+        rng, f"Keys `{fmt(keys)}` go into {m} buckets with `h(k) = k mod {m}` and separate chaining. How long is "
+             f"the longest chain?",
+        answer, [math.ceil(len(keys) / m), answer + 1, answer - 1], near(rng, answer, 2, 1),
+        f"Bucket sizes are {fmt(chains)}; the load factor {len(keys)}/{m} is only the average.")
+
+
+# ---------------------------------------------------------------- graphs
+
+def random_graph(rng, n, extra_edges, connected=True):
+    edges = set()
+    if connected:
+        for v in range(1, n):
+            edges.add((rng.randrange(v), v))
+    while len(edges) < (n - 1 if connected else 0) + extra_edges:
+        a, b = sorted(rng.sample(range(n), 2))
+        edges.add((a, b))
+    adjacency = {v: [] for v in range(n)}
+    for a, b in edges:
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+    for v in adjacency:
+        adjacency[v].sort()
+    return sorted(edges), adjacency
+
+
+def bfs(adjacency, start, reverse=False):
+    order, seen, queue = [], {start}, deque([start])
+    while queue:
+        v = queue.popleft()
+        order.append(v)
+        for w in (reversed(adjacency[v]) if reverse else adjacency[v]):
+            if w not in seen:
+                seen.add(w)
+                queue.append(w)
+    return order
+
+
+def dfs(adjacency, start, reverse=False):
+    order, seen = [], set()
+
+    def visit(v):
+        seen.add(v)
+        order.append(v)
+        for w in (reversed(adjacency[v]) if reverse else adjacency[v]):
+            if w not in seen:
+                visit(w)
+    visit(start)
+    return order
+
+
+def edge_list(edges):
+    return ', '.join(f"{a}-{b}" for a, b in edges)
+
+
+@generator('graphs')
+def bfs_order(rng, size):
+    edges, adjacency = random_graph(rng, size, size // 2)
+    answer = bfs(adjacency, 0)
+    return make_question(
+        rng, f"An undirected graph has edges `{edge_list(edges)}`. Starting at 0 and visiting neighbours in "
+             f"increasing order, what is the BFS order?",
+        fmt(answer), [fmt(dfs(adjacency, 0)), fmt(bfs(adjacency, 0, reverse=True)), fmt(sorted(answer))],
+        lambda: fmt([0] + rng.sample(answer[1:], len(answer) - 1)),
+        f"BFS finishes each level before the next: {fmt(answer)}.")
+
+
+@generator('graphs')
+def dfs_order(rng, size):
+    edges, adjacency = random_graph(rng, size, size // 2)
+    answer = dfs(adjacency, 0)
+    return make_question(
+        rng, f"An undirected graph has edges `{edge_list(edges)}`. Starting at 0 and visiting neighbours in "
+             f"increasing order, what is the recursive DFS preorder?",
+        fmt(answer), [fmt(bfs(adjacency, 0)), fmt(dfs(adjacency, 0, reverse=True)), fmt(sorted(answer))],
+        lambda: fmt([0] + rng.sample(answer[1:], len(answer) - 1)),
+        f"DFS goes as deep as possible before backtracking: {fmt(answer)}.")
+
+
+@generator('graphs')
+def dijkstra_distance(rng, size):
+    edges, adjacency = random_graph(rng, size, size)
+    weights = {edge: rng.randint(1, 9) for edge in edges}
+    weight = lambda a, b: weights[(min(a, b), max(a, b))]
+    target = size - 1
+    dist, heap = {0: 0}, [(0, 0)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for w in adjacency[v]:
+            if d + weight(v, w) < dist.get(w, math.inf):
+                dist[w] = d + weight(v, w)
+                heapq.heappush(heap, (dist[w], w))
+    # Weight of the fewest-edges path: what plain BFS would report
+    parent, queue = {0: None}, deque([0])
+    while queue:
+        v = queue.popleft()
+        for w in adjacency[v]:
+            if w not in parent:
+                parent[w] = v
+                queue.append(w)
+    hops, v = 0, target
+    while parent[v] is not None:
+        hops += weight(v, parent[v])
+        v = parent[v]
+    answer = dist[target]
+    return make_question(
+        rng, f"Weighted undirected edges (u-v:w): `{', '.join(f'{a}-{b}:{w}' for (a, b), w in weights.items())}`. "
+             f"What is the shortest distance from 0 to {target} (Dijkstra)?",
+        answer, [hops, answer + min(weights.values()), answer - 1], near(rng, answer, 4, 1),
+        f"Dijkstra settles {target} at distance {answer}; the path with the fewest edges weighs {hops}.")
+
+
+@generator('graphs')
+def connected_components(rng, size):
+    n = size + 3
+    edges, adjacency = random_graph(rng, n, rng.randint(n // 3, n - 2), connected=False)
+    seen, components = set(), 0
+    for v in range(n):
+        if v not in seen:
+            components += 1
+            seen.update(bfs(adjacency, v))
+    return make_question(
+        rng, f"An undirected graph has vertices 0..{n - 1} and edges `{edge_list(edges)}`. How many connected "
+             f"components does it have?",
+        components, [n - len(edges), components + 1, components - 1], near(rng, components, 2, 1),
+        f"Running BFS from every unvisited vertex starts {components} searches"
+        f"{'; isolated vertices count too' if any(not adjacency[v] for v in adjacency) else ''}.")
+
+
+def is_topological(order, edges):
+    position = {v: i for i, v in enumerate(order)}
+    return all(position[a] < position[b] for a, b in edges)
+
+
+@generator('graphs')
+def topological_order(rng, size):
+    n = size
+    labels = rng.sample(range(n), n)  # hidden order so the DAG is not just 0 < 1 < ...
+    edges = set()
+    while len(edges) < n + size // 2:
+        a, b = sorted(rng.sample(range(n), 2))
+        edges.add((labels[a], labels[b]))
+    edges = sorted(edges)
+
+    def kahn(pick):
+        indegree = {v: 0 for v in range(n)}
+        for _, b in edges:
+            indegree[b] += 1
+        ready = [v for v in range(n) if indegree[v] == 0]
+        order = []
+        while ready:
+            v = pick(ready)
+            ready.remove(v)
+            order.append(v)
+            for a, b in edges:
+                if a == v:
+                    indegree[b] -= 1
+                    if indegree[b] == 0:
+                        ready.append(b)
+        return order
+    answer = kahn(min)
+    largest_first = kahn(max)
+
+    def invalid():
+        order = rng.sample(range(n), n)
+        return fmt(order) if not is_topological(order, edges) else fmt(answer)
+    return make_question(
+        rng, f"A DAG on vertices 0..{n - 1} has edges `{', '.join(f'{a}→{b}' for a, b in edges)}`. What order does "
+             f"Kahn's algorithm produce if it always removes the smallest ready vertex?",
+        fmt(answer), [fmt(largest_first) if largest_first != answer else invalid(), invalid(), invalid()], invalid,
+        f"Repeatedly taking the smallest vertex with in-degree 0 gives {fmt(answer)}.")
+
+
+# ---------------------------------------------------------------- sorting
+
+def bubble_passes(a, passes):
+    a = list(a)
+    for p in range(passes):
+        for i in range(len(a) - 1 - p):
+            if a[i] > a[i + 1]:
+                a[i], a[i + 1] = a[i + 1], a[i]
+    return a
+
+
+def selection_passes(a, passes):
+    a = list(a)
+    for p in range(passes):
+        m = min(range(p, len(a)), key=a.__getitem__)
+        a[p], a[m] = a[m], a[p]
+    return a
+
+
+def insertion_passes(a, passes):
+    a = list(a)
+    for p in range(1, passes + 1):
+        key, j = a[p], p - 1
+        while j >= 0 and a[j] > key:
+            a[j + 1] = a[j]
+            j -= 1
+        a[j + 1] = key
+    return a
+
+
+@generator('sorting')
+def sort_passes(rng, size):
+    a = rng.sample(range(1, 50), size)
+    k = rng.randint(1, min(3, size - 2))
+    algorithms = {'bubble sort': bubble_passes, 'selection sort': selection_passes,
+                  'insertion sort': insertion_passes}
+    asked = rng.choice(list(algorithms))
+    answer = algorithms[asked](a, k)
+    others = [fmt(fn(a, k)) for name, fn in algorithms.items() if name != asked]
+    return make_question(
+        rng, f"What does `{fmt(a)}` look like after {k} pass{'es' if k > 1 else ''} of {asked} (ascending)?",
+        fmt(answer), others + [fmt(algorithms[asked](a, k + 1)), fmt(algorithms[asked](a, k - 1))],
+        shuffled(rng, a), f"Tracing {asked} for {k} pass{'es' if k > 1 else ''} gives {fmt(answer)}.")
+
+
+@generator('sorting')
+def lomuto_partition(rng, size):
+    a = rng.sample(range(1, 50), size)
+    result, pivot, i = list(a), a[-1], 0
+    for j in range(len(a) - 1):
+        if result[j] < pivot:
+            result[i], result[j] = result[j], result[i]
+            i += 1
+    result[i], result[-1] = result[-1], result[i]
+    stable = [x for x in a if x < pivot] + [pivot] + [x for x in a[:-1] if x > pivot]
+    return make_question(
+        rng, f"Apply one Lomuto partition (pivot = last element) to `{fmt(a)}`. What is the array afterwards?",
+        fmt(result), [fmt(stable), fmt(sorted(a)), fmt([pivot] + a[:-1])], shuffled(rng, a),
+        f"Elements smaller than {pivot} are swapped forward; the pivot ends at index {i}: {fmt(result)}.")
+
+
+@generator('sorting')
+def inversion_count(rng, size):
+    a = rng.sample(range(1, 50), size)
+    answer = sum(1 for i in range(size) for j in range(i + 1, size) if a[i] > a[j])
+    return make_question(
+        rng, f"How many swaps does bubble sort make to sort `{fmt(a)}` in ascending order?",
+        answer, [size * (size - 1) // 2, answer + 1, size - 1], near(rng, answer, 3),
+        f"Each adjacent swap fixes exactly one inversion, and the array has {answer} inversions.")
+
+
+# ---------------------------------------------------------------- searching
+
+@generator('searching')
+def binary_search_probes(rng, size):
+    a = sorted(rng.sample(range(1, 99), size + 4))
+    target = rng.choice(a)
+
+    def probes(upper_mid=False, hi=len(a) - 1):
+        lo, seen = 0, []
+        while lo <= hi:
+            mid = (lo + hi + (1 if upper_mid else 0)) // 2
+            seen.append(mid)
+            if mid >= len(a) or a[mid] == target:
+                break
+            lo, hi = (mid + 1, hi) if a[mid] < target else (lo, mid - 1)
+        return seen
+    answer = probes()
+    return make_question(
+        rng, f"Binary search for {target} in `{fmt(a)}` with `lo = 0, hi = n - 1, mid = (lo + hi) // 2`. "
+             f"Which indices are probed, in order?",
+        fmt(answer), [fmt(probes(upper_mid=True)), fmt(probes(hi=len(a))), fmt(list(range(a.index(target) + 1)))],
+        lambda: fmt(sorted(rng.sample(range(len(a)), len(answer)))),
+        f"The probes are {fmt(answer)}; {target} is at index {a.index(target)}.")
+
+
+@generator('searching')
+def lower_bound(rng, size):
+    a = sorted(rng.choice(range(1, 15)) for _ in range(size + 3))
+    x = rng.choice(a)
+    answer = next(i for i, v in enumerate(a) if v >= x)
+    upper = next((i for i, v in enumerate(a) if v > x), len(a))
+    return make_question(
+        rng, f"In `{fmt(a)}` (0-indexed), what does `lower_bound({x})` — the first index with value ≥ {x} — return?",
+        answer, [upper, upper - 1, answer + 1], lambda: rng.randrange(len(a) + 1),
+        f"{x} first appears at index {answer}; upper_bound would return {upper}.")
+
+
+# ---------------------------------------------------------------- dynamic programming
+
+@generator('dynamic-programming')
+def knapsack_cell(rng, size):
+    n = max(3, size // 2 + 1)
+    weights = [rng.randint(1, 6) for _ in range(n)]
+    values = [rng.randint(2, 15) for _ in range(n)]
+    capacity = rng.randint(max(weights), sum(weights) - 1)
+    dp = [[0] * (capacity + 1) for _ in range(n + 1)]
+    unbounded = [0] * (capacity + 1)
+    for i in range(1, n + 1):
+        for w in range(capacity + 1):
+            dp[i][w] = dp[i - 1][w]
+            if weights[i - 1] <= w:
+                dp[i][w] = max(dp[i][w], dp[i - 1][w - weights[i - 1]] + values[i - 1])
+    for w in range(capacity + 1):
+        unbounded[w] = max([unbounded[w - wt] + v for wt, v in zip(weights, values) if wt <= w], default=0)
+    greedy, room = 0, capacity
+    for wt, v in sorted(zip(weights, values), key=lambda item: -item[1] / item[0]):
+        if wt <= room:
+            greedy, room = greedy + v, room - wt
+    answer = dp[n][capacity]
+    items = ', '.join(f"(w={wt}, v={v})" for wt, v in zip(weights, values))
+    return make_question(
+        rng, f"0/1 knapsack with items {items} and capacity {capacity}. What is `dp[{n}][{capacity}]`, the best "
+             f"total value?",
+        answer, [greedy, unbounded[capacity], dp[n - 1][capacity]], near(rng, answer, 4, 1),
+        f"Filling the table row by row gives {answer}; greedy by value/weight gets {greedy} and reusing items "
+        f"(unbounded) would allow {unbounded[capacity]}.")
+
+
+def lcs_length(a, b):
+    dp = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a)):
+        for j in range(len(b)):
+            dp[i + 1][j + 1] = dp[i][j] + 1 if a[i] == b[j] else max(dp[i][j + 1], dp[i + 1][j])
+    return dp[-1][-1]
+
+
+@generator('dynamic-programming')
+def longest_common_subsequence(rng, size):
+    a = ''.join(rng.choice('ABCD') for _ in range(size))
+    b = ''.join(rng.choice('ABCD') for _ in range(size + 1))
+    answer = lcs_length(a, b)
+    substring = max((k for i in range(len(a)) for k in range(1, len(a) - i + 1) if a[i:i + k] in b), default=0)
+    return make_question(
+        rng, f"What is the length of the longest common subsequence of `{a}` and `{b}`?",
+        answer, [substring, answer + 1, answer - 1], near(rng, answer, 2, 1),
+        f"The LCS table's bottom-right cell is {answer}; the longest common contiguous substring is only {substring}.")
+
+
+@generator('dynamic-programming')
+def coin_change(rng, size):
+    coins = rng.choice([[1, 3, 4], [1, 4, 5], [1, 5, 6], [1, 6, 9], [1, 7, 10]])
+    amount = rng.randint(size + 4, 4 * size + 8)
+    best = [0] + [math.inf] * amount
+    ways = [1] + [0] * amount
+    for coin in coins:
+        for v in range(coin, amount + 1):
+            ways[v] += ways[v - coin]
+    for v in range(1, amount + 1):
+        best[v] = min(best[v - c] + 1 for c in coins if c <= v)
+    greedy, rest = 0, amount
+    for c in sorted(coins, reverse=True):
+        greedy, rest = greedy + rest // c, rest % c
+    answer = best[amount]
+    return make_question(
+        rng, f"With coins `{fmt(coins)}` (unlimited supply), what is the minimum number of coins that make {amount}?",
+        answer, [greedy, ways[amount], answer + 1], near(rng, answer, 2, 1),
+        f"`dp[v] = 1 + min(dp[v - c])` gives {answer}; largest-coin-first greedy uses {greedy}.")
+
+
+@generator('dynamic-programming')
+def edit_distance(rng, size):
+    a = ''.join(rng.choice('abc') for _ in range(max(3, size - 1)))
+    b = ''.join(rng.choice('abc') for _ in range(max(3, size - 1) + rng.randint(-1, 1)))
+    dp = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            dp[i][j] = min(dp[i - 1][j] + 1, dp[i][j - 1] + 1, dp[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+    answer = dp[-1][-1]
+    mismatches = sum(x != y for x, y in zip(a, b)) + abs(len(a) - len(b))
+    return make_question(
+        rng, f"What is the edit (Levenshtein) distance between `{a}` and `{b}`?",
+        answer, [mismatches, len(a) + len(b) - 2 * lcs_length(a, b), answer + 1], near(rng, answer, 2),
+        f"The DP table over insert/delete/replace ends at {answer}.")
+
+
+@generator('dynamic-programming')
+def climbing_stairs(rng, size):
+    steps = rng.choice([(1, 2), (1, 2, 3), (1, 3)])
+    n = rng.randint(size, size + 4)
+    ways = [1] + [0] * n
+    for i in range(1, n + 1):
+        ways[i] = sum(ways[i - s] for s in steps if s <= i)
+    answer = ways[n]
+    return make_question(
+        rng, f"You climb {n} stairs taking {' or '.join(map(str, steps))} steps at a time. In how many distinct "
+             f"ways can you reach the top?",
+        answer, [ways[n - 1], ways[n - 1] + 1 if len(steps) > 2 else answer * 2, 2 ** (n - 1)],
+        near(rng, answer, max(3, answer // 10), 1),
+        f"`ways[i] = {' + '.join(f'ways[i-{s}]' for s in steps)}` gives {answer}.")
+
+
+# ---------------------------------------------------------------- greedy
+
+@generator('greedy')
+def activity_selection(rng, size):
+    intervals = []
+    for _ in range(size + 2):
+        start = rng.randint(0, 20)
+        intervals.append((start, start + rng.randint(1, 7)))
+    intervals.sort()
+
+    def select(key):
+        count, end = 0, -1
+        for s, e in sorted(intervals, key=key):
+            if s >= end:
+                count, end = count + 1, e
+        return count
+    answer = select(lambda iv: iv[1])
+    return make_question(
+        rng, f"Intervals `{', '.join(f'[{s}, {e})' for s, e in intervals)}`. What is the maximum number of "
+             f"non-overlapping intervals?",
+        answer, [select(lambda iv: iv[0]), select(lambda iv: iv[1] - iv[0]), answer + 1], near(rng, answer, 2, 1),
+        f"Always taking the interval that ends first selects {answer}; picking by earliest start selects "
+        f"{select(lambda iv: iv[0])}.")
+
+
+@generator('greedy')
+def fractional_knapsack(rng, size):
+    n = max(3, size // 2 + 1)
+    items = [(rng.randint(1, 8), rng.randint(2, 20)) for _ in range(n)]
+    capacity = rng.randint(max(w for w, _ in items), sum(w for w, _ in items) - 1)
+
+    def fill(order, fractional=True):
+        total, room = 0.0, capacity
+        for w, v in order:
+            take = min(w, room) if fractional else (w if w <= room else 0)
+            total, room = total + v * take / w, room - take
+        return round(total, 2)
+    by_ratio = sorted(items, key=lambda item: -item[1] / item[0])
+    answer = fill(by_ratio)
+    return make_question(
+        rng, f"Fractional knapsack, capacity {capacity}, items (weight, value) "
+             f"`{', '.join(f'({w}, {v})' for w, v in items)}`. What is the maximum value?",
+        f"{answer:g}", [f"{fill(by_ratio, fractional=False):g}", f"{fill(sorted(items, key=lambda i: -i[1])):g}",
+                        f"{fill(sorted(items)):g}"],
+        lambda: f"{round(answer + rng.choice([-3, -2, -1.5, 1, 2.5]), 2):g}",
+        f"Taking items by value/weight ratio and splitting the last one gives {answer:g}.")
+
+
+@generator('greedy')
+def jump_game_min_jumps(rng, size):
+    n = size + 3
+    a = [rng.randint(1, 3) for _ in range(n - 1)] + [0]
+    jumps, end, farthest = 0, 0, 0
+    for i in range(n - 1):
+        farthest = max(farthest, i + a[i])
+        if i == end:
+            jumps, end = jumps + 1, farthest
+    naive, i = 0, 0
+    while i < n - 1:
+        i, naive = i + a[i], naive + 1
+    return make_question(
+        rng, f"Each entry of `{fmt(a)}` is the maximum jump length from that index. What is the minimum number of "
+             f"jumps from index 0 to the last index?",
+        jumps, [naive, jumps + 1, jumps - 1], near(rng, jumps, 2, 1),
+        f"A BFS-style greedy over reachable ranges needs {jumps} jumps; always jumping the maximum takes {naive}.")
+
+
+# ---------------------------------------------------------------- backtracking
+
+@generator('backtracking')
+def subset_sum_count(rng, size):
+    values = rng.sample(range(1, 15), min(size, 8))
+    target = rng.randint(min(values) + 2, sum(values) // 2)
+    count = 0
+
+    def search(i, total):
+        nonlocal count
+        if total == target:
+            count += 1
+        for j in range(i, len(values)):
+            if total + values[j] <= target:
+                search(j + 1, total + values[j])
+    search(0, 0)
+    with_repeats = [1] + [0] * target
+    for v in values:
+        for t in range(v, target + 1):
+            with_repeats[t] += with_repeats[t - v]
+    return make_question(
+        rng, f"How many subsets of `{fmt(values)}` sum to exactly {target}?",
+        count, [with_repeats[target], count + 1, 2 ** len(values) // target], near(rng, count, 2),
+        f"Backtracking over include/exclude decisions finds {count}; allowing reuse would give "
+        f"{with_repeats[target]}.")
+
+
+@generator('backtracking')
+def distinct_permutations(rng, size):
+    letters = ''.join(rng.choice('AABBC'[:3 + size // 4]) for _ in range(min(size, 7)))
+    answer = len(set(itertools.permutations(letters)))
+    return make_question(
+        rng, f"How many distinct permutations does `\"{letters}\"` have?",
+        answer, [math.factorial(len(letters)), answer * 2, answer // 2 or 3], near(rng, answer, 5, 1),
+        f"{len(letters)}! divided by the factorials of the repeat counts is {answer}.")
+
+
+@functools.lru_cache(maxsize=None)
+def count_queens(n):
+    def solve(row, cols, diagonals, anti):
+        if row == n:
+            return 1
+        return sum(solve(row + 1, cols | {c}, diagonals | {row - c}, anti | {row + c})
+                   for c in range(n) if c not in cols and row - c not in diagonals and row + c not in anti)
+    return solve(0, frozenset(), frozenset(), frozenset())
+
+
+@generator('backtracking')
+def n_queens(rng, size):
+    n = rng.randint(4, min(8, size // 2 + 4))
+    answer = count_queens(n)
+    return make_question(
+        rng, f"How many distinct solutions does the {n}-Queens problem have?",
+        answer, [n, count_queens(n - 1) if n > 4 else 1, answer * 2], near(rng, answer, 6, 1),
+        f"Placing one queen per row and pruning attacked columns and diagonals finds {answer} solutions.")
+
+
+# ---------------------------------------------------------------- bit manipulation
+
+@generator('bit-manipulation')
+def bit_expression(rng, size):
+    x = rng.randint(8, 2 ** (size + 2))
+    kind = rng.choice(['popcount', 'clear-lowest', 'lowest-bit', 'xor-shift'])
+    if kind == 'popcount':
+        answer, text = bin(x).count('1'), f"How many set bits does {x} (`{bin(x)[2:]}` in binary) have?"
+        wrong = [len(bin(x)) - 2, bin(x).count('0') - 1, answer + 1]
+    elif kind == 'clear-lowest':
+        answer, text = x & (x - 1), f"What is `{x} & ({x} - 1)`?"
+        wrong = [x - 1, x & -x, x >> 1]
+    elif kind == 'lowest-bit':
+        answer, text = x & -x, f"What is `{x} & -{x}` (the lowest set bit)?"
+        wrong = [x & (x - 1), 1, 2 ** (x.bit_length() - 1)]
+    else:
+        y, k = rng.randint(1, 31), rng.randint(1, 3)
+        answer, text = (x ^ y) << k, f"What is `({x} ^ {y}) << {k}`?"
+        wrong = [(x | y) << k, (x ^ y) >> k, x ^ (y << k)]
+    return make_question(rng, text, answer, wrong, near(rng, answer, 4),
+                         f"In binary {x} is {bin(x)[2:]}; evaluating bit by bit gives {answer}.")
+
+
+@generator('bit-manipulation')
+def single_number(rng, size):
+    pairs = rng.sample(range(1, 60), size // 2 + 1)
+    single = rng.choice([v for v in range(1, 60) if v not in pairs])
+    values = pairs * 2 + [single]
+    rng.shuffle(values)
+    xor = 0
+    for v in values:
+        xor ^= v
+    return make_question(
+        rng, f"Every value in `{fmt(values)}` appears twice except one. XOR-ing all of them gives which value?",
+        xor, [sum(values) - 2 * sum(pairs) + 1, max(values), min(values)], lambda: rng.choice(values),
+        f"Pairs cancel under XOR (a ^ a = 0), leaving {xor}.")
+
+
+# ---------------------------------------------------------------- tries
+
+WORD_PARTS = ('ca', 'car', 'cat', 'do', 'dog', 'to', 'tea', 'ten', 'in', 'inn', 'an', 'ant', 'and', 'be', 'bee')
+
+
+def random_words(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(rng.choice(WORD_PARTS) + rng.choice(['', '', 's', 'e', 'er', 't', 'ing']))
+    return sorted(words, key=lambda w: rng.random())
+
+
+@generator('tries')
+def trie_node_count(rng, size):
+    words = random_words(rng, size)
+    root = {}
+    nodes = 0
+    for word in words:
+        node = root
+        for ch in word:
+            if ch not in node:
+                node[ch] = {}
+                nodes += 1
+            node = node[ch]
+    return make_question(
+        rng, f"Insert `{', '.join(words)}` into an empty trie. How many nodes does it have, not counting the root?",
+        nodes, [sum(map(len, words)), len({w[:i] for w in words for i in range(1, 2)}) + nodes // 2, nodes + 1],
+        near(rng, nodes, 3, 1),
+        f"Shared prefixes share nodes: {nodes} nodes for {sum(map(len, words))} characters.")
+
+
+@generator('tries')
+def trie_prefix_count(rng, size):
+    words = random_words(rng, size + 2)
+    prefix = rng.choice(words)[:rng.randint(1, 2)]
+    answer = sum(w.startswith(prefix) for w in words)
+    return make_question(
+        rng, f"After inserting `{', '.join(words)}` into a trie, how many words start with `\"{prefix}\"`?",
+        answer, [sum(prefix in w for w in words) + (sum(prefix in w for w in words) == answer),
+                 answer - 1, answer + 1], near(rng, answer, 2),
+        f"Walking to the node for '{prefix}' and counting word ends below it gives {answer}.")
+
+
+# ---------------------------------------------------------------- segment trees & Fenwick
+
+@generator('segment-trees')
+def fenwick_query_path(rng, size):
+    i = rng.randint(5, 2 ** (size // 2 + 3))
+    query, j = [], i
+    while j > 0:
+        query.append(j)
+        j -= j & -j
+    update, j = [], i
+    while j <= 2 ** (size // 2 + 3):
+        update.append(j)
+        j += j & -j
+    return make_question(
+        rng, f"In a Fenwick tree (1-indexed), which indices does `prefix_sum({i})` read, in order?",
+        fmt(query), [fmt(update), fmt(list(range(i, 0, -1))[:len(query)]), fmt(query[::-1])],
+        lambda: fmt(sorted(rng.sample(range(1, i + 1), min(i, len(query))), reverse=True)),
+        f"Each step removes the lowest set bit (`i -= i & -i`): {fmt(query)}.")
+
+
+@generator('segment-trees')
+def segment_tree_query(rng, size):
+    a = [rng.randint(1, 9) for _ in range(size + 1)]
+    n = len(a)
+    tree = [0] * (4 * n)
+    combine = rng.choice(['sum', 'min'])
+    op = (lambda x, y: x + y) if combine == 'sum' else min
+    identity = 0 if combine == 'sum' else math.inf
+
+    def build(node, lo, hi):
+        if lo == hi:
+            tree[node] = a[lo]
+            return
+        mid = (lo + hi) // 2
+        build(2 * node, lo, mid)
+        build(2 * node + 1, mid + 1, hi)
+        tree[node] = op(tree[2 * node], tree[2 * node + 1])
+
+    def update(node, lo, hi, index, value):
+        if lo == hi:
+            tree[node] = value
+            return
+        mid = (lo + hi) // 2
+        if index <= mid:
+            update(2 * node, lo, mid, index, value)
+        else:
+            update(2 * node + 1, mid + 1, hi, index, value)
+        tree[node] = op(tree[2 * node], tree[2 * node + 1])
+
+    def query(node, lo, hi, left, right):
+        if right < lo or hi < left:
+            return identity
+        if left <= lo and hi <= right:
+            return tree[node]
+        mid = (lo + hi) // 2
+        return op(query(2 * node, lo, mid, left, right), query(2 * node + 1, mid + 1, hi, left, right))
+    build(1, 0, n - 1)
+    before = list(a)
+    index, value = rng.randrange(n), rng.randint(1, 9)
+    update(1, 0, n - 1, index, value)
+    a[index] = value
+    left = rng.randrange(n - 1)
+    right = rng.randrange(left + 1, n)
+    answer = query(1, 0, n - 1, left, right)
+    stale = sum(before[left:right + 1]) if combine == 'sum' else min(before[left:right + 1])
+    off_by_one = op(answer, a[right + 1]) if right + 1 < n else op(answer, a[left - 1]) if left else answer + 1
+    return make_question(
+        rng, f"A segment tree over `{fmt(before)}` answers range {combine} queries. After setting index {index} "
+             f"to {value}, what is the {combine} of indices {left}..{right} (inclusive)?",
+        answer, [stale, off_by_one, answer + 1], near(rng, answer, 3, 0),
+        f"After the point update the array is {fmt(a)}; the query combines O(log n) nodes into {answer}.")
+
+
+# ---------------------------------------------------------------- complexity (every topic)
+
+# (code template, exponent of n in halves, log factors); `{v}` is the loop variable, `{o}` the enclosing one
+LOOPS = (
+    ('for {v} in range(n):', 2, 0),
+    ('for {v} in range({o}, n):', 2, 0),
+    ('for {v} in range(0, n, 2):', 2, 0),
+    ('for {v} in range(100):', 0, 0),
+    ('{v} = 1\nwhile {v} < n:', 0, 1, '{v} *= 2'),
+    ('{v} = n\nwhile {v} > 0:', 0, 1, '{v} //= 2'),
+    ('{v} = 0\nwhile {v} * {v} < n:', 1, 0, '{v} += 1'),
+)
+
+
+def big_o(halves, logs):
+    if halves == 0 and logs == 0:
+        return 'O(1)'
+    parts = []
+    whole, half = divmod(halves, 2)
+    if whole:
+        parts.append('n' if whole == 1 else f"n^{whole}")
+    if half:
+        parts.append('√n')
+    if logs:
+        parts.append('log n' if logs == 1 else f"log^{logs} n")
+    return f"O({' '.join(parts)})"
+
+
+@generator('complexity', 'arrays-strings', 'sorting', 'searching')
+def loop_nest_complexity(rng, size):
+    depth = 2 if size <= 5 else 3
+    names = 'ijk'
+    lines, footers, factors, halves, logs = [], [], [], 0, 0
+    for level in range(depth):
+        options = LOOPS if level else [loop for loop in LOOPS if '{o}' not in loop[0]]
+        loop = rng.choice(options)
+        code = loop[0].format(v=names[level], o=names[level - 1] if level else '')
+        indent = '    ' * level
+        lines.extend(indent + line for line in code.split('\n'))
+        footers.append(indent + '    ' + loop[3].format(v=names[level]) if len(loop) > 3 else None)
+        halves, logs = halves + loop[1], logs + loop[2]
+        factors.append(f"`{names[level]}` loop {big_o(loop[1], loop[2])}")
+    lines.append('    ' * depth + 'total += 1')
+    for footer in reversed(footers):
+        if footer:
+            lines.append(footer)
+    answer = big_o(halves, logs)
+    wrong = [big_o(halves + 2, logs), big_o(max(0, halves - 2), logs + 1), big_o(halves, logs + 1),
+             big_o(halves + 2 * logs, 0)]
+    code = '\n'.join(lines)
+    return make_question(
+        rng, f"What is the time complexity of this code in terms of n?\n\n```python\n{code}\n```",
+        answer, wrong, lambda: big_o(rng.randint(0, 6), rng.randint(0, 2)),
+        f"Nested loops multiply: {', '.join(factors)}. Total: {answer}.")
+
+
+def generate_questions(topic_id, difficulty='mixed', count=5, rng=None, exclude=()):
+    """Up to `count` distinct questions for the topic (complexity questions for topics without generators)"""
+    rng = rng or random.Random()
+    generators = GENERATORS.get(topic_id) or GENERATORS['complexity']
+    seen = set(exclude)
+    questions = []
+    for _ in range(count * 10):
+        if len(questions) >= count:
+            break
+        level = difficulty if difficulty in SIZES else rng.choice(list(SIZES))
+        question = rng.choice(generators)(rng, SIZES[level])
+        if question is not None and question['question'] not in seen:
+            seen.add(question['question'])
+            questions.append(question)
+    return questions
@@ -0,0 +1,265 @@
+"""Quiz generation as background jobs, tracked in a durable SQLite table.
+
+Submitting a job returns at once; a local thread pool runs it and records
+its progress (queued -> generating -> parsing -> done / failed / cancelled)
+in a table every worker process can read, so status can be polled from any
+worker. Submissions are idempotent per owner: the same idempotency key (by
+default the quiz parameters) returns the live or unclaimed job instead of
+starting another generation. A job may publish its result before it is done
+(a quiz that is still being streamed), so its owner can start on it early.
+
+A job nobody has asked about for `abandon_after` seconds is cancelled at its
+next progress check, as is one cancelled explicitly. Jobs left running by a
+dead process are requeued by `recover()` once their heartbeat goes stale;
+submissions run it every `stale_after / 2` seconds. A running job's heartbeat
+is written every `stale_after / 3` seconds by a thread of its own, so a long
+upstream call is not mistaken for a dead worker.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ('queued', 'generating', 'parsing')
+TERMINAL = ('done', 'failed', 'cancelled')
+COLUMNS = ('id', 'owner', 'idempotency_key', 'params', 'status', 'error', 'result', 'consumed', 'attempts',
+           'created_at', 'updated_at', 'last_seen_at')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QuizJobs:
+    def __init__(self, path, run, workers=4, abandon_after=60, idempotency_window=600, stale_after=300,
+                 max_attempts=2, ttl=24 * 3600):
+        self.path = path
+        self.run = run  # run(params, progress) -> result; progress(stage, result=None) raises JobCancelled
+        self.workers = workers
+        self.abandon_after = abandon_after
+        self.idempotency_window = idempotency_window
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._recovered_at = 0.0
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'done': 0, 'failed': 0, 'cancelled': 0, 'requeued': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS quiz_jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                idempotency_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                result TEXT,
+                consumed INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_seen_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quiz_jobs_owner ON quiz_jobs(owner, idempotency_key);
+            CREATE INDEX IF NOT EXISTS idx_quiz_jobs_status ON quiz_jobs(status, updated_at);
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _pool(self):
+        # One pool per process; a pool created before fork has no threads in the child
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='quiz-job')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _bump(self, field):
+        with self._lock:
+            self._stats[field] += 1
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(zip(COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def submit(self, owner, params, idempotency_key=None):
+        """(job, created): the owner's matching live job if there is one, else a new queued job"""
+        key = idempotency_key or hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            should_recover = now - self._recovered_at > self.stale_after / 2
+            if should_recover:
+                self._recovered_at = now
+        if should_recover:
+            self.recover()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM quiz_jobs WHERE owner = ? AND idempotency_key = ? "
+                "AND status NOT IN ('failed', 'cancelled') AND consumed = 0 AND created_at > ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (owner, key, now - self.idempotency_window)).fetchone()
+            if existing is None:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO quiz_jobs (id, owner, idempotency_key, params, status, created_at, updated_at, "
+                    "last_seen_at) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, owner, key, json.dumps(params), now, now, now))
+        finally:
+            conn.execute("COMMIT")
+
+        if existing is not None:
+            self._bump('deduplicated')
+            return self._row(existing), False
+        self._bump('submitted')
+        self._pool().submit(self._execute, job_id)
+        return self.get(job_id), True
+
+    def get(self, job_id, touch=False):
+        conn = self._conn()
+        if touch:
+            conn.execute("UPDATE quiz_jobs SET last_seen_at = ? WHERE id = ?", (time.time(), job_id))
+        return self._row(conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM quiz_jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def cancel(self, job_id, owner):
+        """True if the job was still running (it stops at its next progress check)"""
+        cursor = self._conn().execute(
+            "UPDATE quiz_jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND owner = ? "
+            "AND status IN ('queued', 'generating', 'parsing')", (time.time(), job_id, owner))
+        if cursor.rowcount:
+            self._bump('cancelled')
+        return bool(cursor.rowcount)
+
+    def consume(self, job_id, owner):
+        """The result of the owner's job (finished, or published early), once; later submissions start a new job"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT result FROM quiz_jobs WHERE id = ? AND owner = ? AND result IS NOT NULL "
+                               "AND status NOT IN ('failed', 'cancelled') AND consumed = 0",
+                               (job_id, owner)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE quiz_jobs SET consumed = 1 WHERE id = ?", (job_id,))
+        finally:
+            conn.execute("COMMIT")
+        return row[0] if row else None
+
+    def _set(self, job_id, from_statuses, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        placeholders = ', '.join('?' * len(from_statuses))
+        cursor = self._conn().execute(
+            f"UPDATE quiz_jobs SET {assignments} WHERE id = ? AND status IN ({placeholders})",
+            (*fields.values(), job_id, *from_statuses))
+        return bool(cursor.rowcount)
+
+    def _execute(self, job_id):
+        # Claim first: a duplicate submit or a recovering worker may race for the same row
+        conn = self._conn()
+        claimed = conn.execute(
+            "UPDATE quiz_jobs SET status = 'generating', attempts = attempts + 1, updated_at = ? "
+            "WHERE id = ? AND status = 'queued'", (time.time(), job_id)).rowcount
+        if not claimed:
+            return
+        job = self.get(job_id)
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(self.stale_after / 3):
+                self._set(job_id, ACTIVE)
+
+        threading.Thread(target=heartbeat, name=f"quiz-job-heartbeat-{job_id[:8]}", daemon=True).start()
+
+        def progress(stage=None, result=None):
+            # Called from whichever thread the generator runs on; _conn() is per thread
+            row = self._conn().execute(
+                "SELECT status, last_seen_at FROM quiz_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] == 'cancelled':
+                raise JobCancelled(job_id)
+            if time.time() - row[1] > self.abandon_after:
+                if self._set(job_id, ACTIVE, status='cancelled', error='abandoned'):
+                    self._bump('cancelled')
+                raise JobCancelled(job_id)
+            fields = {} if result is None else {'result': result}
+            if stage in ACTIVE:
+                fields['status'] = stage
+            self._set(job_id, ACTIVE, **fields)  # with no fields, a heartbeat
+
+        try:
+            result = self.run(job['params'], progress)
+            progress()  # a job cancelled during its last step still ends cancelled
+            if self._set(job_id, ACTIVE, status='done', result=result):
+                self._bump('done')
+        except JobCancelled:
+            # Raised by progress() (already marked) or by the job itself when its result is no longer wanted
+            if self._set(job_id, ACTIVE, status='cancelled'):
+                self._bump('cancelled')
+            logger.info("Quiz job cancelled", extra={'job_id': job_id})
+        except Exception as e:
+            logger.exception("Quiz job failed: %s", e, extra={'job_id': job_id})
+            # The error is shown to the learner; the details stay in the log
+            if self._set(job_id, ACTIVE, status='failed', error='Quiz generation failed'):
+                self._bump('failed')
+        finally:
+            stopped.set()
+
+    def recover(self):
+        """Requeue jobs whose worker died mid-run (no heartbeat for stale_after); drop expired rows"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = conn.execute(
+                "SELECT id, attempts FROM quiz_jobs WHERE status IN ('queued', 'generating', 'parsing') AND updated_at < ?",
+                (now - self.stale_after,)).fetchall()
+            requeue = [job_id for job_id, attempts in stale if attempts < self.max_attempts]
+            conn.executemany("UPDATE quiz_jobs SET status = 'queued', updated_at = ?, last_seen_at = ? WHERE id = ?",
+                             [(now, now, job_id) for job_id in requeue])
+            conn.executemany("UPDATE quiz_jobs SET status = 'failed', error = 'worker lost', updated_at = ? "
+                             "WHERE id = ?", [(now, job_id) for job_id, attempts in stale
+                                              if attempts >= self.max_attempts])
+            conn.execute("DELETE FROM quiz_jobs WHERE updated_at < ?", (now - self.ttl,))
+        finally:
+            conn.execute("COMMIT")
+        for job_id in requeue:
+            self._bump('requeued')
+            self._pool().submit(self._execute, job_id)
+        return len(requeue)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            stats['by_status'] = dict(self._conn().execute(
+                "SELECT status, COUNT(*) FROM quiz_jobs GROUP BY status").fetchall())
+        except sqlite3.Error:
+            stats['by_status'] = None
+        return stats
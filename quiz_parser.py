@@ -0,0 +1,301 @@
+"""Single-pass parser turning free-form LLM quiz text into question dicts.
+
+The output is identical to the original multi-pass regex parser (see the
+corpus under benchmarks/corpus). Each block is split into lines once, each line
+is classified once with precompiled patterns, and a small state machine walks
+the resulting tokens.
+"""
+import re
+
+
+QUESTION_SPLIT_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'\n\s*Question\s*\d+\s*[\.:\)]\s*',
+    r'\n\s*Q\s*\d+\s*[\.:\)]\s*',
+    r'\n\s*#{1,3}\s*Question\s*\d+',
+    r'\n\s*\*\*Question\s*\d+\*\*',
+    r'\n\s*\d+\s*[\.:\)]\s+(?=[^A-Da-d][\.:\)])',  # Number not followed by option letter
+)]
+
+FENCED_CODE_RE = re.compile(r'```[\s\S]*?```')
+INLINE_CODE_RE = re.compile(r'`[^`]+`')
+PLACEHOLDER_RE = re.compile(r'__CODE_BLOCK_(0|[1-9]\d*)__')
+
+# Strict (case-sensitive) option marker that ends the question text
+OPTION_START_RE = re.compile(r'^(?:[A-D][\.\)]|\([A-D]\)|[A-D]:)\s+\S')
+METADATA_START_RE = re.compile(r'^(Correct|Answer|Explanation|Reason)[\s:]', re.IGNORECASE)
+# "A. x", "A) x", "(A) x", "A: x", "A x" in one alternation; the forms are disjoint
+OPTION_RE = re.compile(r'^(?:([A-D])[\.\)]|\(([A-D])\)|([A-D]):|([A-D])\s)\s*(.+)$', re.IGNORECASE)
+OPTION_VALUE_END_RE = re.compile(r'\s+(?:Correct|Answer|Explanation|Reason)[\s:]', re.IGNORECASE)
+CORRECT_RE = re.compile(r'(?:Correct|Answer)[\s:]+([A-D])', re.IGNORECASE)
+EXPLANATION_RE = re.compile(r'(?:Explanation|Reason)[\s:]+(.+)', re.IGNORECASE)
+OPTION_PREFIX_RE = re.compile(r'^[A-D][\.\)]')
+QUESTION_PREFIX_RE = re.compile(r'^Question\s*\d+\s*[\.:\)]\s*', re.IGNORECASE)
+Q_PREFIX_RE = re.compile(r'^Q\s*\d+\s*[\.:\)]\s*', re.IGNORECASE)
+INFERRED_ANSWER_RE = re.compile(r'\boption\s+([A-D])\b', re.IGNORECASE)
+
+OPTION_KEYS = ('A', 'B', 'C', 'D')
+
+
+def new_parse_stats():
+    return {'parsed': 0, 'skipped': 0, 'placeholder_filled': 0, 'answer_inferred': 0, 'answer_defaulted': 0}
+
+
+def split_question_blocks(text):
+    """Split normalized text into question blocks.
+
+    The first pattern decides in all but degenerate inputs; the remaining
+    patterns are only tried when it yields no usable block.
+    """
+    for pattern in QUESTION_SPLIT_PATTERNS:
+        blocks = [b.strip() for b in pattern.split(text)]
+        blocks = [b for b in blocks if len(b) > 20]
+        if blocks:
+            return blocks
+    return [b.strip() for b in text.split('\n\n') if len(b.strip()) > 30]
+
+
+class _Line:
+    """One non-empty line of a block, classified lazily and at most once"""
+    __slots__ = ('raw', 'text', '_option')
+
+    def __init__(self, raw, text):
+        self.raw = raw      # with code placeholders (what the question scan sees)
+        self.text = text    # with code restored (what option/answer parsing sees)
+        self._option = False
+
+    @property
+    def option(self):
+        if self._option is False:
+            match = OPTION_RE.match(self.text)
+            if match:
+                key = (match.group(1) or match.group(2) or match.group(3) or match.group(4)).upper()
+                value = OPTION_VALUE_END_RE.split(match.group(5), 1)[0].strip()
+                self._option = (key, value)
+            else:
+                self._option = None
+        return self._option
+
+
+def _tokenize(block):
+    """Mask code spans, split into stripped non-empty lines, restore code per line"""
+    codes = []
+
+    def store_code(match):
+        codes.append(match.group(0))
+        return f"__CODE_BLOCK_{len(codes) - 1}__"
+
+    processed = FENCED_CODE_RE.sub(store_code, block)
+    if '`' in processed:
+        processed = INLINE_CODE_RE.sub(store_code, processed)
+
+    if not codes:
+        return [_Line(line, line) for line in (l.strip() for l in processed.split('\n')) if line]
+
+    if any('__CODE_BLOCK_' in code for code in codes):
+        # Pathological input containing placeholder text: keep sequential replacement semantics
+        def restore(line):
+            for i, code in enumerate(codes):
+                line = line.replace(f"__CODE_BLOCK_{i}__", code)
+            return line
+    else:
+        def restore(line):
+            if '__CODE_BLOCK_' not in line:
+                return line
+            return PLACEHOLDER_RE.sub(
+                lambda m: codes[int(m.group(1))] if int(m.group(1)) < len(codes) else m.group(0), line)
+
+    return [_Line(line, restore(line)) for line in (l.strip() for l in processed.split('\n')) if line]
+
+
+def _parse_block(block, stats):
+    if len(block) < 30:
+        return None
+
+    lines = _tokenize(block)
+    if not lines:
+        return None
+
+    # State 1: question text runs until the first option or metadata line
+    question_lines = []
+    options_start = 0
+    for idx, line in enumerate(lines):
+        if OPTION_START_RE.match(line.raw):
+            options_start = idx
+            break
+        if METADATA_START_RE.match(line.raw):
+            break
+        if len(line.raw) > 5:
+            question_lines.append(line.text)
+
+    if question_lines:
+        question_text = ' '.join(question_lines).strip()
+        question_text = QUESTION_PREFIX_RE.sub('', question_text, count=1)
+        question_text = Q_PREFIX_RE.sub('', question_text, count=1)
+    else:
+        question_text = lines[0].text[:200]
+        options_start = 1
+
+    if len(question_text) < 10 or question_text.lower() in ('question', 'q'):
+        return None
+
+    # State 2: options, then answer / explanation lines
+    options = {}
+    correct = None
+    explanation_lines = []
+    parsing_options = True
+
+    for line in lines[options_start:]:
+        text = line.text
+        if parsing_options and len(options) < 4:
+            option = line.option
+            if option and option[0] not in options and option[1]:
+                options[option[0]] = option[1][:150]
+                continue
+            if options:
+                parsing_options = False
+
+        correct_match = CORRECT_RE.search(text)
+        if correct_match:
+            correct = correct_match.group(1).upper()
+            continue
+
+        expl_match = EXPLANATION_RE.match(text)
+        if expl_match:
+            explanation_lines.append(expl_match.group(1).strip())
+            continue
+
+        if explanation_lines and not OPTION_PREFIX_RE.match(text):
+            explanation_lines.append(text)
+
+    explanation = ' '.join(explanation_lines).strip()
+
+    if len(options) < 2:
+        stats['skipped'] += 1
+        return None
+
+    if len(options) < 4:
+        stats['placeholder_filled'] += 1
+        for key in OPTION_KEYS:
+            if key not in options:
+                options[key] = f"Option {key}"
+
+    if not correct or correct not in options:
+        inferred = INFERRED_ANSWER_RE.search(explanation)
+        if inferred and inferred.group(1).upper() in options:
+            correct = inferred.group(1).upper()
+            stats['answer_inferred'] += 1
+        else:
+            correct = 'A'
+            stats['answer_defaulted'] += 1
+
+    if not explanation:
+        explanation = f"The correct answer is {correct}. Review the related concepts to understand why."
+
+    stats['parsed'] += 1
+    return {
+        'question': question_text[:1000].strip(),
+        'options': {key: options[key][:120] for key in OPTION_KEYS},
+        'correct': correct,
+        'explanation': explanation[:350]
+    }
+
+
+def parse_quiz(text, stats=None):
+    """Parse LLM quiz text into a list of question dicts.
+
+    Pass a dict from new_parse_stats() as `stats` to collect outcome counts
+    (parsed, skipped, placeholder_filled, answer_inferred, answer_defaulted).
+    """
+    if stats is None:
+        stats = new_parse_stats()
+    if not text or not isinstance(text, str):
+        return []
+
+    text = text.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+    questions = []
+    for block in split_question_blocks(text):
+        try:
+            question = _parse_block(block, stats)
+        except Exception:
+            stats['skipped'] += 1
+            continue
+        if question is not None:
+            questions.append(question)
+    return questions
+
+
+class IncrementalQuizParser:
+    """parse_quiz for a streamed response: feed() returns questions as soon as they are complete.
+
+    A question is complete once the next "Question N:" header has arrived (its
+    explanation cannot grow any further), or at close(). Blocks are cut exactly
+    where parse_quiz would cut them, so the questions are the same as parsing
+    the whole text at the end. Responses that never use "Question N:" headers
+    are parsed in one go by close(), with parse_quiz's other split patterns.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats if stats is not None else new_parse_stats()
+        self._text = ''
+        self._start = 0       # where the current (unfinished) block begins
+        self._pending_cr = False
+        self._blocks = 0      # blocks long enough that parse_quiz would keep them
+
+    def feed(self, chunk):
+        if not chunk:
+            return []
+        if self._pending_cr:
+            chunk = '\r' + chunk
+        # A '\r' at the end may be the first half of a '\r\n' split across chunks
+        self._pending_cr = chunk.endswith('\r')
+        if self._pending_cr:
+            chunk = chunk[:-1]
+        chunk = chunk.replace('\r\n', '\n').replace('\r', '\n')
+        if not self._text:
+            chunk = chunk.lstrip()
+        self._text += chunk
+
+        questions = []
+        # Scanning from the block start also finds a header split across chunks
+        for match in QUESTION_SPLIT_PATTERNS[0].finditer(self._text, self._start):
+            if match.end() >= len(self._text):
+                break  # the header's trailing whitespace (or number) may still grow
+            question = self._finish_block(self._text[self._start:match.start()])
+            self._start = match.end()
+            if question is not None:
+                questions.append(question)
+        return questions
+
+    def _finish_block(self, block):
+        block = block.strip()
+        if len(block) <= 20:
+            return None
+        self._blocks += 1
+        try:
+            return _parse_block(block, self.stats)
+        except Exception:
+            self.stats['skipped'] += 1
+            return None
+
+    def close(self):
+        """The remaining questions once the response has ended"""
+        if self._pending_cr:
+            self._pending_cr = False
+            self._text += '\n'
+        self._text = self._text.rstrip()
+        if not self._blocks:
+            # No usable "Question N:" block so far: parse_quiz picks a split pattern for the whole text
+            return parse_quiz(self._text, self.stats)
+        questions = []
+        # A header at the very end (a response cut off after "Question N:") was left for more input in feed()
+        for match in QUESTION_SPLIT_PATTERNS[0].finditer(self._text, self._start):
+            question = self._finish_block(self._text[self._start:match.start()])
+            self._start = match.end()
+            if question is not None:
+                questions.append(question)
+        question = self._finish_block(self._text[self._start:])
+        self._start = len(self._text)
+        if question is not None:
+            questions.append(question)
+        return questions
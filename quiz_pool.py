@@ -0,0 +1,193 @@
+"""Pre-generated quiz question pool with a background refiller.
+
+Questions are kept per (topic id, difficulty) in a SQLite table shared by all
+workers. A daemon thread in whichever worker holds the refill lease tops up
+every pool that drops below the low-water mark, so quiz creation only has to
+pop N unused questions off the pool.
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+class QuizPool:
+    def __init__(self, path, generate_questions, pool_keys, low_water=10, high_water=25,
+                 batch_size=5, interval=5.0, lease_seconds=60):
+        self.path = path
+        self.generate_questions = generate_questions
+        self.pool_keys = pool_keys  # list of (topic_id, difficulty), or a callable returning one
+        self.low_water = low_water
+        self.high_water = high_water
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self._instance = uuid.uuid4().hex
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._demand = []
+        self._demand_lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS quiz_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic_id TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                question TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quiz_pool_key ON quiz_pool(topic_id, difficulty);
+            CREATE TABLE IF NOT EXISTS quiz_pool_lease (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+        conn.commit()
+
+    @property
+    def owner(self):
+        """Lease owner id, per process: forked workers must not share (or release) each other's leases"""
+        return f"{os.getpid()}:{self._instance}"
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def size(self, topic_id, difficulty):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM quiz_pool WHERE topic_id = ? AND difficulty = ?",
+            (topic_id, difficulty)).fetchone()[0]
+
+    def sizes(self):
+        rows = self._conn().execute(
+            "SELECT topic_id, difficulty, COUNT(*) FROM quiz_pool GROUP BY topic_id, difficulty").fetchall()
+        return {f"{topic_id}/{difficulty}": count for topic_id, difficulty, count in rows}
+
+    def take(self, topic_id, difficulty, count):
+        """Pop `count` random unused questions, or None if the pool is short"""
+        self.ensure_started()
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM quiz_pool WHERE topic_id = ? AND difficulty = ?",
+                (topic_id, difficulty))]
+            if len(ids) < count:
+                conn.execute("ROLLBACK")
+                self._note_demand(topic_id, difficulty)
+                return None
+            chosen = random.sample(ids, count)
+            placeholders = ','.join('?' * len(chosen))
+            rows = conn.execute(
+                f"SELECT question FROM quiz_pool WHERE id IN ({placeholders})", chosen).fetchall()
+            conn.execute(f"DELETE FROM quiz_pool WHERE id IN ({placeholders})", chosen)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning("Quiz pool read error: %s", e)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return None
+
+        if len(ids) - count < self.low_water:
+            self._note_demand(topic_id, difficulty)
+        questions = [json.loads(row[0]) for row in rows]
+        random.shuffle(questions)
+        return questions
+
+    def add(self, topic_id, difficulty, questions):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO quiz_pool (topic_id, difficulty, question, created_at) VALUES (?, ?, ?, ?)",
+            [(topic_id, difficulty, json.dumps(q), now) for q in questions])
+        conn.execute("COMMIT")
+
+    def _note_demand(self, topic_id, difficulty):
+        with self._demand_lock:
+            if (topic_id, difficulty) not in self._demand:
+                self._demand.append((topic_id, difficulty))
+        self._wakeup.set()
+
+    def ensure_started(self):
+        """Start the refill thread once per process (safe after fork)"""
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        self._thread_pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='quiz-pool-refill', daemon=True)
+        self._thread.start()
+
+    def _acquire_lease(self):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT owner, expires_at FROM quiz_pool_lease WHERE name = 'refill'").fetchone()
+        if row is None or row[0] == self.owner or row[1] < now:
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_pool_lease (name, owner, expires_at) VALUES ('refill', ?, ?)",
+                (self.owner, now + self.lease_seconds))
+            conn.execute("COMMIT")
+            return True
+        conn.execute("COMMIT")
+        return False
+
+    def _next_key(self):
+        """Requested pools first, then any configured pool below the low-water mark"""
+        with self._demand_lock:
+            while self._demand:
+                key = self._demand.pop(0)
+                if self.size(*key) < self.high_water:
+                    return key
+        pool_keys = self.pool_keys() if callable(self.pool_keys) else self.pool_keys
+        for key in pool_keys:
+            if self.size(*key) < self.low_water:
+                return key
+        return None
+
+    def refill_once(self):
+        """Generate one batch for the neediest pool; returns False when all pools are full"""
+        key = self._next_key()
+        if key is None:
+            return False
+        topic_id, difficulty = key
+        try:
+            questions = self.generate_questions(topic_id, difficulty, self.batch_size)
+        except Exception as e:
+            logger.error("Quiz pool refill error: %s", e, extra={'topic_id': topic_id, 'difficulty': difficulty})
+            questions = []
+        if not questions:
+            return False
+        self.add(topic_id, difficulty, questions)
+        if self.size(topic_id, difficulty) < self.high_water:
+            self._note_demand(topic_id, difficulty)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_lease():
+                    while self.refill_once():
+                        self._acquire_lease()
+            except sqlite3.Error as e:
+                logger.exception("Quiz pool refill error: %s", e)
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
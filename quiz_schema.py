@@ -0,0 +1,118 @@
+"""Structured (JSON) quiz generation: schema, validation and truncation repair."""
+import json
+
+
+OPTION_KEYS = ('A', 'B', 'C', 'D')
+
+QUESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string"},
+        "options": {
+            "type": "object",
+            "properties": {key: {"type": "string"} for key in OPTION_KEYS},
+            "required": list(OPTION_KEYS),
+            "additionalProperties": False
+        },
+        "correct": {"type": "string", "enum": list(OPTION_KEYS)},
+        "explanation": {"type": "string"}
+    },
+    "required": ["question", "options", "correct", "explanation"],
+    "additionalProperties": False
+}
+
+# Structured-output providers require an object at the root, so the array is wrapped
+QUIZ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {"type": "array", "items": QUESTION_SCHEMA}
+    },
+    "required": ["questions"],
+    "additionalProperties": False
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "quiz", "strict": True, "schema": QUIZ_SCHEMA}
+}
+
+
+def validate_question(obj):
+    """Return a normalized question dict, or None if obj does not fit the schema"""
+    if not isinstance(obj, dict):
+        return None
+    question = obj.get('question')
+    options = obj.get('options')
+    correct = obj.get('correct')
+    explanation = obj.get('explanation', '')
+
+    if not isinstance(question, str) or len(question.strip()) < 10:
+        return None
+    if not isinstance(options, dict):
+        return None
+    if not isinstance(correct, str) or correct.strip().upper() not in OPTION_KEYS:
+        return None
+    if not isinstance(explanation, str):
+        return None
+
+    normalized_options = {}
+    for key in OPTION_KEYS:
+        value = options.get(key, options.get(key.lower()))
+        if not isinstance(value, (str, int, float)) or not str(value).strip():
+            return None
+        normalized_options[key] = str(value).strip()[:120]
+
+    correct = correct.strip().upper()
+    explanation = explanation.strip() or f"The correct answer is {correct}. Review the related concepts to understand why."
+    return {
+        'question': question.strip()[:1000],
+        'options': normalized_options,
+        'correct': correct,
+        'explanation': explanation[:350]
+    }
+
+
+def _array_start(text):
+    """Index just past the '[' that opens the question array, or -1"""
+    key = text.find('"questions"')
+    if key != -1:
+        start = text.find('[', key)
+        if start != -1:
+            return start + 1
+    start = text.find('[')
+    return start + 1 if start != -1 else -1
+
+
+def extract_questions(text):
+    """Pull valid questions out of a (possibly truncated or fenced) JSON reply.
+
+    Objects are decoded one at a time, so a reply cut off mid-array still
+    yields every complete object before the cut. Returns (questions, invalid)
+    where `invalid` counts complete objects that failed validation.
+    """
+    if not text:
+        return [], 0
+
+    position = _array_start(text)
+    if position == -1:
+        return [], 0
+
+    decoder = json.JSONDecoder()
+    questions = []
+    invalid = 0
+    length = len(text)
+    while position < length:
+        while position < length and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= length or text[position] != '{':
+            break
+        try:
+            obj, position = decoder.raw_decode(text, position)
+        except ValueError:
+            break  # truncated object: keep what we have
+        question = validate_question(obj)
+        if question is None:
+            invalid += 1
+        else:
+            questions.append(question)
+    return questions, invalid
@@ -0,0 +1,145 @@
+"""Server-side storage for in-progress quizzes.
+
+The Flask cookie only carries an opaque quiz id; the questions, options and
+explanations live here. Pick a backend with QUIZ_STORE_URL:
+
+    memory              per-process dict (single worker / development only)
+    sqlite:///path.db   file shared by all workers on the host
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+
+class QuizStore:
+    """Backend interface: records are JSON-serializable dicts with a TTL"""
+
+    def __init__(self, ttl=6 * 3600):
+        self.ttl = ttl
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(16)
+
+    def get(self, quiz_id):
+        raise NotImplementedError
+
+    def put(self, quiz_id, record):
+        raise NotImplementedError
+
+    def delete(self, quiz_id):
+        raise NotImplementedError
+
+    def pop(self, quiz_id):
+        """Load a record and expire it in one step"""
+        record = self.get(quiz_id)
+        if record is not None:
+            self.delete(quiz_id)
+        return record
+
+
+class MemoryQuizStore(QuizStore):
+    def __init__(self, ttl=6 * 3600, max_entries=10000):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        with self._lock:
+            entry = self._records.get(quiz_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._records[quiz_id]
+                return None
+            return entry[1]
+
+    def put(self, quiz_id, record):
+        now = time.time()
+        with self._lock:
+            if len(self._records) >= self.max_entries:
+                for key in [k for k, (expires_at, _) in self._records.items() if expires_at <= now]:
+                    del self._records[key]
+                while len(self._records) >= self.max_entries:
+                    self._records.pop(next(iter(self._records)))
+            self._records[quiz_id] = (now + self.ttl, record)
+
+    def delete(self, quiz_id):
+        with self._lock:
+            self._records.pop(quiz_id, None)
+
+    def pop(self, quiz_id):
+        with self._lock:
+            entry = self._records.pop(quiz_id, None)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+
+class SQLiteQuizStore(QuizStore):
+    def __init__(self, path, ttl=6 * 3600):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS quiz_sessions (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, quiz_id):
+        row = self._conn().execute(
+            "SELECT data FROM quiz_sessions WHERE id = ? AND expires_at > ?", (quiz_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, quiz_id, record):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO quiz_sessions (id, data, expires_at) VALUES (?, ?, ?)",
+            (quiz_id, json.dumps(record, separators=(',', ':')), now + self.ttl))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            conn.execute("DELETE FROM quiz_sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, quiz_id):
+        self._conn().execute("DELETE FROM quiz_sessions WHERE id = ?", (quiz_id,))
+
+    def pop(self, quiz_id):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM quiz_sessions WHERE id = ? AND expires_at > ?", (quiz_id, time.time())).fetchone()
+            conn.execute("DELETE FROM quiz_sessions WHERE id = ?", (quiz_id,))
+        finally:
+            conn.execute("COMMIT")
+        return json.loads(row[0]) if row else None
+
+
+def create_quiz_store(url, ttl=6 * 3600):
+    if url == 'memory':
+        return MemoryQuizStore(ttl=ttl)
+    if url.startswith('sqlite:///'):
+        return SQLiteQuizStore(url[len('sqlite:///'):], ttl=ttl)
+    raise ValueError(f"Unsupported QUIZ_STORE_URL: {url}")
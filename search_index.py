@@ -0,0 +1,155 @@
+"""Full-text search (BM25) and prefix autocomplete over the DSA content.
+
+Built once per content snapshot. BM25 term weights are precomputed per
+(term, document) at build time, so a query is a few dictionary lookups and
+additions. Autocomplete uses a character trie over every word start of each
+title; every node keeps its best completions, so a lookup costs only the
+length of the typed prefix.
+"""
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Higher = shown first among equal matches
+KIND_PRIORITY = {'topic': 3, 'subtopic': 2, 'concept': 1, 'problem': 0}
+# Score multipliers: a broad match on a topic beats the same match on one concept
+KIND_BOOST = {'topic': 1.3, 'subtopic': 1.15, 'concept': 1.0, 'problem': 1.0}
+
+
+def normalize(token):
+    """Fold simple plurals so 'graphs' and 'graph' index together"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [normalize(t) for t in TOKEN_RE.findall(text.lower())]
+
+
+class SearchDoc:
+    __slots__ = ('kind', 'title', 'topic_id', 'topic_title', 'url')
+
+    def __init__(self, kind, title, topic_id, topic_title, url):
+        self.kind = kind
+        self.title = title
+        self.topic_id = topic_id
+        self.topic_title = topic_title
+        self.url = url
+
+    def as_dict(self):
+        return {'kind': self.kind, 'title': self.title, 'topic_id': self.topic_id,
+                'topic_title': self.topic_title, 'url': self.url}
+
+
+class SearchIndex:
+    def __init__(self, snapshot, k1=1.2, b=0.75, title_boost=3, completions_per_node=8):
+        self.docs = []
+        fields = []  # (title, body) per doc
+        for topic in snapshot.topics:
+            topic_url = f"/topic/{topic.id}"
+            self._add(fields, SearchDoc('topic', topic.title, topic.id, topic.title, topic_url),
+                      topic.description)
+            for n, subtopic in enumerate(topic.subtopics, 1):
+                anchor = f"{topic_url}#subtopic-{n}"
+                self._add(fields, SearchDoc('subtopic', subtopic.name, topic.id, topic.title, anchor),
+                          ' '.join(subtopic.concepts))
+                for concept in subtopic.concepts:
+                    self._add(fields, SearchDoc('concept', concept, topic.id, topic.title, anchor),
+                              subtopic.name)
+        for problem in snapshot.practice_problems:
+            self._add(fields, SearchDoc('problem', problem.title, None, problem.category, problem.link),
+                      ' '.join((problem.category, *problem.concepts)))
+
+        # BM25 over a title-boosted bag of words, weights precomputed per posting
+        bags = []
+        for title, body in fields:
+            bag = Counter(tokenize(body))
+            for token in tokenize(title):
+                bag[token] += title_boost
+            bags.append(bag)
+        lengths = [sum(bag.values()) for bag in bags]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        df = Counter(token for bag in bags for token in bag)
+        total = len(bags)
+        self.postings = {}
+        for doc, bag in enumerate(bags):
+            norm = k1 * (1 - b + b * lengths[doc] / avg_length)
+            boost = KIND_BOOST[self.docs[doc].kind]
+            for token, tf in bag.items():
+                idf = math.log(1 + (total - df[token] + 0.5) / (df[token] + 0.5))
+                self.postings.setdefault(token, []).append((doc, boost * idf * tf * (k1 + 1) / (tf + norm)))
+        self.terms = sorted(self.postings)
+
+        self._trie = {}
+        self._build_trie(completions_per_node)
+
+    def _add(self, fields, doc, body):
+        self.docs.append(doc)
+        fields.append((doc.title, body))
+
+    def _build_trie(self, limit):
+        seen_titles = {}
+        for doc_id, doc in enumerate(self.docs):
+            # One suggestion per distinct title (concepts repeat across topics)
+            key = doc.title.lower()
+            if key in seen_titles:
+                continue
+            seen_titles[key] = doc_id
+            words = tokenize(doc.title)
+            for i in range(len(words)):
+                node = self._trie
+                for char in ' '.join(words[i:]):
+                    node = node.setdefault(char, {})
+                    node.setdefault(None, []).append(doc_id)
+
+        rank = lambda doc_id: (-KIND_PRIORITY[self.docs[doc_id].kind], len(self.docs[doc_id].title), doc_id)
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            if None in node:
+                node[None] = sorted(set(node[None]), key=rank)[:limit]
+            stack.extend(child for char, child in node.items() if char is not None)
+
+    def search(self, query, limit=10):
+        """Top documents by BM25; the last query word also matches as a prefix"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = {}
+        for token in tokens[:-1]:
+            for doc, weight in self.postings.get(token, ()):
+                scores[doc] = scores.get(doc, 0.0) + weight
+        # Expand the word being typed to the indexed terms it prefixes (best match per doc)
+        last = tokens[-1]
+        best = {}
+        for term in self._prefixed_terms(last, 20):
+            factor = 1.0 if term == last else 0.8
+            for doc, weight in self.postings[term]:
+                if weight * factor > best.get(doc, 0.0):
+                    best[doc] = weight * factor
+        for doc, weight in best.items():
+            scores[doc] = scores.get(doc, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -KIND_PRIORITY[self.docs[item[0]].kind], item[0]))
+        return [dict(self.docs[doc].as_dict(), score=round(score, 3)) for doc, score in ranked[:limit]]
+
+    def _prefixed_terms(self, prefix, limit):
+        start = bisect_left(self.terms, prefix)
+        terms = []
+        for term in self.terms[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def autocomplete(self, prefix, limit=8):
+        node = self._trie
+        for char in ' '.join(tokenize(prefix)):
+            node = node.get(char)
+            if node is None:
+                return []
+        return [self.docs[doc_id].as_dict() for doc_id in node.get(None, [])[:limit]]
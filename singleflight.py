@@ -0,0 +1,187 @@
+"""Coalesce identical in-flight calls, across threads and across workers.
+
+Within a process, concurrent callers with the same key wait on one Event.
+Across processes, the first worker takes a lease row in a shared SQLite file
+and publishes its result there. Other workers poll for that result instead of
+making the same upstream call.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, path, lease_seconds=120, result_ttl=30, poll_interval=0.1):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._instance = uuid.uuid4().hex
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'leader_calls': 0, 'coalesced_local': 0, 'coalesced_remote': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS singleflight_lease (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS singleflight_result (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    @property
+    def owner(self):
+        """Lease owner id, per process: forked workers must not share (or release) each other's leases"""
+        return f"{os.getpid()}:{self._instance}"
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _bump(self, field):
+        with self._lock:
+            self._stats[field] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+    def do(self, key, fn):
+        """Run fn() once per key among all concurrent callers and share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._bump('coalesced_local')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _do_shared(self, key, fn):
+        try:
+            acquired = self._acquire(key)
+        except sqlite3.Error as e:
+            logger.warning("Single-flight lease error: %s", e)
+            acquired = None
+
+        if acquired is None:
+            # Shared store unavailable: still coalesced within this worker
+            self._bump('leader_calls')
+            return fn()
+
+        if not acquired:
+            found, value = self._wait_for_result(key)
+            if found:
+                self._bump('coalesced_remote')
+                return value
+            # Lease holder died or timed out; take over and make the call ourselves
+            try:
+                self._acquire(key)
+            except sqlite3.Error:
+                pass
+
+        self._bump('leader_calls')
+        try:
+            value = fn()
+            self._publish(key, value)
+            return value
+        except Exception:
+            self._publish(key, None)
+            raise
+        finally:
+            self._release(key)
+
+    def _acquire(self, key):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM singleflight_lease WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO singleflight_lease (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease_seconds))
+            conn.execute("DELETE FROM singleflight_result WHERE key = ? OR expires_at <= ?", (key, now))
+            return True
+        finally:
+            conn.execute("COMMIT")
+
+    def _wait_for_result(self, key):
+        """Poll until the lease holder publishes; (False, None) if its lease lapses"""
+        conn = self._conn()
+        while True:
+            now = time.time()
+            row = conn.execute(
+                "SELECT value FROM singleflight_result WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            if row is not None:
+                return True, row[0]
+            lease = conn.execute(
+                "SELECT expires_at FROM singleflight_lease WHERE key = ?", (key,)).fetchone()
+            if lease is None or lease[0] <= now:
+                row = conn.execute(
+                    "SELECT value FROM singleflight_result WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+                return (True, row[0]) if row is not None else (False, None)
+            time.sleep(self.poll_interval)
+
+    def _publish(self, key, value):
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO singleflight_result (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.result_ttl))
+        except sqlite3.Error as e:
+            logger.warning("Single-flight publish error: %s", e)
+
+    def _release(self, key):
+        try:
+            self._conn().execute(
+                "DELETE FROM singleflight_lease WHERE key = ? AND owner = ?", (key, self.owner))
+        except sqlite3.Error as e:
+            logger.warning("Single-flight release error: %s", e)
@@ -28,6 +28,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeSyntaxHighlighting();
     initializeSmoothScrolling();
     initializeTooltips();
+    initializeSiteSearch();
 });
 
 // ==========================================
@@ -241,28 +242,90 @@ function explainQuestion(index) {
     box.classList.remove('d-none');
     
     const card = document.getElementById('question-card-' + index);
-    const title = card ? card.querySelector('.card-title').textContent : '';
-    
-    fetch('/api/explain', {
+    const titleEl = card ? card.querySelector('.question-text') : null;
+    const title = titleEl ? titleEl.textContent : '';
+    
+    let content = null;
+    streamExplanation({
+        concept: title,
+        context: 'Quiz Question',
+        difficulty: 'intermediate'
+    }, {
+        onHtml: function(html) {
+            if (!content) {
+                box.innerHTML = '<div class="ai-explanation-content"></div>';
+                content = box.firstChild;
+            }
+            content.insertAdjacentHTML('beforeend', html);
+        },
+        onError: function(err) {
+            box.innerHTML = '<div class="text-danger">Failed to load explanation: ' + err.message + '</div>';
+        }
+    });
+}
+
+// ==========================================
+// STREAMING EXPLANATIONS (SSE over fetch)
+// ==========================================
+function streamExplanation(payload, handlers) {
+    // Each `html` event is one finished markdown block, appended as it arrives
+    return fetch('/api/explain/stream', {
         method: 'POST',
-        headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify({
-            concept: title,
-            context: 'Quiz Question',
-            difficulty: 'intermediate'
-        })
+        headers: {'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+        body: JSON.stringify(payload)
     })
-    .then(r => {
-        if (!r.ok) return r.text().then(t => { throw new Error(t || r.statusText); });
-        return r.json();
-    })
-    .then(data => {
-        box.innerHTML = '<div class="ai-explanation-content">' + data.explanation + '</div>';
+    .then(function(r) {
+        if (!r.ok || !r.body) {
+            return r.text().then(function(t) {
+                // 429/503 from admission control carry a JSON {error, retry_after}
+                let message = t || r.statusText;
+                try { message = JSON.parse(t).error || message; } catch (e) {}
+                throw new Error(message);
+            });
+        }
+        return readEventStream(r.body, function(event, data) {
+            if (event === 'html' && handlers.onHtml) handlers.onHtml(data.html);
+            else if (event === 'done' && handlers.onDone) handlers.onDone();
+            else if (event === 'error') throw new Error(data.error);
+        });
     })
-    .catch(err => {
-        box.innerHTML = '<div class="text-danger">Failed to load explanation: ' + err.message + '</div>';
+    .catch(function(err) {
+        if (handlers.onError) handlers.onError(err);
     });
 }
+
+function readEventStream(body, onEvent) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    function dispatch(raw) {
+        let event = 'message';
+        const dataLines = [];
+        raw.split('\n').forEach(function(line) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+        });
+        if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+    
+    function pump() {
+        return reader.read().then(function(result) {
+            if (result.done) {
+                if (buffer.trim()) dispatch(buffer);
+                return;
+            }
+            buffer += decoder.decode(result.value, {stream: true});
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                dispatch(buffer.slice(0, sep));
+                buffer = buffer.slice(sep + 2);
+            }
+            return pump();
+        });
+    }
+    return pump();
+}
 // ==========================================
 // SUBMIT QUIZ
 // ==========================================
@@ -392,6 +455,73 @@ function displayResults(data, timeStr) {
     window.scrollTo(0, 0);
 }
 
+// ==========================================
+// SITE SEARCH (autocomplete as you type, full search on Enter)
+// ==========================================
+function initializeSiteSearch() {
+    const input = document.getElementById('site-search');
+    const menu = document.getElementById('site-search-results');
+    if (!input || !menu) return;
+    
+    let timer = null;
+    let latest = 0;
+    
+    function render(items) {
+        if (!items.length) {
+            menu.classList.add('d-none');
+            menu.innerHTML = '';
+            return;
+        }
+        menu.innerHTML = items.map(function(item) {
+            const context = item.kind === 'topic' ? '' : ' <small class="text-muted">· ' + escapeSearchText(item.topic_title || '') + '</small>';
+            const target = item.kind === 'problem' ? ' target="_blank"' : '';
+            return '<a class="list-group-item list-group-item-action" href="' + encodeURI(item.url) + '"' + target + '>' +
+                '<span class="badge bg-secondary me-2">' + item.kind + '</span>' +
+                escapeSearchText(item.title) + context + '</a>';
+        }).join('');
+        menu.classList.remove('d-none');
+    }
+    
+    function query(endpoint, q) {
+        const requestId = ++latest;
+        fetch(endpoint + '?q=' + encodeURIComponent(q))
+            .then(function(r) { return r.json(); })
+            .then(function(data) {
+                if (requestId !== latest) return;  // a newer keystroke already answered
+                render(data.suggestions || data.results || []);
+            })
+            .catch(function(err) { console.error('Search failed:', err); });
+    }
+    
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const q = input.value.trim();
+        if (!q) {
+            latest++;
+            render([]);
+            return;
+        }
+        timer = setTimeout(function() { query('/api/autocomplete', q); }, 80);
+    });
+    
+    input.form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        clearTimeout(timer);
+        const q = input.value.trim();
+        if (q) query('/api/search', q);
+    });
+    
+    document.addEventListener('click', function(e) {
+        if (!input.form.contains(e.target)) render([]);
+    });
+}
+
+function escapeSearchText(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 // ==========================================
 // UTILITY FUNCTIONS
 // ==========================================
@@ -451,3 +581,4 @@ window.submitQuiz = submitQuiz;
 window.confirmSubmit = confirmSubmit;
 window.showHint = showHint;
 window.explainQuestion = explainQuestion;
+window.streamExplanation = streamExplanation;
@@ -0,0 +1,100 @@
+"""Fingerprinted, precompressed static assets.
+
+Build step (run on deploy, after any CSS/JS change):
+
+    python static_assets.py
+
+writes static/dist/<path>.<hash>.<ext> plus .gz (and .br when the optional
+`brotli` package is installed) variants and a manifest.json. Templates call
+asset_url('css/style.css'); with a manifest the URL is fingerprinted and
+served with a one-year immutable Cache-Control, otherwise it falls back to
+the plain /static URL so development needs no build.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+ASSETS = ('css/style.css', 'js/main.js')
+# Served in order of preference when the client accepts them
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def build(static_folder, assets=ASSETS):
+    """Write fingerprinted and compressed copies of `assets`; returns the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for name in assets:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        target = os.path.join(dist, fingerprinted)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[name] = fingerprinted
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    def __init__(self, static_folder, max_age=365 * 24 * 3600):
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        self.max_age = max_age
+        try:
+            with open(os.path.join(self.dist, MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        # Part of page ETags: a rebuild changes every asset URL in base.html
+        self.version = hashlib.sha1(json.dumps(self.manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+    def url(self, filename):
+        fingerprinted = self.manifest.get(filename)
+        if fingerprinted is None:
+            return url_for('static', filename=filename)
+        return url_for('static_asset', filename=fingerprinted)
+
+    def send(self, filename):
+        """Serve a fingerprinted asset, precompressed when the client accepts it"""
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        served, encoding = filename, None
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings[name] and os.path.isfile(os.path.join(self.dist, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+        response = send_from_directory(self.dist, served, mimetype=mimetype, max_age=self.max_age)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+if __name__ == '__main__':
+    static_folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for name, fingerprinted in build(static_folder).items():
+        print(f"{name} -> {DIST_DIR}/{fingerprinted}")
+    if brotli is None:
+        print("brotli not installed: only gzip variants were written")
@@ -0,0 +1,29 @@
+"""Point every store at a throwaway directory before the app is imported"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix='algopro-tests-')
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+
+os.environ.update(
+    OPENROUTER_API_KEY='',
+    QUIZ_POOL_ENABLED='0',
+    ADMISSION_RATE_PER_MINUTE='0',
+    LOG_LEVEL='ERROR',
+    LLM_CACHE_PATH=os.path.join(_workdir, 'llm_cache.sqlite3'),
+    SINGLE_FLIGHT_PATH=os.path.join(_workdir, 'singleflight.sqlite3'),
+    ADMISSION_PATH=os.path.join(_workdir, 'admission.sqlite3'),
+    QUIZ_JOBS_PATH=os.path.join(_workdir, 'quiz_jobs.sqlite3'),
+    QUIZ_POOL_PATH=os.path.join(_workdir, 'quiz_pool.sqlite3'),
+    QUIZ_STORE_URL='sqlite:///' + os.path.join(_workdir, 'quiz_sessions.sqlite3'),
+    PROGRESS_DB_PATH=os.path.join(_workdir, 'progress.sqlite3'),
+    QUESTION_BANK_PATH=os.path.join(_workdir, 'question_bank.sqlite3'),
+    CONTENT_SNAPSHOT_PATH=os.path.join(_workdir, 'content_snapshot.pickle'),
+    METRICS_DIR=os.path.join(_workdir, 'metrics'),
+)
@@ -0,0 +1,24 @@
+from code_fingerprint import fingerprint
+
+
+def test_python_equivalents_share_a_fingerprint():
+    a = fingerprint("def f(xs):\n    # sum\n    return sum(xs)\n", 'python')
+    b = fingerprint("def total(items):\n\n    return sum(items)  # done\n", 'py')
+    assert a.method == 'ast'
+    assert a.digest == b.digest
+
+
+def test_unparseable_python_keeps_indentation():
+    nested = "for x in xs:\n    if x:\n        y = x\n    print(y\n"
+    flat = "for x in xs:\n    if x:\n        y = x\nprint(y\n"
+    a, b = fingerprint(nested, 'python'), fingerprint(flat, 'python')
+    assert a.method == b.method == 'tokens'
+    assert a.digest != b.digest
+    # Comments and spacing inside a line still do not matter
+    assert fingerprint(nested.replace('y = x', 'y=x  # keep'), 'python').digest == a.digest
+
+
+def test_other_languages_ignore_layout():
+    a = fingerprint("int f(int n) {\n  return n + 1;\n}", 'cpp')
+    b = fingerprint("int f(int n) { return n + 1; }", 'c++')
+    assert a.digest == b.digest
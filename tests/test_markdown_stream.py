@@ -0,0 +1,37 @@
+import pytest
+
+from markdown_cache import convert
+from markdown_stream import MarkdownStreamRenderer
+
+EXTENSIONS = ('tables', 'fenced_code')
+
+
+def render_streamed(text, chunk_size):
+    renderer = MarkdownStreamRenderer(EXTENSIONS)
+    parts = []
+    for i in range(0, len(text), chunk_size):
+        parts.extend(renderer.feed(text[i:i + chunk_size]))
+    parts.append(renderer.close())
+    return ''.join(parts)
+
+
+def squash(html):
+    return ''.join(html.split())
+
+
+@pytest.mark.parametrize('text', [
+    "1. a\n\n2. b\n",
+    "Steps:\n\n1. Sort the array.\n\n2. Scan with two pointers.\n\nThat is O(n log n).",
+    "- x\n\n- y\n\n    more about y\n\n- z\n\n## Next\n\ntext\n",
+    "1. one\n2. two\n\n\n3. three",
+    "1. a\n\n```\ncode\n```\n\n2. b\n",
+])
+@pytest.mark.parametrize('chunk_size', [1, 5, 1000])
+def test_streamed_lists_match_batch(text, chunk_size):
+    assert squash(render_streamed(text, chunk_size)) == squash(convert(text, EXTENSIONS))
+
+
+def test_loose_ordered_list_is_one_list():
+    html = render_streamed("1. a\n\n2. b\n\n3. c\n", 3)
+    assert html.count('<ol>') == 1
+    assert html.count('<li>') == 3
@@ -0,0 +1,51 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_worker(directory, count):
+    """A process that records `count` events and exits long before its first periodic flush"""
+    script = textwrap.dedent(f"""
+        import metrics
+        metrics.REGISTRY.configure_multiprocess({str(directory)!r}, flush_interval=3600)
+        events = metrics.counter('events_total', 'Events')
+        for _ in range({count}):
+            events.inc()
+    """)
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+
+
+def registry(directory):
+    registry = metrics.Registry()
+    events = registry.counter('events_total', 'Events')
+    registry.directory = str(directory)
+    return registry, events
+
+
+def test_exited_worker_flushes_its_counts(tmp_path):
+    run_worker(tmp_path, 3)
+    reg, _ = registry(tmp_path)
+    assert reg.collect()['events_total'] == {(): 3}
+
+
+def test_running_worker_compacts_files_of_exited_ones(tmp_path):
+    run_worker(tmp_path, 2)
+    run_worker(tmp_path, 5)
+    reg, events = registry(tmp_path)
+    reg.flush_interval = 0.05
+    events.inc()  # starting to record starts the flusher, which compacts first
+    for _ in range(100):
+        others = [p for p in glob.glob(str(tmp_path / 'metrics_*_*.json')) if p != reg._path]
+        if not others:
+            break
+        reg._flusher.join(0.05)
+    with open(tmp_path / metrics.ARCHIVE) as f:
+        assert json.load(f)['events_total'] == [[[], 7]]
+    assert reg.collect()['events_total'] == {(): 8}
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openrouter_client import OpenRouterClient, OpenRouterError
+
+TEXT = 'O(n²) — θ ≤ 日本'
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')  # no charset, like OpenRouter
+        self.end_headers()
+        for piece in (TEXT[:4], TEXT[4:]):
+            chunk = {'choices': [{'delta': {'content': piece}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+    server.shutdown()
+
+
+def test_stream_decodes_utf8(upstream):
+    client = OpenRouterClient(upstream, 'key', max_retries=0)
+    assert ''.join(client.stream({'model': 'm', 'messages': []})) == TEXT
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Answers every POST with `status` after `delay` seconds, counting the requests"""
+    status, delay, requests = 200, 0, 0
+
+    def do_POST(self):
+        type(self).requests += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.delay)
+        body = json.dumps({'choices': [{'message': {'content': 'ok'}}]}).encode()
+        try:
+            self.send_response(self.status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # the client gave up
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(status, delay):
+    handler = type('Handler', (CountingHandler,), {'status': status, 'delay': delay, 'requests': 0})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler
+
+
+def test_read_timeout_is_not_retried():
+    server, handler = serve(200, 0.5)
+    client = OpenRouterClient(f"http://127.0.0.1:{server.server_port}/", 'key', read_timeout=0.1,
+                              max_retries=2, backoff_base=0.01)
+    with pytest.raises(OpenRouterError):
+        client.complete({'model': 'm', 'messages': []})
+    server.shutdown()
+    assert handler.requests == 1
+
+
+def test_retryable_status_is_retried_within_the_deadline():
+    server, handler = serve(503, 0)
+    client = OpenRouterClient(f"http://127.0.0.1:{server.server_port}/", 'key', connect_timeout=0.1, read_timeout=1,
+                              max_retries=2, backoff_base=0.01, backoff_max=0.01)
+    with pytest.raises(OpenRouterError):
+        client.complete({'model': 'm', 'messages': []})
+    assert handler.requests == 3
+    # A retry that could not finish inside total_timeout is not started
+    handler.requests = 0
+    client.total_timeout = 0.5
+    with pytest.raises(OpenRouterError):
+        client.complete({'model': 'm', 'messages': []})
+    server.shutdown()
+    assert handler.requests == 1
@@ -0,0 +1,49 @@
+from question_bank import QuestionBank
+
+
+def make_bank(tmp_path, topics=('graphs', 'trees'), per_topic=30):
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite3'))
+    for topic_id in topics:
+        for i in range(per_topic):
+            bank.add(topic_id, ('easy', 'hard')[i % 2], {
+                'question': f"{topic_id} question {i}: " + ' '.join(f"w{i}x{j}" for j in range(8)),
+                'options': {'A': f"a{i}", 'B': f"b{i}", 'C': f"c{i}", 'D': f"d{i}"},
+                'correct': 'A', 'explanation': ''})
+    return bank
+
+
+def test_assemble_never_repeats_for_a_user(tmp_path):
+    bank = make_bank(tmp_path)
+    served = []
+    for _ in range(4):
+        ids, questions = bank.assemble('graphs', 'mixed', 7, user_id='learner')
+        assert len(ids) == len(set(ids)) == len(questions)
+        assert all(q['question'].startswith('graphs') for q in questions)
+        served.extend(ids)
+    assert len(served) == len(set(served)) == 28
+    ids, _ = bank.assemble('graphs', 'mixed', 7, user_id='learner')
+    assert len(ids) == 2 and not set(ids) & set(served)
+    assert bank.assemble('graphs', 'mixed', 7, user_id='learner') == ([], [])
+
+
+def test_assemble_filters_difficulty_and_exclusions(tmp_path):
+    bank = make_bank(tmp_path)
+    excluded, _ = bank.assemble('trees', 'hard', 5)
+    ids, questions = bank.assemble('trees', 'hard', 15, exclude_ids=excluded)
+    assert len(ids) == 10
+    assert not set(ids) & set(excluded)
+    assert all(int(q['question'].split()[2].rstrip(':')) % 2 == 1 for q in questions)
+
+
+def test_fallback_quiz_skips_banked_questions_already_served():
+    import app as algopro
+    for i in range(6):
+        algopro.QUESTION_BANK.add('bank-test-topic', 'easy', {
+            'question': f"Banked fallback question {i}: " + ' '.join(f"v{i}y{j}" for j in range(8)),
+            'options': {'A': f"a{i}", 'B': f"b{i}", 'C': f"c{i}", 'D': f"d{i}"},
+            'correct': 'A', 'explanation': ''})
+    first = algopro.get_fallback_quiz('bank-test-topic', 'easy', 3, user_id='fallback-learner')['questions']
+    second = algopro.get_fallback_quiz('bank-test-topic', 'easy', 3, user_id='fallback-learner')['questions']
+    texts = [q['question'] for q in first + second]
+    assert all(text.startswith('Banked fallback') for text in texts)
+    assert len(set(texts)) == 6
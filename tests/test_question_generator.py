@@ -0,0 +1,31 @@
+import random
+import re
+
+import pytest
+
+from question_generator import GENERATORS, SIZES, generate_questions, heap_inserts
+
+
+@pytest.mark.parametrize('topic_id', sorted(GENERATORS))
+def test_options_are_distinct(topic_id):
+    for question in generate_questions(topic_id, 'mixed', 200, rng=random.Random(topic_id)):
+        assert sorted(question['options']) == list('ABCD')
+        assert len(set(question['options'].values())) == 4
+        assert question['correct'] in question['options']
+
+
+def test_heap_inserts_explanation_matches_answer():
+    rng = random.Random(7)
+    heapify_mentioned = 0
+    for _ in range(3000):
+        question = heap_inserts(rng, rng.choice(list(SIZES.values())))
+        if question is None:
+            continue
+        answer = question['options'][question['correct']]
+        assert len(set(question['options'].values())) == 4
+        assert f"giving {answer}." in question['explanation']
+        heapified = re.search(r'Bottom-up heapify of the same values gives (\[[^\]]*\])', question['explanation'])
+        if heapified:
+            heapify_mentioned += 1
+            assert heapified.group(1) != answer
+    assert heapify_mentioned  # the common case still teaches the difference
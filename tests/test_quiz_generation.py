@@ -0,0 +1,71 @@
+import itertools
+import json
+
+import pytest
+
+import app as algopro
+
+TOPIC_ID = 'linked-lists'
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A healthy model that writes new questions on every call; records the prompts it saw"""
+    prompts = []
+    counter = itertools.count()
+
+    def complete(payload, usage=None, cancelled=None):
+        prompts.append(payload['messages'][-1]['content'])
+        questions = [{'question': f"Generated question {n}: what does step {n * 7 + 3} of pointer walk {n} do?",
+                      'options': {'A': f"moves {n}", 'B': f"stops {n}", 'C': f"loops {n}", 'D': f"skips {n}"},
+                      'correct': 'A', 'explanation': 'It moves.'}
+                     for n in itertools.islice(counter, 5)]
+        return json.dumps({'questions': questions})
+
+    monkeypatch.setattr(algopro, 'OPENROUTER_API_KEY', 'test-key')
+    monkeypatch.setattr(algopro, 'QUIZ_GENERATION_MODE', 'json')
+    monkeypatch.setattr(algopro.OPENROUTER, 'complete', complete)
+    return prompts
+
+
+def test_repeated_quiz_is_generated_not_fallback(upstream):
+    for _ in range(3):
+        quiz = algopro.generate_quiz_with_llm(TOPIC_ID, 'easy', 5, user_id='repeat-learner')
+        assert not quiz.get('fallback')
+        assert all(q['question'].startswith('Generated') for q in quiz['questions'])
+    assert len(upstream) == 3
+    # Later prompts list what the bank already holds
+    assert 'Do NOT repeat' not in upstream[0]
+    assert 'Generated question 0' in upstream[1]
+
+
+def test_upstream_failure_is_not_retried_in_text_mode(monkeypatch):
+    calls = []
+
+    def complete(payload, usage=None, cancelled=None):
+        calls.append(payload)
+        raise algopro.OpenRouterError('upstream down')
+
+    monkeypatch.setattr(algopro, 'OPENROUTER_API_KEY', 'test-key')
+    monkeypatch.setattr(algopro, 'QUIZ_GENERATION_MODE', 'json')
+    monkeypatch.setattr(algopro.OPENROUTER, 'complete', complete)
+    topic = algopro.get_topic_by_id(TOPIC_ID)
+    assert algopro.generate_question_chunk(topic, 'easy', 5) == []
+    assert len(calls) == 1
+
+
+def test_unusable_answer_is_retried_in_text_mode(monkeypatch):
+    calls = []
+
+    def complete(payload, usage=None, cancelled=None):
+        calls.append(payload)
+        return 'Sorry, I cannot help with that.'
+
+    monkeypatch.setattr(algopro, 'OPENROUTER_API_KEY', 'test-key')
+    monkeypatch.setattr(algopro, 'QUIZ_GENERATION_MODE', 'json')
+    monkeypatch.setattr(algopro.OPENROUTER, 'complete', complete)
+    topic = algopro.get_topic_by_id(TOPIC_ID)
+    assert algopro.generate_question_chunk(topic, 'easy', 5) == []
+    # Every structured attempt, then one text-format prompt without response_format
+    assert len(calls) == 2 + algopro.QUIZ_JSON_REPAIR_ATTEMPTS
+    assert 'response_format' not in calls[-1]
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+import app as algopro
+from quiz_jobs import QuizJobs
+
+TOPIC_ID = 'arrays-strings'
+
+
+@pytest.fixture
+def client():
+    return algopro.create_app().test_client()
+
+
+@pytest.mark.parametrize('url, body', [
+    ('/api/quiz-jobs', {'topic_id': TOPIC_ID}),
+    ('/api/regenerate-quiz', {'topic_id': TOPIC_ID}),
+])
+@pytest.mark.parametrize('num_questions, expected', [('7', 7), (10 ** 6, 20), (0, 1)])
+def test_num_questions_is_validated(client, url, body, num_questions, expected):
+    response = client.post(url, json=dict(body, num_questions=num_questions))
+    assert response.status_code in (200, 202)
+    data = response.get_json()
+    job = algopro.QUIZ_JOBS.get((data.get('job') or data)['id'])
+    assert job['params']['num_questions'] == expected
+
+
+@pytest.mark.parametrize('url', ['/api/quiz-jobs', '/api/regenerate-quiz'])
+@pytest.mark.parametrize('options', [{'num_questions': 'seven'}, {'num_questions': [5]},
+                                     {'num_questions': True}, {'difficulty': 'impossible'}])
+def test_invalid_options_are_rejected(client, url, options):
+    response = client.post(url, json=dict({'topic_id': TOPIC_ID}, **options))
+    assert response.status_code == 400
+
+
+def test_generate_form_rejects_invalid_options(client):
+    response = client.post(f"/generate-quiz/{TOPIC_ID}", data={'num_questions': 'lots'})
+    assert response.status_code == 400
+
+
+def test_long_running_job_is_not_requeued(tmp_path):
+    def run(params, progress):
+        time.sleep(1.0)  # one long upstream call, no progress reports
+        return 'quiz'
+
+    jobs = QuizJobs(str(tmp_path / 'jobs.sqlite3'), run, stale_after=0.3)
+    job, _ = jobs.submit('learner', {'topic_id': TOPIC_ID})
+    time.sleep(0.6)
+    assert jobs.recover() == 0
+    for _ in range(50):
+        if jobs.get(job['id'])['status'] == 'done':
+            break
+        time.sleep(0.05)
+    job = jobs.get(job['id'])
+    assert job['status'] == 'done'
+    assert job['attempts'] == 1
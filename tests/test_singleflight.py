@@ -0,0 +1,33 @@
+import os
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_workers_coalesce(tmp_path):
+    # Created before forking, as under gunicorn --preload
+    flight = SingleFlight(str(tmp_path / 'singleflight.sqlite3'))
+    calls = tmp_path / 'calls'
+
+    def fetch():
+        with open(calls, 'a') as f:
+            f.write('x')
+        time.sleep(0.5)
+        return 'value'
+
+    children = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os._exit(0 if flight.do('key', fetch) == 'value' else 1)
+            except BaseException:
+                os._exit(1)
+        children.append(pid)
+    statuses = [os.waitpid(pid, 0)[1] for pid in children]
+
+    assert statuses == [0, 0, 0, 0]
+    assert calls.read_text() == 'x'
@@ -0,0 +1,56 @@
+import pytest
+
+import app as algopro
+
+TOPIC_ID = 'arrays-strings'
+
+
+def make_quiz(num_questions, **extra):
+    questions = [{'question': f"Question number {i} about arrays?",
+                  'options': {'A': 'one', 'B': 'two', 'C': 'three', 'D': 'four'},
+                  'correct': 'A', 'explanation': 'Because.'} for i in range(num_questions)]
+    return dict({'title': 'Test quiz', 'difficulty': 'mixed', 'questions': questions}, **extra)
+
+
+@pytest.fixture
+def client():
+    return algopro.create_app().test_client()
+
+
+def start(client, quiz_data):
+    quiz_id = algopro.store_quiz(TOPIC_ID, quiz_data)
+    with client.session_transaction() as session:
+        session['quiz_id'] = quiz_id
+    return quiz_id
+
+
+def test_complete_quiz_ignores_delivered(client):
+    start(client, make_quiz(20))
+    response = client.post('/api/submit-quiz', json={'answers': {'0': 'A'}, 'delivered': 1})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['total'] == 20
+    assert data['correct'] == 1
+    assert data['score'] == 5.0
+
+
+def test_streaming_quiz_is_graded_on_what_was_sent(client):
+    quiz_id = start(client, make_quiz(3, streaming=True, expected_questions=10))
+    assert client.get(f"/quiz/{TOPIC_ID}").status_code == 200  # the page is rendered with 3 questions
+    record = algopro.QUIZ_STORE.get(quiz_id)
+    record['quiz_data'] = make_quiz(6, streaming=True, expected_questions=10)  # more arrive, never sent
+    algopro.QUIZ_STORE.put(quiz_id, record)
+    response = client.post('/api/submit-quiz', json={'answers': {'0': 'A', '1': 'A'}, 'delivered': 10})
+    data = response.get_json()
+    assert data['total'] == 3
+    assert data['correct'] == 2
+
+
+def test_streaming_quiz_with_fewer_delivered_is_partial(client):
+    start(client, make_quiz(3, streaming=True, expected_questions=10))
+    client.get(f"/quiz/{TOPIC_ID}")
+    # The page claims it only showed one question: the other two count as unanswered, not as absent
+    data = client.post('/api/submit-quiz', json={'answers': {'0': 'A', '1': 'A'}, 'delivered': 1}).get_json()
+    assert data['total'] == 3
+    assert data['correct'] == 1
+    assert data['results'][1]['user_answer'] == ''